@@ -0,0 +1,124 @@
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# --- AI Response Cache ---
+# An in-process LRU with a TTL in front of the OpenRouter calls, optionally
+# backed by a Mongo collection so cached answers survive restarts and are
+# shared between app processes.
+
+def _is_word_char(char):
+    # Letters, combining marks and numbers in any script. Marks matter:
+    # Devanagari vowel signs are category M, and dropping them would merge
+    # different Hindi words.
+    return unicodedata.category(char)[0] in 'LMN'
+
+
+def normalize_text(text):
+    """Case-folds text and strips punctuation and extra whitespace, in any script.
+
+    Word order is kept: "chest pain, no fever" and "fever, no chest pain"
+    mean different things and must not share a cache entry.
+    """
+    text = unicodedata.normalize('NFKC', str(text or '')).casefold()
+    return ' '.join(''.join(c if _is_word_char(c) else ' ' for c in text).split())
+
+
+def make_cache_key(kind, *parts):
+    """Builds a cache key from a namespace and already-normalized text parts."""
+    digest = hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+    return f"{kind}:{digest}"
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-entry expiry and an optional Mongo store."""
+
+    def __init__(self, maxsize=1024, ttl=86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.collection = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+
+    def attach_persistent_store(self, collection):
+        """Backs the cache with a Mongo collection; expired documents are removed by its TTL index on expiresAt."""
+        self.collection = collection
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss. A None key is never cached."""
+        if key is None:
+            return None
+        value = self._get_local(key)
+        if value is None and self.collection is not None:
+            try:
+                doc = self.collection.find_one({'_id': key, 'expiresAt': {'$gt': datetime.utcnow()}})
+            except Exception as e:
+                print(f"AI cache: persistent lookup failed: {e}")
+                doc = None
+            if doc is not None:
+                value = doc['value']
+                self._set_local(key, value)
+                with self._lock:
+                    self.persistent_hits += 1
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if key is None:
+            return
+        self._set_local(key, value)
+        if self.collection is not None:
+            try:
+                self.collection.replace_one(
+                    {'_id': key},
+                    {'_id': key, 'value': value, 'expiresAt': datetime.utcnow() + timedelta(seconds=self.ttl)},
+                    upsert=True,
+                )
+            except Exception as e:
+                print(f"AI cache: persistent write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'persistentHits': self.persistent_hits,
+                'hitRate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'maxSize': self.maxsize,
+                'ttlSeconds': self.ttl,
+            }
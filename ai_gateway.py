@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import httpx
+from openai import (OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError, InternalServerError,
+                    RateLimitError)
+
+from instrumentation import record_dependency, timed
+
+# --- AI Gateway ---
+# Wraps the OpenRouter chat-completions client with a pooled HTTP connection,
+# an overall deadline per call, retries with jittered backoff for rate limits
+# and transient errors, a circuit breaker, and coalescing of identical
+# in-flight prompts into a single upstream request. The original openai
+# exceptions are re-raised so callers keep their existing error mapping.
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker is rejecting calls to the upstream API."""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a call cannot finish before its deadline."""
+
+
+class CircuitBreaker:
+    """Opens after consecutive upstream failures and lets one trial call through after a cool-down.
+
+    allow() hands the trial call a token. Whatever way the trial ends, it must
+    settle the breaker: record_success() or record_failure(), or settle(token)
+    in a `finally`, which re-opens the breaker when neither was recorded.
+    Otherwise every later call would be rejected while it stays half-open.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Returns True for a normal call, a trial token for the half-open trial, or False to reject."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial = object()
+                return self._trial
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = None
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def settle(self, admission):
+        """Re-opens the breaker if `admission` is a trial that ended without recording an outcome."""
+        with self._lock:
+            if admission is not True and admission is not None and admission is self._trial:
+                self._trial = None
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+
+
+def _retry_after(error):
+    """Returns the server's Retry-After hint in seconds, if it sent one."""
+    response = getattr(error, 'response', None)
+    try:
+        return float(response.headers.get('retry-after'))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class AIGateway:
+    """Chat-completions client with pooling, deadlines, retries, a circuit breaker and request coalescing."""
+
+    def __init__(self, api_key, base_url, default_headers=None, timeout=10.0, deadline=20.0,
+                 max_retries=3, backoff_base=0.5, backoff_max=8.0, max_connections=20,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.default_headers = default_headers or {}
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # Retries are handled here, so the SDK's own retry loop is disabled.
+        self.client = OpenAI(
+            base_url=base_url, api_key=api_key, default_headers=self.default_headers,
+            max_retries=0, timeout=timeout, http_client=httpx.Client(limits=self.limits, timeout=timeout),
+        )
+        self._async_client = None
+        self._inflight = {}
+        self._async_inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'upstream': 0, 'coalesced': 0, 'retries': 0, 'rejected': 0, 'errors': 0}
+
+    @property
+    def async_client(self):
+        """AsyncOpenAI client, created on first use inside the serving event loop."""
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(
+                base_url=self.base_url, api_key=self.api_key, default_headers=self.default_headers,
+                max_retries=0, timeout=self.timeout,
+                http_client=httpx.AsyncClient(limits=self.limits, timeout=self.timeout),
+            )
+        return self._async_client
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['circuit'] = self.breaker.state
+        stats['inFlight'] = len(self._inflight) + len(self._async_inflight)
+        return stats
+
+    @staticmethod
+    def request_key(model, messages, **params):
+        payload = json.dumps({'model': model, 'messages': messages, **params}, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _backoff(self, attempt, error):
+        hint = _retry_after(error)
+        if hint is not None:
+            return min(hint, self.backoff_max)
+        return min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+    def _plan_attempt(self, attempt, started, deadline, error, admission=True):
+        """Returns the delay before the next retry, or None if the error should be raised."""
+        if attempt >= self.max_retries or admission is not True:
+            # A half-open trial is not retried: its failure re-opens the breaker.
+            return None
+        delay = self._backoff(attempt, error)
+        if time.monotonic() + delay - started >= deadline:
+            return None
+        return delay
+
+    def _check_breaker(self):
+        """Returns the breaker admission (True, or a trial token) for one upstream attempt."""
+        admission = self.breaker.allow()
+        if not admission:
+            self._count('rejected')
+            raise CircuitOpenError('AI service temporarily unavailable (circuit open)')
+        return admission
+
+    def _record_error(self, error):
+        self._count('errors')
+        if isinstance(error, RETRYABLE_ERRORS) or (isinstance(error, APIStatusError) and error.status_code >= 500):
+            self.breaker.record_failure()
+        elif isinstance(error, APIStatusError):
+            # A 4xx is the request's fault; the upstream answered, so it counts as healthy.
+            self.breaker.record_success()
+
+    def _deadline_exceeded(self, deadline, what='call'):
+        self._count('errors')
+        self.breaker.record_failure()
+        return DeadlineExceededError(f'AI {what} exceeded its {deadline:.1f}s deadline')
+
+    # --- Synchronous interface ---
+    def _call(self, model, messages, deadline, params):
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                raise DeadlineExceededError(f'AI call exceeded its {deadline:.1f}s deadline')
+            admission = self._check_breaker()
+            try:
+                self._count('upstream')
+                with timed('llm', 'chat'):
+                    response = self.client.chat.completions.create(
+                        model=model, messages=messages, timeout=min(self.timeout, remaining), **params)
+            except RETRYABLE_ERRORS as e:
+                delay = self._plan_attempt(attempt, started, deadline, e, admission)
+                if delay is None:
+                    self._record_error(e)
+                    raise
+                self._count('retries')
+                attempt += 1
+                time.sleep(delay)
+                continue
+            except Exception as e:
+                self._record_error(e)
+                raise
+            else:
+                self.breaker.record_success()
+            finally:
+                self.breaker.settle(admission)
+            return response.choices[0].message.content
+
+    def chat(self, model, messages, deadline=None, **params):
+        """Returns the completion text; identical concurrent calls share one upstream request."""
+        self._count('calls')
+        key = self.request_key(model, messages, **params)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            self._count('coalesced')
+            return future.result()
+        try:
+            result = self._call(model, messages, deadline or self.deadline, params)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stream(self, model, messages, deadline=None, **params):
+        """Yields completion text deltas as they arrive. Streams are not coalesced or retried mid-stream."""
+        self._count('calls')
+        deadline = deadline or self.deadline
+        started = time.monotonic()
+        attempt = 0
+        admission = None
+        try:
+            while True:
+                admission = self._check_breaker()
+                try:
+                    self._count('upstream')
+                    chunks = self.client.chat.completions.create(
+                        model=model, messages=messages, stream=True, timeout=self.timeout, **params)
+                    break
+                except RETRYABLE_ERRORS as e:
+                    delay = self._plan_attempt(attempt, started, deadline, e, admission)
+                    if delay is None:
+                        self._record_error(e)
+                        raise
+                    self._count('retries')
+                    attempt += 1
+                    time.sleep(delay)
+                except Exception as e:
+                    self._record_error(e)
+                    raise
+            try:
+                for chunk in chunks:
+                    if time.monotonic() - started > deadline:
+                        raise self._deadline_exceeded(deadline, 'stream')
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except DeadlineExceededError:
+                raise
+            except GeneratorExit:
+                # The consumer stopped reading; the upstream was answering fine.
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                self._record_error(e)
+                raise
+            finally:
+                chunks.close()
+                record_dependency('llm', 'stream', time.monotonic() - started)
+            self.breaker.record_success()
+        finally:
+            self.breaker.settle(admission)
+
+    # --- Asyncio interface ---
+    async def _acall(self, model, messages, deadline, params):
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                raise DeadlineExceededError(f'AI call exceeded its {deadline:.1f}s deadline')
+            admission = self._check_breaker()
+            try:
+                self._count('upstream')
+                with timed('llm', 'chat'):
+                    # Same per-attempt timeout as _call: the SDK raises APITimeoutError, which is retried.
+                    response = await self.async_client.chat.completions.create(
+                        model=model, messages=messages, timeout=min(self.timeout, remaining), **params)
+            except RETRYABLE_ERRORS as e:
+                delay = self._plan_attempt(attempt, started, deadline, e, admission)
+                if delay is None:
+                    self._record_error(e)
+                    raise
+                self._count('retries')
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except Exception as e:
+                self._record_error(e)
+                raise
+            else:
+                self.breaker.record_success()
+            finally:
+                # Also covers cancellation, which is not an Exception.
+                self.breaker.settle(admission)
+            return response.choices[0].message.content
+
+    async def achat(self, model, messages, deadline=None, **params):
+        """Async version of chat(); identical concurrent calls on the same loop share one task."""
+        self._count('calls')
+        key = (id(asyncio.get_running_loop()), self.request_key(model, messages, **params))
+        task = self._async_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._acall(model, messages, deadline or self.deadline, params))
+            self._async_inflight[key] = task
+            task.add_done_callback(lambda _: self._async_inflight.pop(key, None))
+        else:
+            self._count('coalesced')
+        return await asyncio.shield(task)
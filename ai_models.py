@@ -1,16 +1,28 @@
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
+import numpy as np
 import os
 import json
-from openai import OpenAI, AuthenticationError, RateLimitError, APIConnectionError, APIStatusError
+import threading
+from openai import AuthenticationError, RateLimitError
+from ai_gateway import AIGateway
+from ai_cache import ResponseCache, make_cache_key, normalize_text
+from symptom_classifier import TRAINING_DATA, train_symptom_classifier
+from instrumentation import timed
+from model_store import data_fingerprint, load_or_fit
+from scheduler_model import TIME_SLOTS, SchedulerRegistry, weekday_of
 
 # This will be our custom client for OpenRouter
 client = None
+gateway = None
 IS_AI_CONFIGURED = False
 
 def initialize_ai_client():
-    """Initializes the AI client with the OpenRouter API key and base URL."""
-    global client, IS_AI_CONFIGURED
+    """Initializes the AI gateway with the OpenRouter API key and base URL.
+
+    OPENROUTER_BASE_URL can point the gateway at a local stub server
+    (see stub_llm_server.py). AI_TIMEOUT and AI_DEADLINE bound each upstream
+    attempt and the whole call, including retries.
+    """
+    global client, gateway, IS_AI_CONFIGURED
     
     api_key = os.environ.get("OPENROUTER_API_KEY")
     if not api_key:
@@ -18,101 +30,321 @@ def initialize_ai_client():
         IS_AI_CONFIGURED = False
         return
 
-    client = OpenAI(
-      base_url="https://openrouter.ai/api/v1",
+    gateway = AIGateway(
+      base_url=os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
       api_key=api_key,
       default_headers={
           "HTTP-Referer": "http://localhost:5000", 
           "X-Title": "MediSmart AI",
       },
+      timeout=float(os.environ.get("AI_TIMEOUT", 10)),
+      deadline=float(os.environ.get("AI_DEADLINE", 20)),
+      max_retries=int(os.environ.get("AI_MAX_RETRIES", 3)),
+      max_connections=int(os.environ.get("AI_MAX_CONNECTIONS", 20)),
     )
+    client = gateway.client
     IS_AI_CONFIGURED = True
     print("--- OpenRouter AI Client Initialized ---")
 
-initialize_ai_client()
+AI_MODEL = "mistralai/mistral-7b-instruct:free"
+
+# --- LLM Response Cache ---
+# Repeated symptom checks and diet requests are answered from here instead of
+# going back to OpenRouter. Only successful completions are cached.
+response_cache = ResponseCache(
+    maxsize=int(os.environ.get('AI_CACHE_SIZE', 1024)),
+    ttl=int(os.environ.get('AI_CACHE_TTL', 86400)),
+)
+
+# Bump when the key normalization changes, so persisted entries made under the old keys are never served.
+CACHE_KEY_VERSION = '3'
+
+def _cacheable(text, normalized):
+    # Text that normalizes to nothing (emoji, symbols) would share one key
+    # with every other such query, so it is never cached.
+    return bool(normalized) or not str(text or '').strip()
+
+def symptom_cache_key(symptoms):
+    """Returns the cache key for a symptom check, or None if it must not be cached."""
+    text = normalize_text(symptoms)
+    if not text:
+        return None
+    return make_cache_key('symptom', CACHE_KEY_VERSION, AI_MODEL, text)
+
+def diet_cache_key(disease, user_details):
+    """Returns the cache key for a diet request, or None if it must not be cached."""
+    disease_text, details_text = normalize_text(disease), normalize_text(user_details)
+    if not disease_text or not _cacheable(user_details, details_text):
+        return None
+    return make_cache_key('diet', CACHE_KEY_VERSION, AI_MODEL, disease_text, details_text)
+
+def get_ai_cache_stats():
+    return response_cache.get_stats()
+
+def get_ai_gateway_stats():
+    return gateway.get_stats() if gateway else {'configured': False}
 
 # --- AI Model 1: Schedule Optimizer (Scikit-learn) ---
-# This local model does not need to change.
+# Suggestions come from the learned scheduler (scheduler_model.py) once it has
+# been trained on the booking history. Until then, and for malformed dates,
+# the small default model below scores one table shared by all doctors. It is
+# fitted once and stored by model_store, so processes load the artifact on
+# first use instead of fitting on boot.
 scheduler_data = {
     'hour': [9, 10, 11, 12, 13, 14, 15, 16, 9.5, 10.5, 11.5, 12.5, 13.5, 14.5, 15.5, 16.5],
     'is_booked': [1, 1, 0, 1, 0, 1, 0, 1, 1, 0, 1, 0, 1, 1, 0, 0],
     'is_optimal': [1, 1, 1, 0, 0, 0, 0, 0, 1, 1, 0, 0, 0, 0, 1, 1]
 }
-scheduler_df = pd.DataFrame(scheduler_data)
-X_scheduler = scheduler_df[['hour', 'is_booked']]
-y_scheduler = scheduler_df['is_optimal']
-scheduler_model = LogisticRegression()
-scheduler_model.fit(X_scheduler, y_scheduler)
 
-def get_schedule_suggestions(doctor_name, selected_date, appointments_collection):
+def fit_scheduler_model():
+    from sklearn.linear_model import LogisticRegression
+
+    X_scheduler = np.column_stack((scheduler_data['hour'], scheduler_data['is_booked']))
+    y_scheduler = np.array(scheduler_data['is_optimal'])
+    return LogisticRegression().fit(X_scheduler, y_scheduler)
+
+SCHEDULER_FINGERPRINT = data_fingerprint(scheduler_data)
+
+scheduler_model = None
+_model_lock = threading.Lock()
+
+def get_scheduler_model():
+    global scheduler_model
+    if scheduler_model is None:
+        with _model_lock:
+            if scheduler_model is None:
+                scheduler_model = load_or_fit('scheduler', fit_scheduler_model, fingerprint=SCHEDULER_FINGERPRINT)
+    return scheduler_model
+
+# The bookable grid is fixed (09:00-16:30 in half-hour steps), so every slot is
+# scored once per model and requests only have to drop the booked times.
+SLOT_HOURS = np.array([h + (0.5 if m == 30 else 0) for h in range(9, 17) for m in (0, 30)])
+
+_slot_score_table = ()
+_slot_score_model = None
+
+def refresh_slot_score_table(model=None):
+    """Scores the whole slot grid in one batched predict call and caches the result."""
+    global _slot_score_table, _slot_score_model
+    model = model if model is not None else get_scheduler_model()
+    features = np.column_stack((SLOT_HOURS, np.zeros_like(SLOT_HOURS)))
+    with timed('sklearn', 'slot_scores'):
+        predictions = model.predict(features)
+    _slot_score_table = tuple(
+        (slot, 'optimal' if prediction == 1 else 'busy')
+        for slot, prediction in zip(TIME_SLOTS, predictions)
+    )
+    _slot_score_model = model
+    return _slot_score_table
+
+def get_default_slot_score_table():
+    """Returns the default model's cached (slot, status) table, rebuilding it if the model was swapped."""
+    if scheduler_model is None or _slot_score_model is not scheduler_model:
+        return refresh_slot_score_table()
+    return _slot_score_table
+
+# Checks for a newly published learned scheduler at most once a minute.
+scheduler_registry = SchedulerRegistry(check_interval=float(os.environ.get('SCHEDULER_RELOAD_INTERVAL', 60)))
+
+def get_slot_score_table(doctor_name=None, selected_date=None):
+    """Returns the (slot, status) table for a doctor and date, falling back to the default model."""
+    if doctor_name and selected_date:
+        learned = scheduler_registry.get()
+        if learned is not None:
+            try:
+                weekday = weekday_of(selected_date)
+            except (TypeError, ValueError):
+                return get_default_slot_score_table()
+            with timed('sklearn', 'learned_scheduler'):
+                return learned.score_table(doctor_name, weekday)
+    return get_default_slot_score_table()
+
+def get_scheduler_stats():
+    return scheduler_registry.get_stats()
+
+def suggest_free_slots(booked_slots, score_table=None):
+    """Returns the scored suggestions for a day, given the set of already booked times."""
+    score_table = score_table if score_table is not None else get_default_slot_score_table()
+    return [{'time': slot, 'status': status} for slot, status in score_table if slot not in booked_slots]
+
+def get_schedule_suggestions(doctor_name, selected_date, slot_ledger):
     """Provides scikit-learn driven time slot suggestions."""
-    time_slots = [f"{h:02d}:{m:02d}" for h in range(9, 17) for m in (0, 30)]
-    booked_slots = {app['time'] for app in appointments_collection.find({'doctorName': doctor_name, 'date': selected_date})}
-    suggestions = []
-    for slot in time_slots:
-        if slot in booked_slots:
-            continue
-        hour = int(slot.split(':')[0]) + (0.5 if slot.endswith(':30') else 0)
-        prediction_data = pd.DataFrame({'hour': [hour], 'is_booked': [0]})
-        prediction = scheduler_model.predict(prediction_data)[0]
-        status = 'optimal' if prediction == 1 else 'busy'
-        suggestions.append({'time': slot, 'status': status})
-    return suggestions
+    return suggest_free_slots(slot_ledger.booked_times(doctor_name, selected_date),
+                              get_slot_score_table(doctor_name, selected_date))
 
 
 # --- AI Model 2: Symptom Checker (OpenRouter) ---
+def symptom_messages(symptoms):
+    prompt = f'A user has described their symptoms as: "{symptoms}". Based on these symptoms, what is the most likely medical specialist they should see? Please provide only the specialist name, for example: "Cardiologist".'
+    return [
+        {"role": "system", "content": "You are a helpful medical assistant. Respond with only the name of a single medical specialty."},
+        {"role": "user", "content": prompt}
+    ]
+
 def get_symptom_recommendation_openai(symptoms):
     """Provides a specialist recommendation based on symptoms using OpenRouter."""
     if not IS_AI_CONFIGURED:
         return {'recommendation': "a General Physician (AI service not configured)."}
     
-    prompt = f'A user has described their symptoms as: "{symptoms}". Based on these symptoms, what is the most likely medical specialist they should see? Please provide only the specialist name, for example: "Cardiologist".'
-    
+    cache_key = symptom_cache_key(symptoms)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        response = client.chat.completions.create(
-            model="mistralai/mistral-7b-instruct:free",
-            messages=[
-                {"role": "system", "content": "You are a helpful medical assistant. Respond with only the name of a single medical specialty."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1, max_tokens=50
-        )
         # ** THE FIX IS HERE: Directly use the text response **
-        recommendation_text = response.choices[0].message.content
-        return {'recommendation': f"a {recommendation_text}"}
+        recommendation_text = gateway.chat(AI_MODEL, symptom_messages(symptoms), temperature=0.1, max_tokens=50)
+        result = {'recommendation': f"a {recommendation_text}"}
+        response_cache.set(cache_key, result)
+        return result
+    except Exception as e:
+        print(f"OpenRouter Error (Symptom Checker): {e}")
+        return {'recommendation': "Could not get a recommendation due to an API error."}
+
+async def get_symptom_recommendation_openai_async(symptoms):
+    """Asyncio variant of get_symptom_recommendation_openai for async servers."""
+    if not IS_AI_CONFIGURED:
+        return {'recommendation': "a General Physician (AI service not configured)."}
+
+    cache_key = symptom_cache_key(symptoms)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        recommendation_text = await gateway.achat(AI_MODEL, symptom_messages(symptoms), temperature=0.1, max_tokens=50)
+        result = {'recommendation': f"a {recommendation_text}"}
+        response_cache.set(cache_key, result)
+        return result
     except Exception as e:
         print(f"OpenRouter Error (Symptom Checker): {e}")
         return {'recommendation': "Could not get a recommendation due to an API error."}
 
 
+# --- AI Model 2a: Local Symptom Classifier (Scikit-learn) ---
+# Answers confident cases locally; everything else falls through to OpenRouter.
+# Set SYMPTOM_CLASSIFIER_THRESHOLD above 1 to always use the LLM.
+SYMPTOM_CLASSIFIER_THRESHOLD = float(os.environ.get('SYMPTOM_CLASSIFIER_THRESHOLD', 0.55))
+SYMPTOM_CLASSIFIER_FINGERPRINT = data_fingerprint(TRAINING_DATA)
+symptom_classifier = None
+
+def get_symptom_classifier():
+    global symptom_classifier
+    if symptom_classifier is None:
+        with _model_lock:
+            if symptom_classifier is None:
+                classifier = load_or_fit('symptom_classifier', train_symptom_classifier,
+                                         fingerprint=SYMPTOM_CLASSIFIER_FINGERPRINT)
+                classifier.threshold = SYMPTOM_CLASSIFIER_THRESHOLD
+                symptom_classifier = classifier
+    return symptom_classifier
+
+def get_symptom_recommendation(symptoms):
+    """Recommends a specialist, using the local classifier first and the LLM when it is unsure."""
+    classifier = get_symptom_classifier()
+    with timed('sklearn', 'symptom_classifier'):
+        specialist = classifier.classify(symptoms)
+    if specialist is not None:
+        article = 'an' if specialist[0] in 'AEIOU' else 'a'
+        return {'recommendation': f"{article} {specialist}"}
+    return get_symptom_recommendation_openai(symptoms)
+
+
 # --- AI Model 3: NutriAI Diet Planner (OpenRouter) ---
+def diet_messages(disease, user_details):
+    prompt = f"Generate a concise diet recommendation in a single paragraph for a patient with {disease} and the following notes: {user_details}"
+    return [
+        {"role": "system", "content": "You are an expert AI nutritionist. Respond with a single paragraph outlining a diet plan."},
+        {"role": "user", "content": prompt}
+    ]
+
+def diet_error_message(error):
+    """Maps an OpenRouter error to the message shown to NutriAI users."""
+    if isinstance(error, AuthenticationError):
+        return "Authentication Error: Your OpenRouter API key is invalid. Please check your .env file."
+    if isinstance(error, RateLimitError):
+        return "Rate Limit Error: You have exceeded your OpenRouter quota. Please check your account usage."
+    print(f"OpenRouter Error (NutriAI): An unexpected error occurred -> {error}")
+    return "An unexpected error occurred. Please check the server logs."
+
 def get_diet_recommendation_openai(disease, user_details):
     """Generates a diet recommendation using OpenRouter."""
     if not IS_AI_CONFIGURED:
         return {'diet': "A general balanced diet (AI service not configured)."}
 
-    prompt = f"Generate a concise diet recommendation in a single paragraph for a patient with {disease} and the following notes: {user_details}"
-    
+    cache_key = diet_cache_key(disease, user_details)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     try:
-        response = client.chat.completions.create(
-            model="mistralai/mistral-7b-instruct:free",
-            messages=[
-                {"role": "system", "content": "You are an expert AI nutritionist. Respond with a single paragraph outlining a diet plan."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5, max_tokens=300
-        )
         # ** THE FIX IS HERE: We no longer need to parse JSON. We just use the text directly. **
-        result_text = response.choices[0].message.content
-        return {'diet': result_text}
-    
-    except AuthenticationError:
-        error_message = "Authentication Error: Your OpenRouter API key is invalid. Please check your .env file."
-        return {'diet': error_message}
-    except RateLimitError:
-        error_message = "Rate Limit Error: You have exceeded your OpenRouter quota. Please check your account usage."
-        return {'diet': error_message}
+        result_text = gateway.chat(AI_MODEL, diet_messages(disease, user_details), temperature=0.5, max_tokens=300)
+    except Exception as e:
+        return {'diet': diet_error_message(e)}
+    result = {'diet': result_text}
+    response_cache.set(cache_key, result)
+    return result
+
+async def get_diet_recommendation_openai_async(disease, user_details):
+    """Asyncio variant of get_diet_recommendation_openai for async servers."""
+    if not IS_AI_CONFIGURED:
+        return {'diet': "A general balanced diet (AI service not configured)."}
+
+    cache_key = diet_cache_key(disease, user_details)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        result_text = await gateway.achat(AI_MODEL, diet_messages(disease, user_details), temperature=0.5, max_tokens=300)
     except Exception as e:
-        error_message = "An unexpected error occurred. Please check the server logs."
-        print(f"OpenRouter Error (NutriAI): An unexpected error occurred -> {e}")
-        return {'diet': error_message}
\ No newline at end of file
+        return {'diet': diet_error_message(e)}
+    result = {'diet': result_text}
+    response_cache.set(cache_key, result)
+    return result
+
+def stream_diet_recommendation_openai(disease, user_details):
+    """Yields ('token', text) events as the diet plan streams in, then ('done', full_text).
+
+    Errors are reported as a final ('error', message) event using the same
+    messages as get_diet_recommendation_openai.
+    """
+    if not IS_AI_CONFIGURED:
+        message = "A general balanced diet (AI service not configured)."
+        yield 'token', message
+        yield 'done', message
+        return
+
+    cache_key = diet_cache_key(disease, user_details)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        yield 'token', cached['diet']
+        yield 'done', cached['diet']
+        return
+
+    parts = []
+    try:
+        for delta in gateway.stream(AI_MODEL, diet_messages(disease, user_details), temperature=0.5, max_tokens=300):
+            parts.append(delta)
+            yield 'token', delta
+    except Exception as e:
+        yield 'error', diet_error_message(e)
+        return
+    result_text = ''.join(parts)
+    response_cache.set(cache_key, {'diet': result_text})
+    yield 'done', result_text
+
+
+# --- Model Warm-up ---
+# Fitters and training-data fingerprints for `python model_store.py --fit`.
+MODEL_FITTERS = {
+    'scheduler': (fit_scheduler_model, SCHEDULER_FINGERPRINT),
+    'symptom_classifier': (train_symptom_classifier, SYMPTOM_CLASSIFIER_FINGERPRINT),
+}
+
+def warm_models():
+    """Loads the scikit-learn models now rather than on the first request that needs them."""
+    get_default_slot_score_table()
+    scheduler_registry.refresh()
+    get_symptom_classifier()
@@ -1,175 +1,245 @@
+import csv
 import os
+import json
+import hmac
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, session, stream_with_context
 from flask_cors import CORS
 from flask_mail import Mail, Message
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from pymongo import MongoClient
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
+from pymongo.errors import DuplicateKeyError
 from werkzeug.security import generate_password_hash, check_password_hash
 from bson.objectid import ObjectId
-from fpdf import FPDF
 from dotenv import load_dotenv
 
 # --- Load environment variables ---
 load_dotenv()
 
+from config import Config
+
 # --- Import AI models from the dedicated module ---
-from ai_models import get_schedule_suggestions, get_symptom_recommendation_openai, get_diet_recommendation_openai
+from ai_models import get_schedule_suggestions, get_symptom_recommendation, get_diet_recommendation_openai, stream_diet_recommendation_openai, response_cache, get_ai_cache_stats, get_ai_gateway_stats, initialize_ai_client, warm_models, get_scheduler_stats, scheduler_registry
+from availability import get_availability_matrix, parse_availability_request
+from jobs import JobQueue, WorkerPool
+from pdf_renderer import confirmation_renderer, confirmation_filename
+from db_indexes import ensure_indexes
+from pagination import json_list_response
+from user_cache import UserCache, SNAPSHOT_SESSION_KEY
+from change_feed import MAX_TZ_OFFSET, ChangeFeed, parse_time, parse_tz_offset
+from slot_ledger import SlotLedger, SlotTakenError
+import instrumentation
+from instrumentation import MongoCommandTimer, RequestProfiler, timed
+from db_client import ProcessLocalMongo
+from scheduler_model import retrain as retrain_scheduler
+import bulk_io
+from doctor_search import FILTER_KEYS_FIELD, DoctorSearch, backfill_filter_keys, filter_keys, parse_search_args
+import health_series
 
 # --- Initialize Flask Application ---
+# Settings live in config.py and are applied by create_app(); importing this
+# module does no I/O, so a preloading server can fork it cheaply.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 app = Flask(
     __name__,
     template_folder=os.path.join(BASE_DIR, 'templates'),
     static_folder=os.path.join(BASE_DIR, 'static')
 )
-app.config['SECRET_KEY'] = os.urandom(24)
+app.config.from_object(Config)
 CORS(app)
-
-# --- Mail Configuration ---
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.environ.get('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.environ.get('MAIL_PASSWORD')
-app.config['MAIL_DEFAULT_SENDER'] = os.environ.get('MAIL_USERNAME')
-mail = Mail(app)
+mail = Mail()
 
 # --- MongoDB Configuration ---
-client = MongoClient('mongodb://localhost:27017/')
-db = client['medismart_db']
+# Collections resolve against a MongoClient owned by the current process (see db_client.py).
+mongo = ProcessLocalMongo(Config.MONGO_URI, Config.MONGO_DB, event_listeners=[MongoCommandTimer()])
+db = mongo.database()
 users_collection = db['users']
 doctors_collection = db['doctors']
 appointments_collection = db['appointments']
 contacts_collection = db['contacts']
 consultations_collection = db['consultations']
 health_records_collection = db['health_records']
+health_series_collection = db['health_series']
 medications_collection = db['medications']
+jobs_collection = db['jobs']
+slot_ledger_collection = db['slot_ledger']
+slot_ledger = SlotLedger(slot_ledger_collection)
+ai_cache_collection = db['ai_cache']
+user_invalidations_collection = db['user_invalidations']
+# Cancelled appointments are deleted; this keeps what the learned scheduler needs.
+cancellations_collection = db['appointment_cancellations']
+counters_collection = db['counters']
+
+# --- Doctor Directory Search (see doctor_search.py) ---
+doctor_search = DoctorSearch(doctors_collection, counters_collection, mode=Config.DOCTOR_SEARCH_MODE,
+                             check_interval=Config.DOCTOR_SEARCH_CHECK_INTERVAL)
+
+# --- Background Jobs ---
+job_queue = JobQueue(jobs_collection)
+job_workers = WorkerPool(job_queue, size=Config.JOB_WORKERS)
+
+# --- List Projections & Sort Orders ---
+# Only the fields the front-end scripts read are returned by the list endpoints.
+APPOINTMENT_LIST_FIELDS = {'patientName': 1, 'doctorName': 1, 'date': 1, 'time': 1, 'appointmentType': 1}
+# _id breaks ties on (date, time) for patients and doctors alike, so keyset pages
+# never skip or repeat an appointment even if a (doctor, date, time) duplicate slips in.
+APPOINTMENT_SORT = [('date', 1), ('time', 1), ('_id', 1)]
+DOCTOR_LIST_FIELDS = {'name': 1, 'domain': 1, 'degree': 1, 'specialization': 1, 'experience': 1,
+                      'hospitalName': 1, 'hospitalLocation': 1, 'contact': 1, 'image': 1}
+DOCTOR_LIST_SORT = [('_id', 1)]
+HEALTH_RECORD_LIST_FIELDS = {'metric': 1, 'value': 1, 'date': 1}
+HEALTH_RECORD_LIST_SORT = [('date', -1), ('_id', -1)]
+MEDICATION_LIST_FIELDS = {'name': 1, 'dosage': 1, 'time': 1}
+MEDICATION_LIST_SORT = [('_id', 1)]
+
+# --- ElderCare Change Feed (CHANGE_FEED_MODE: auto, changestream or bus) ---
+change_feed = ChangeFeed(db, {
+    'appointments': APPOINTMENT_LIST_FIELDS,
+    'medications': MEDICATION_LIST_FIELDS,
+    'health_records': HEALTH_RECORD_LIST_FIELDS,
+}, mode=Config.CHANGE_FEED_MODE)
 
 # --- Flask-Login Configuration ---
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
-class User(UserMixin):
-    """User model for Flask-Login."""
+class User:
+    """User model for Flask-Login. Slotted because instances are cached per process."""
+    __slots__ = ('id', 'email', 'name', 'role')
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
     def __init__(self, user_data):
         self.id = str(user_data['_id'])
         self.email = user_data['email']
         self.name = user_data['name']
         self.role = user_data['role']
 
+    def get_id(self):
+        return self.id
+
+    def __eq__(self, other):
+        return isinstance(other, User) and self.id == other.id
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+user_cache = UserCache(
+    maxsize=int(os.environ.get('USER_CACHE_SIZE', 10000)),
+    ttl=int(os.environ.get('USER_CACHE_TTL', 300)),
+    snapshot_ttl=int(os.environ.get('USER_SNAPSHOT_TTL', 900)),
+    sync_interval=float(os.environ.get('USER_CACHE_SYNC_INTERVAL', 5)),
+)
+
+def remember_user(user):
+    """Caches the user and stores a snapshot in the session so later requests skip MongoDB."""
+    user_cache.put(user)
+    session[SNAPSHOT_SESSION_KEY] = user_cache.make_snapshot(user)
+
+def invalidate_user(user_id):
+    """Call after changing a user's profile or role so the cached principal is rebuilt in every process."""
+    user_cache.invalidate(str(user_id))
+
+def update_user(user_id, changes):
+    """Writes profile, password or role changes and invalidates the cached user. Returns True if the user exists."""
+    result = users_collection.update_one({'_id': ObjectId(user_id)}, {'$set': changes})
+    if result.matched_count:
+        invalidate_user(user_id)
+    return bool(result.matched_count)
+
 @login_manager.user_loader
 def load_user(user_id):
-    """Loads a user from the database."""
-    user_data = users_collection.find_one({'_id': ObjectId(user_id)})
-    return User(user_data) if user_data else None
+    """Loads a user from the process cache, the session snapshot, or the database."""
+    user_cache.sync()
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    snapshot = user_cache.read_snapshot(session.get(SNAPSHOT_SESSION_KEY), user_id)
+    if snapshot is not None:
+        user_cache.record('snapshotHits')
+        user = User({'_id': snapshot['id'], 'email': snapshot['email'], 'name': snapshot['name'], 'role': snapshot['role']})
+        user_cache.put(user)
+        return user
+    user_cache.record('dbLoads')
+    try:
+        user_data = users_collection.find_one({'_id': ObjectId(user_id)}, {'email': 1, 'name': 1, 'role': 1})
+    except Exception:
+        return None
+    if not user_data:
+        return None
+    user = User(user_data)
+    remember_user(user)
+    return user
 
 # --- PDF & Email Helper Functions ---
 def create_appointment_pdf(appointment_data):
-    """Generates a beautifully formatted PDF confirmation for an appointment."""
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # --- Header ---
-    pdf.set_font("Arial", "B", 20)
-    pdf.set_text_color(0, 119, 182)  # Blue color
-    pdf.cell(0, 15, "MediSmart AI", 0, 1, 'C')
-    pdf.set_font("Arial", "", 12)
-    pdf.set_text_color(100, 100, 100) # Gray color
-    pdf.cell(0, 8, "Your Appointment Confirmation", 0, 1, 'C')
-    pdf.ln(15)
-
-    # --- Details Section with Border ---
-    pdf.set_font("Arial", "", 12)
-    pdf.set_text_color(0, 0, 0) # Black color
-    pdf.set_draw_color(220, 220, 220) # Light gray border
-    pdf.set_line_width(0.5)
-    
-    # Calculate content width
-    page_width = pdf.w
-    margin = 20
-    content_width = page_width - (2 * margin)
-    
-    # Get y position before drawing the box
-    y_before_box = pdf.get_y()
-    
-    # Set a consistent left margin for the text inside the box
-    text_x_pos = margin + 5
-    
-    # --- Draw content first to calculate height ---
-    pdf.set_xy(text_x_pos, y_before_box + 5)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(40, 10, "Patient:", 0, 0)
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, appointment_data['patientName'], 0, 1)
-
-    pdf.set_x(text_x_pos)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(40, 10, "Doctor:", 0, 0)
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, f"Dr. {appointment_data['doctorName']}", 0, 1)
-
-    pdf.set_x(text_x_pos)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(40, 10, "Date:", 0, 0)
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, appointment_data['date'], 0, 1)
-    
-    pdf.set_x(text_x_pos)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(40, 10, "Time:", 0, 0)
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, appointment_data['time'], 0, 1)
-
-    pdf.set_x(text_x_pos)
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(40, 10, "Type:", 0, 0)
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, appointment_data['appointmentType'], 0, 1)
-    
-    # Conditionally add Hospital Location for Offline appointments
-    if appointment_data.get('appointmentType') == 'Offline':
-        pdf.set_x(text_x_pos)
-        pdf.set_font("Arial", "B", 12)
-        pdf.cell(40, 10, "Location:", 0, 0)
-        pdf.set_font("Arial", "", 12)
-        pdf.multi_cell(content_width - 50, 10, f"{appointment_data.get('hospitalName', 'N/A')}, {appointment_data.get('hospitalLocation', 'N/A')}", 0, 'L')
-
-    pdf.ln(5) # Add padding at the bottom
-    y_after_content = pdf.get_y()
-    
-    # Calculate the total height of the box
-    box_height = y_after_content - y_before_box
-    
-    # Draw the rounded rectangle (border) around the content area
-    pdf.rounded_rect(margin, y_before_box, content_width, box_height, 5, 'D')
-
-    # --- Footer ---
-    pdf.set_y(-40)
-    pdf.set_font("Arial", "I", 10)
-    pdf.set_text_color(150, 150, 150)
-    pdf.multi_cell(0, 5, "Thank you for choosing MediSmart AI. Please arrive 15 minutes early for offline appointments. If you need to cancel, please do so from your dashboard.", 0, 'C')
-
-    path = os.path.join(BASE_DIR, f"appointment_{appointment_data['_id']}.pdf")
-    pdf.output(path)
-    return path
-
-
-def send_appointment_email(recipient_email, attachment_path):
-    """Sends a confirmation email with the PDF attachment."""
+    """Renders the PDF confirmation for an appointment in memory and returns the bytes."""
+    return confirmation_renderer.render(appointment_data)
+
+
+def send_appointment_email(recipient_email, pdf_bytes, filename, connection=None):
+    """Sends a confirmation email with the PDF attachment, optionally over an open SMTP connection."""
     try:
         msg = Message("Your MediSmart AI Appointment Confirmation", recipients=[recipient_email])
         msg.body = "Dear Patient,\n\nPlease find your appointment details attached.\n\nThank you for choosing MediSmart AI."
-        with app.open_resource(attachment_path) as fp:
-            msg.attach(os.path.basename(attachment_path), "application/pdf", fp.read())
-        mail.send(msg)
+        msg.attach(filename, "application/pdf", pdf_bytes)
+        with timed('smtp', 'send'):
+            (connection or mail).send(msg)
         return True
     except Exception as e:
         print(f"Error sending email: {e}")
         return False
 
+@job_queue.register('appointment_confirmation')
+def appointment_confirmation_job(payload):
+    """Renders and emails the confirmation PDF for a booked appointment."""
+    appointment = appointments_collection.find_one({'_id': ObjectId(payload['appointmentId'])})
+    if appointment is None:
+        return  # Cancelled before the confirmation went out
+    pdf_bytes = create_appointment_pdf(appointment)
+    with app.app_context():
+        if not send_appointment_email(appointment['patientEmail'], pdf_bytes, confirmation_filename(appointment)):
+            raise RuntimeError('Confirmation email could not be sent')
+
+@job_queue.register('doctor_day_confirmations')
+def doctor_day_confirmations_job(payload):
+    """Re-sends confirmations for all of a doctor's appointments on one day."""
+    appointments = appointments_collection.find({'doctorName': payload['doctorName'], 'date': payload['date']})
+    with app.app_context(), mail.connect() as connection:
+        for appointment, pdf_bytes in confirmation_renderer.render_many(appointments):
+            if not send_appointment_email(appointment['patientEmail'], pdf_bytes, confirmation_filename(appointment), connection):
+                # Retry just this patient instead of re-sending the whole day
+                job_queue.enqueue('appointment_confirmation', {'appointmentId': str(appointment['_id'])},
+                                  owner_id=appointment.get('patientId'))
+
+@job_queue.register('scheduler_retrain')
+def scheduler_retrain_job(payload):
+    """Retrains the learned scheduler and publishes a new version to every process."""
+    if retrain_scheduler(appointments_collection, cancellations_collection,
+                         busy_threshold=app.config['SCHEDULER_BUSY_THRESHOLD']):
+        scheduler_registry.refresh()
+
+@app.cli.command('retrain-scheduler')
+def retrain_scheduler_command():
+    """Retrains the learned scheduler on the booking history now."""
+    create_app()
+    scheduler_retrain_job({})
+
+@app.cli.command('jobs-worker')
+def jobs_worker_command():
+    """Runs the background job workers in the foreground."""
+    create_app()
+    job_workers.start()
+    print(f"--- {job_workers.size} job worker(s) running. Press CTRL+C to stop. ---")
+    try:
+        while job_workers.running:
+            job_workers.stopping.wait(1)
+    except KeyboardInterrupt:
+        job_workers.stop()
+
 # --- Main Page Routes ---
 @app.route('/')
 def index(): return render_template('index.html')
@@ -213,7 +283,10 @@ def signup():
         if users_collection.find_one({'email': email}):
             return redirect(url_for('signup'))
         hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-        users_collection.insert_one({'name': name, 'email': email, 'password': hashed_password, 'role': role})
+        try:
+            users_collection.insert_one({'name': name, 'email': email, 'password': hashed_password, 'role': role})
+        except DuplicateKeyError:
+            return redirect(url_for('signup'))
         return redirect(url_for('login'))
     return render_template('signup.html')
 
@@ -224,7 +297,9 @@ def login():
         password = request.form.get('password')
         user_data = users_collection.find_one({'email': email})
         if user_data and check_password_hash(user_data['password'], password):
-            login_user(User(user_data))
+            user = User(user_data)
+            login_user(user)
+            remember_user(user)
             return redirect(url_for('dashboard'))
         return redirect(url_for('login'))
     return render_template('login.html')
@@ -232,32 +307,82 @@ def login():
 @app.route('/logout')
 @login_required
 def logout():
+    session.pop(SNAPSHOT_SESSION_KEY, None)
     logout_user()
     return redirect(url_for('index'))
 
 # --- API Routes ---
 
+def slot_taken_response():
+    return jsonify({'error': 'This time slot has just been booked. Please choose another time.'}), 409
+
 @app.route('/api/appointments', methods=['POST'])
 @login_required
 def book_appointment():
     try:
         data = request.get_json()
+        data['_id'] = ObjectId()
         data['patientName'] = current_user.name
         data['patientEmail'] = current_user.email
         data['patientId'] = current_user.id
-        result = appointments_collection.insert_one(data)
-        data['_id'] = result.inserted_id
-        pdf_path = create_appointment_pdf(data)
-        email_sent = send_appointment_email(data['patientEmail'], pdf_path)
-        if os.path.exists(pdf_path):
-            os.remove(pdf_path)
-        if email_sent:
-            return jsonify({'message': 'Appointment booked! A confirmation has been sent to your email.'}), 201
-        else:
-            return jsonify({'message': 'Appointment booked, but the confirmation email could not be sent.'}), 207
+        # Claim the slot first; the ledger's conditional upsert decides concurrent races.
+        slot_ledger.claim(data.get('doctorName'), data.get('date'), data.get('time'), data['_id'])
+    except SlotTakenError:
+        return slot_taken_response()
+    except Exception as e:
+        print(f"Error booking appointment: {e}")
+        return jsonify({'error': str(e)}), 400
+    try:
+        appointments_collection.insert_one(data)
     except Exception as e:
+        slot_ledger.release(data['doctorName'], data['date'], data['time'], data['_id'])
+        if isinstance(e, DuplicateKeyError):
+            return slot_taken_response()
         print(f"Error booking appointment: {e}")
         return jsonify({'error': str(e)}), 400
+    change_feed.publish_change('appointments', 'insert', data)
+    appointment_id = str(data['_id'])
+    try:
+        job_workers.start()
+        job_id = job_queue.enqueue('appointment_confirmation', {'appointmentId': appointment_id}, owner_id=current_user.id)
+    except Exception as e:
+        print(f"Error queueing confirmation for appointment {appointment_id}: {e}")
+        return jsonify({'message': 'Appointment booked, but the confirmation email could not be sent.', 'appointmentId': appointment_id}), 207
+    return jsonify({
+        'message': 'Appointment booked! A confirmation will be sent to your email shortly.',
+        'appointmentId': appointment_id,
+        'jobId': job_id,
+    }), 201
+
+@app.route('/api/appointments/resend-confirmations', methods=['POST'])
+@login_required
+def resend_confirmations():
+    if current_user.role != 'Doctor':
+        return jsonify({'error': 'Only doctors can re-send confirmations.'}), 403
+    selected_date = (request.get_json() or {}).get('date')
+    if not selected_date:
+        return jsonify({'error': 'Date is required'}), 400
+    job_workers.start()
+    job_id = job_queue.enqueue('doctor_day_confirmations', {'doctorName': current_user.name, 'date': selected_date},
+                               owner_id=current_user.id)
+    return jsonify({'message': 'Confirmations will be re-sent shortly.', 'jobId': job_id}), 202
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if not job or job.get('ownerId') != current_user.id:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({
+        'id': str(job['_id']),
+        'type': job['type'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'maxAttempts': job['maxAttempts'],
+        'lastError': job.get('lastError'),
+        'createdAt': job['createdAt'].isoformat(),
+        'updatedAt': job['updatedAt'].isoformat(),
+    })
 
 @app.route('/api/my-appointments')
 @login_required
@@ -268,8 +393,10 @@ def my_appointments():
         query = {'doctorName': current_user.name}
     else:
         return jsonify({'error': 'Invalid user role'}), 403
-    apps = [{**a, '_id': str(a['_id'])} for a in appointments_collection.find(query)]
-    return jsonify(apps)
+    try:
+        return json_list_response(appointments_collection, query, APPOINTMENT_LIST_FIELDS, APPOINTMENT_SORT, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @app.route('/api/appointments/<appointment_id>/cancel', methods=['POST'])
 @login_required
@@ -277,7 +404,14 @@ def cancel_appointment(appointment_id):
     try:
         appointment = appointments_collection.find_one({'_id': ObjectId(appointment_id)})
         if appointment and (appointment.get('patientId') == current_user.id or appointment.get('doctorName') == current_user.name):
-            appointments_collection.delete_one({'_id': ObjectId(appointment_id)})
+            if appointments_collection.delete_one({'_id': appointment['_id']}).deleted_count:
+                slot_ledger.release(appointment.get('doctorName'), appointment.get('date'), appointment.get('time'), appointment['_id'])
+                change_feed.publish_change('appointments', 'delete', appointment)
+                cancellations_collection.insert_one({
+                    'appointmentId': appointment['_id'], 'doctorName': appointment.get('doctorName'),
+                    'date': appointment.get('date'), 'time': appointment.get('time'),
+                    'cancelledBy': current_user.role, 'cancelledAt': datetime.utcnow(),
+                })
             return jsonify({'message': 'Appointment cancelled successfully'}), 200
         return jsonify({'error': 'Unauthorized or Appointment not found'}), 403
     except Exception as e:
@@ -289,16 +423,45 @@ def handle_doctors():
         if not current_user.is_authenticated or current_user.role != 'Doctor':
             return jsonify({'error': 'Unauthorized action. Only doctors can add profiles.'}), 403
         try:
-            doctors_collection.insert_one(request.get_json())
-            return jsonify({'message': 'Doctor added successfully!'}), 201
+            doctor = request.get_json()
+            doctor[FILTER_KEYS_FIELD] = filter_keys(doctor)
+            doctors_collection.insert_one(doctor)
         except Exception as e:
             return jsonify({'error': str(e)}), 400
-    
-    doctors_list = []
-    for doc in doctors_collection.find({}):
-        doc['_id'] = str(doc['_id'])
-        doctors_list.append(doc)
-    return jsonify(doctors_list)
+        try:
+            doctor_search.record_insert(doctor)
+        except Exception as e:
+            print(f"Error updating the doctor search index: {e}")
+        return jsonify({'message': 'Doctor added successfully!'}), 201
+
+    try:
+        return json_list_response(doctors_collection, {}, DOCTOR_LIST_FIELDS, DOCTOR_LIST_SORT, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def conditional_json(etag, build):
+    """Answers 304 when the client already holds `etag`; otherwise returns build() as JSON tagged with it."""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Cache, but revalidate every time
+    return response
+
+@app.route('/api/doctors/search')
+def search_doctors():
+    """Ranked, paginated directory search: ?q=&domain=&specialization=&hospital=&location=&appointmentType=&page=&limit="""
+    try:
+        query, filters, appointment_type, page, limit = parse_search_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return conditional_json(doctor_search.etag(),
+                            lambda: doctor_search.search(query, filters, appointment_type, page, limit))
+
+@app.route('/api/doctors/facets')
+def doctor_facets():
+    return conditional_json(doctor_search.etag(), doctor_search.facets)
 
 @app.route('/api/contact', methods=['POST'])
 def handle_contact():
@@ -329,15 +492,32 @@ def schedule_suggestions_api():
     selected_date = data.get('date')
     if not doctor_name or not selected_date:
         return jsonify({'error': 'Doctor name and date are required'}), 400
-    suggestions = get_schedule_suggestions(doctor_name, selected_date, appointments_collection)
+    suggestions = get_schedule_suggestions(doctor_name, selected_date, slot_ledger)
     return jsonify(suggestions)
 
+@app.route('/api/availability', methods=['POST'])
+@login_required
+def availability_api():
+    try:
+        doctor_names, domain, start_date, end_date = parse_availability_request(request.get_json(silent=True) or {})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if domain:
+        doctor_names += [d['name'] for d in doctors_collection.find({'domain': domain}, {'name': 1, '_id': 0}) if d.get('name')]
+    if not doctor_names:
+        return jsonify({'error': 'Doctors (or a domain) and a start date are required'}), 400
+    try:
+        matrix = get_availability_matrix(doctor_names, start_date, end_date, slot_ledger)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(matrix)
+
 @app.route('/api/symptom-check', methods=['POST'])
 def symptom_check_api():
     symptoms = request.get_json().get('symptoms', '')
     if not symptoms:
         return jsonify({'error': 'Symptoms not provided'}), 400
-    recommendation = get_symptom_recommendation_openai(symptoms)
+    recommendation = get_symptom_recommendation(symptoms)
     return jsonify(recommendation)
 
 @app.route('/api/diet-recommendation', methods=['POST'])
@@ -351,6 +531,44 @@ def diet_recommendation_api():
     recommendation = get_diet_recommendation_openai(disease, user_details)
     return jsonify(recommendation)
 
+@app.route('/api/diet-recommendation/stream', methods=['POST'])
+@login_required
+def diet_recommendation_stream_api():
+    """Streams the diet plan as server-sent events: token*, then done or error."""
+    data = request.get_json()
+    disease = data.get('disease')
+    user_details = data.get('healthRecords')
+    if not disease:
+        return jsonify({'error': 'Disease not provided'}), 400
+
+    def generate():
+        for event, text in stream_diet_recommendation_openai(disease, user_details):
+            payload = {'error': text} if event == 'error' else {'text': text}
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/user-cache/stats')
+@login_required
+def user_cache_stats_api():
+    return jsonify(user_cache.get_stats())
+
+@app.route('/api/ai/cache-stats')
+@login_required
+def ai_cache_stats_api():
+    return jsonify(get_ai_cache_stats())
+
+@app.route('/api/ai/scheduler-stats')
+@login_required
+def scheduler_stats_api():
+    return jsonify(get_scheduler_stats())
+
+@app.route('/api/ai/gateway-stats')
+@login_required
+def ai_gateway_stats_api():
+    return jsonify(get_ai_gateway_stats())
+
 # --- ElderCare AI API Routes ---
 
 @app.route('/api/elder/health-records', methods=['GET', 'POST'])
@@ -359,37 +577,250 @@ def handle_health_records():
     if request.method == 'POST':
         data = request.get_json()
         data['userId'] = current_user.id
-        data['date'] = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        data['date'] = datetime.utcnow().replace(microsecond=0)
+        reading = health_series.parse_reading(data.get('metric'), data.get('value'))
+        if reading:
+            data['metricKey'], data['values'] = reading
         health_records_collection.insert_one(data)
+        if reading:
+            try:
+                health_series.record_reading(health_series_collection, data)
+            except Exception as e:
+                # The record is saved; `python health_series.py --rebuild` restores the series.
+                print(f"Error adding health record {data['_id']} to its series: {e}")
+        change_feed.publish_change('health_records', 'insert', data)
         return jsonify({'message': 'Health record added successfully!'}), 201
-    
-    records = list(health_records_collection.find({'userId': current_user.id}).sort('date', -1))
-    for record in records:
-        record['_id'] = str(record['_id'])
-    return jsonify(records)
+
+    try:
+        return json_list_response(health_records_collection, {'userId': current_user.id},
+                                  HEALTH_RECORD_LIST_FIELDS, HEALTH_RECORD_LIST_SORT, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/elder/health-records/metrics')
+@login_required
+def health_record_metrics():
+    """The metrics the user has numeric readings for, with their units and components."""
+    return jsonify(health_series.user_metrics(health_series_collection, current_user.id))
+
+@app.route('/api/elder/health-records/series')
+@login_required
+def health_record_series():
+    """Downsampled readings: ?metric=&from=&to=&window=auto|hour|day|week|month&rolling=<windows>"""
+    try:
+        metric, start, end, window, rolling = health_series.parse_series_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(health_series.get_series(health_series_collection, current_user.id, metric, start, end,
+                                            window, rolling))
 
 @app.route('/api/elder/medications', methods=['GET', 'POST'])
 @login_required
 def handle_medications():
     if request.method == 'POST':
         data = request.get_json()
+        if parse_time(data.get('time')) is None:
+            return jsonify({'error': "time must be a time of day in 'HH:MM' format"}), 400
         data['userId'] = current_user.id
         medications_collection.insert_one(data)
+        change_feed.publish_change('medications', 'insert', data)
         return jsonify({'message': 'Medication added successfully!'}), 201
-    
-    meds = list(medications_collection.find({'userId': current_user.id}))
-    for med in meds:
-        med['_id'] = str(med['_id'])
-    return jsonify(meds)
+
+    try:
+        return json_list_response(medications_collection, {'userId': current_user.id},
+                                  MEDICATION_LIST_FIELDS, MEDICATION_LIST_SORT, request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
 @app.route('/api/elder/medications/<med_id>', methods=['DELETE'])
 @login_required
 def delete_medication(med_id):
-    result = medications_collection.delete_one({'_id': ObjectId(med_id), 'userId': current_user.id})
-    if result.deleted_count == 1:
+    medication = medications_collection.find_one_and_delete({'_id': ObjectId(med_id), 'userId': current_user.id})
+    if medication is not None:
+        change_feed.publish_change('medications', 'delete', medication)
         return jsonify({'message': 'Medication deleted successfully!'}), 200
     return jsonify({'error': 'Medication not found or unauthorized'}), 404
 
+@app.route('/api/elder/events')
+@login_required
+def elder_events():
+    """Server-sent events with ElderCare deltas and server-computed medication reminders."""
+    change_feed.start()
+    # Validated before a stream slot is taken: a bad offset would otherwise fail mid-stream
+    tz_offset = parse_tz_offset(request.args.get('tzOffset', 0))
+    if tz_offset is None:
+        return jsonify({'error': f'tzOffset must be an integer between -{MAX_TZ_OFFSET} and {MAX_TZ_OFFSET}'}), 400
+    if not change_feed.open_stream():
+        # Every stream slot holds a server thread; refuse rather than starve ordinary requests.
+        # The page falls back to polling (see elderly.js).
+        return jsonify({'error': 'Too many live connections, try again later'}), 503, {'Retry-After': '30'}
+    user_id = current_user.id
+
+    def load_medications():
+        return [{**m, '_id': str(m['_id'])}
+                for m in medications_collection.find({'userId': user_id}, MEDICATION_LIST_FIELDS)]
+
+    response = Response(stream_with_context(change_feed.event_stream(current_user._get_current_object(), load_medications, tz_offset)),
+                        mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs when the server closes the response, even if the stream never started.
+    response.call_on_close(change_feed.close_stream)
+    return response
+
+# --- Bulk Import/Export Routes (see bulk_io.py) ---
+# Meant for scripts and admin tooling rather than browser sessions, so they are
+# authorised with `Authorization: Bearer <BULK_API_TOKEN>` and are disabled
+# while BULK_API_TOKEN is unset.
+
+def bulk_authorized():
+    token = app.config.get('BULK_API_TOKEN')
+    header = request.headers.get('Authorization', '')
+    return bool(token) and header.startswith('Bearer ') and hmac.compare_digest(header[7:], token)
+
+def bulk_forbidden():
+    return jsonify({'error': 'A valid bulk API token is required.'}), 403
+
+def bulk_request_format():
+    return bulk_io.detect_format(request.args.get('format'), request.content_type)
+
+@app.route('/api/bulk/<kind>/import', methods=['POST'])
+def bulk_import(kind):
+    if not bulk_authorized():
+        return bulk_forbidden()
+    if kind not in ('doctors', 'appointments'):
+        return jsonify({'error': f'Import is not supported for {kind}'}), 404
+    try:
+        batch_size = max(1, min(int(request.args.get('batchSize', bulk_io.DEFAULT_BATCH_SIZE)), bulk_io.DEFAULT_BATCH_SIZE))
+    except ValueError:
+        return jsonify({'error': 'batchSize must be an integer'}), 400
+    rows = bulk_io.read_rows(request.stream, bulk_request_format())
+    report = bulk_io.ImportReport()
+    read_error = None
+    try:
+        if kind == 'doctors':
+            bulk_io.import_doctors(doctors_collection, rows, batch_size, upsert=request.args.get('mode') == 'upsert',
+                                   report=report)
+        else:
+            bulk_io.import_appointments(appointments_collection, slot_ledger, rows, batch_size, report=report)
+    except UnicodeDecodeError:
+        read_error = 'The upload must be UTF-8 encoded.'
+    except csv.Error as e:
+        read_error = f'The upload is not valid CSV: {e}'
+    if kind == 'doctors' and report.written:
+        doctor_search.mark_changed()
+    result = report.to_dict()
+    if read_error:
+        # Rows before the unreadable part were imported; the report says how far it got.
+        print(f"Bulk import of {kind} stopped: {read_error} ({result['written']} written)")
+        return jsonify({'error': read_error, **result}), 400
+    print(f"Bulk import of {kind}: {result['written']} written, {result['failed']} failed")
+    return jsonify(result), 200 if result['failed'] == 0 else 207
+
+BULK_EXPORT_COLLECTIONS = {
+    'doctors': doctors_collection,
+    'appointments': appointments_collection,
+    'health-records': health_records_collection,
+}
+
+@app.route('/api/bulk/<kind>/export')
+def bulk_export(kind):
+    if not bulk_authorized():
+        return bulk_forbidden()
+    collection = BULK_EXPORT_COLLECTIONS.get(kind)
+    if collection is None:
+        return jsonify({'error': f'Export is not supported for {kind}'}), 404
+    fmt = bulk_io.detect_format(request.args.get('format'))
+    try:
+        cursor = bulk_io.export_cursor(collection, kind, doctor_name=request.args.get('doctorName'),
+                                       user_id=request.args.get('userId'), date_from=request.args.get('from'),
+                                       date_to=request.args.get('to'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f"{kind}.{fmt}"
+    return Response(stream_with_context(bulk_io.export_lines(cursor, bulk_io.EXPORT_FIELDS[kind], fmt)),
+                    mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+# --- Application Factory ---
+_initialized = False
+
+def create_app(config=None):
+    """Applies the configuration and wires up the services. Returns the app; later calls are no-ops.
+
+    Run it with `flask --app 'app:create_app()' run`, or see wsgi.py and
+    gunicorn.conf.py for the multi-process server.
+    """
+    global _initialized
+    if _initialized:
+        return app
+    if config is not None:
+        app.config.from_object(config)
+    settings = app.config
+    if not settings.get('SECRET_KEY'):
+        print("\n!!! WARNING: SECRET_KEY not set. Using a random key: sessions will not survive a restart "
+              "or be shared between worker processes. !!!\n")
+        settings['SECRET_KEY'] = os.urandom(24)
+
+    mail.init_app(app)
+    instrumentation.init_app(
+        app,
+        profiler=RequestProfiler(
+            enabled=settings['PROFILING_ENABLED'],
+            token=settings['PROFILE_TOKEN'],
+            sample_rate=settings['PROFILE_SAMPLE_RATE'],
+            output_dir=settings['PROFILE_DIR'],
+        ),
+        slow_request_ms=settings['REQUEST_LOG_SLOW_MS'],
+    )
+
+    mongo.configure(settings['MONGO_URI'], settings['MONGO_DB'])
+    job_workers.size = settings['JOB_WORKERS']
+    change_feed.requested_mode = settings['CHANGE_FEED_MODE']
+    change_feed.max_streams = settings['SSE_MAX_STREAMS']
+    doctor_search.mode = settings['DOCTOR_SEARCH_MODE']
+    doctor_search.check_interval = settings['DOCTOR_SEARCH_CHECK_INTERVAL']
+    # --- Index Bootstrap (see db_indexes.py; set MONGO_AUTO_INDEX=false to skip) ---
+    if settings['MONGO_AUTO_INDEX']:
+        try:
+            ensure_indexes(db)
+        except Exception as e:
+            print(f"Error creating MongoDB indexes: {e}")
+    if settings['DOCTOR_SEARCH_MODE'] == 'mongo':
+        try:
+            backfill_filter_keys(doctors_collection)
+        except Exception as e:
+            print(f"Error storing doctor search filter keys: {e}")
+    # --- Slot Ledger Migration (a no-op once the ledger is current) ---
+    try:
+        slot_ledger.ensure_current(appointments_collection, counters_collection)
+    except Exception as e:
+        print(f"Error rebuilding the slot ledger: {e}")
+    if settings['AI_CACHE_PERSISTENT']:
+        response_cache.attach_persistent_store(ai_cache_collection)
+    user_cache.attach_store(user_invalidations_collection)
+
+    initialize_ai_client()
+    if settings['WARM_MODELS']:
+        warm_models()
+    _initialized = True
+    return app
+
+def start_background_services():
+    """Starts the job workers and the change feed in the current (serving) process."""
+    job_workers.start()
+    change_feed.start()
+    interval = app.config['SCHEDULER_RETRAIN_INTERVAL']
+    if interval > 0 and job_workers.size > 0:
+        try:
+            job_queue.schedule_recurring('scheduler_retrain', interval)
+        except Exception as e:
+            print(f"Error scheduling scheduler retraining: {e}")
+
 # --- Run Application ---
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    create_app()
+    # Debug mode (and its reloader) is off unless FLASK_DEBUG=true; see Config.DEBUG.
+    debug = app.config['DEBUG']
+    # With the debug reloader only the child process serves requests, so only it runs workers.
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_services()
+    app.run(debug=debug, port=app.config['PORT'])
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+
+from ai_models import TIME_SLOTS, get_slot_score_table, suggest_free_slots
+
+# --- Bulk Availability Engine ---
+# Builds a doctor x day x slot matrix for many doctors and dates from a single
+# slot-ledger query, reusing the per-doctor, per-weekday scheduler suggestions.
+
+MAX_AVAILABILITY_DAYS = 31
+MAX_AVAILABILITY_DOCTORS = 200
+
+# One character per slot keeps the matrix compact: the booking page and the
+# front desk decode it against the shared `slots` header.
+STATUS_CODES = {'optimal': 'O', 'busy': 'B'}
+BOOKED_CODE = '-'
+
+
+def date_range(start_date, end_date):
+    """Returns the ISO dates from start_date to end_date inclusive."""
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError('endDate must not be before startDate')
+    days = (end - start).days + 1
+    if days > MAX_AVAILABILITY_DAYS:
+        raise ValueError(f'Date range is limited to {MAX_AVAILABILITY_DAYS} days')
+    return [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+
+
+def parse_availability_request(data):
+    """Returns (doctor_names, domain, start_date, end_date) from a request body. Raises ValueError.
+
+    The range ends at endDate, or after `days` days; a single day by default.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    doctor_names = data.get('doctorNames') or []
+    if not isinstance(doctor_names, list) or not all(isinstance(name, str) for name in doctor_names):
+        raise ValueError('doctorNames must be a list of strings')
+    domain, start_date, end_date = data.get('domain'), data.get('startDate'), data.get('endDate')
+    for field, value in (('domain', domain), ('startDate', start_date), ('endDate', end_date)):
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'{field} must be a string')
+    if not start_date:
+        raise ValueError('startDate is required')
+    try:
+        start = date.fromisoformat(start_date)
+    except ValueError:
+        raise ValueError('startDate must be a date in YYYY-MM-DD format')
+    days = data.get('days')
+    if days is not None:
+        if isinstance(days, bool) or not isinstance(days, int) or not 1 <= days <= MAX_AVAILABILITY_DAYS:
+            raise ValueError(f'days must be an integer from 1 to {MAX_AVAILABILITY_DAYS}')
+        end_date = (start + timedelta(days=days - 1)).isoformat()
+    elif end_date:
+        try:
+            date.fromisoformat(end_date)
+        except ValueError:
+            raise ValueError('endDate must be a date in YYYY-MM-DD format')
+    return doctor_names, domain or None, start_date, end_date or start_date
+
+
+def encode_day(booked_slots, score_table=None):
+    """Encodes one day of suggestions as a string with one status code per slot."""
+    statuses = {s['time']: STATUS_CODES[s['status']] for s in suggest_free_slots(booked_slots, score_table)}
+    return ''.join(statuses.get(slot, BOOKED_CODE) for slot in TIME_SLOTS)
+
+
+def get_availability_matrix(doctor_names, start_date, end_date, slot_ledger):
+    """Returns the compact availability matrix for the given doctors and date range."""
+    doctor_names = list(dict.fromkeys(name for name in doctor_names if name))
+    if not doctor_names:
+        raise ValueError('At least one doctor is required')
+    if len(doctor_names) > MAX_AVAILABILITY_DOCTORS:
+        raise ValueError(f'At most {MAX_AVAILABILITY_DOCTORS} doctors can be requested at once')
+    dates = date_range(start_date, end_date)
+    booked = slot_ledger.booked_map(doctor_names, dates[0], dates[-1])
+
+    # Days with no bookings share a row per score table, so each is encoded only once.
+    free_days = {}
+    matrix = {}
+    for name in doctor_names:
+        row = {}
+        for day in dates:
+            table = get_slot_score_table(name, day)
+            if (name, day) in booked:
+                row[day] = encode_day(booked[(name, day)], table)
+            else:
+                if table not in free_days:
+                    free_days[table] = encode_day(set(), table)
+                row[day] = free_days[table]
+        matrix[name] = row
+    return {
+        'slots': TIME_SLOTS,
+        'dates': dates,
+        'codes': {'optimal': STATUS_CODES['optimal'], 'busy': STATUS_CODES['busy'], 'booked': BOOKED_CODE},
+        'availability': matrix,
+    }
@@ -0,0 +1,131 @@
+import random
+from datetime import date, datetime, timedelta
+
+from bson.objectid import ObjectId
+from werkzeug.security import generate_password_hash
+
+from doctor_search import FILTER_KEYS_FIELD, filter_keys
+from health_series import parse_reading, rebuild as rebuild_health_series
+from slot_ledger import ledger_id, mark_current as mark_ledger_current
+
+# --- Benchmark Fixtures ---
+# Seeds realistic volumes of users, doctors, appointments and ElderCare data.
+# Every seeded user shares one password hash, because hashing thousands of
+# pbkdf2 passwords would take longer than the benchmark itself.
+
+BENCH_PASSWORD = 'bench-password'
+DOMAINS = ['Cardiologist', 'Dermatologist', 'Neurologist', 'Pediatrician', 'Orthopedic',
+           'General Physician', 'ENT Specialist', 'Gynecologist', 'Ophthalmologist', 'Psychiatrist']
+HOSPITALS = [('City Hospital', 'Mangaluru'), ('Sunrise Clinic', 'Udupi'), ('Care Point', 'Bengaluru'),
+             ('Green Valley Hospital', 'Mysuru')]
+TIMES = [f"{h:02d}:{m:02d}" for h in range(9, 17) for m in (0, 30)]
+METRICS = {
+    'Blood Pressure': lambda rng: f"{rng.randint(105, 160)}/{rng.randint(65, 100)} mmHg",
+    'Sugar Level': lambda rng: f"{rng.randint(80, 220)} mg/dL",
+    'Heart Rate': lambda rng: str(rng.randint(55, 110)),
+    'Weight': lambda rng: f"{rng.randint(45, 95)} kg",
+}
+
+
+def _batched_insert(collection, docs, batch_size=5000):
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+
+
+def is_bench_db(name):
+    """Seeding wipes the app collections, so it only runs on databases named for benchmarking."""
+    return 'bench' in name.lower()
+
+
+def seed(db, patients=1000, doctors=100, appointments=20000, days=60, health_records=5, medications=3,
+         rng_seed=42, force_wipe=False):
+    """Drops and reseeds the app collections. Returns the seeded patients, doctors and date range.
+
+    Raises ValueError for a database whose name lacks "bench" unless force_wipe is set.
+    """
+    if not force_wipe and not is_bench_db(db.name):
+        raise ValueError(f"Refusing to wipe '{db.name}': its name does not contain 'bench'")
+    rng = random.Random(rng_seed)
+    for name in ('users', 'doctors', 'appointments', 'slot_ledger', 'health_records', 'health_series', 'medications',
+                 'jobs'):
+        db[name].delete_many({})
+
+    password_hash = generate_password_hash(BENCH_PASSWORD, method='pbkdf2:sha256')
+    doctor_docs = []
+    for i in range(doctors):
+        hospital, location = rng.choice(HOSPITALS)
+        doctor_docs.append({
+            'name': f"Doctor {i:04d}", 'domain': DOMAINS[i % len(DOMAINS)], 'degree': 'MBBS, MD',
+            'specialization': DOMAINS[i % len(DOMAINS)], 'experience': rng.randint(2, 30),
+            'hospitalName': hospital, 'hospitalLocation': location, 'contact': f"+91 90000 {i:05d}",
+            'image': '/static/assets/doctor-patient.png',
+        })
+    for doc in doctor_docs:
+        doc[FILTER_KEYS_FIELD] = filter_keys(doc)
+    _batched_insert(db.doctors, doctor_docs)
+
+    patient_users = [{'_id': ObjectId(), 'name': f"Patient {i:05d}", 'email': f"patient{i}@bench.local",
+                      'password': password_hash, 'role': 'Patient'} for i in range(patients)]
+    doctor_users = [{'_id': ObjectId(), 'name': d['name'], 'email': f"doctor{i}@bench.local",
+                     'password': password_hash, 'role': 'Doctor'} for i, d in enumerate(doctor_docs)]
+    _batched_insert(db.users, patient_users + doctor_users)
+
+    start = date.today()
+    dates = [(start + timedelta(days=offset)).isoformat() for offset in range(days)]
+    taken = set()
+    appointment_docs = []
+    ledger = {}
+    attempts = 0
+    while len(appointment_docs) < appointments and attempts < appointments * 5:
+        attempts += 1
+        doctor = rng.choice(doctor_docs)
+        slot = (doctor['name'], rng.choice(dates), rng.choice(TIMES))
+        if slot in taken:
+            continue
+        taken.add(slot)
+        patient = rng.choice(patient_users)
+        appointment_type = rng.choice(['Online', 'Offline'])
+        doc = {
+            '_id': ObjectId(), 'doctorName': slot[0], 'date': slot[1], 'time': slot[2],
+            'appointmentType': appointment_type, 'additionalNotes': '',
+            'hospitalName': doctor['hospitalName'] if appointment_type == 'Offline' else None,
+            'hospitalLocation': doctor['hospitalLocation'] if appointment_type == 'Offline' else None,
+            'patientName': patient['name'], 'patientEmail': patient['email'], 'patientId': str(patient['_id']),
+        }
+        appointment_docs.append(doc)
+        ledger.setdefault((slot[0], slot[1]), {})[slot[2]] = str(doc['_id'])
+    _batched_insert(db.appointments, appointment_docs)
+    _batched_insert(db.slot_ledger, ({'_id': ledger_id(name, day), 'doctorName': name, 'date': day, 'slots': slots}
+                                     for (name, day), slots in ledger.items()))
+    mark_ledger_current(db.counters)
+
+    now = datetime.utcnow().replace(microsecond=0)
+
+    def health_record(user_id):
+        metric = rng.choice(list(METRICS))
+        record = {'userId': user_id, 'metric': metric, 'value': METRICS[metric](rng),
+                  'date': now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))}
+        record['metricKey'], record['values'] = parse_reading(metric, record['value'])
+        return record
+
+    _batched_insert(db.health_records,
+                    (health_record(str(p['_id'])) for p in patient_users for _ in range(health_records)))
+    rebuild_health_series(db.health_records, db.health_series)
+    _batched_insert(db.medications, (
+        {'userId': str(p['_id']), 'name': f"Medicine {j}", 'dosage': '1 tablet', 'time': rng.choice(TIMES)}
+        for p in patient_users for j in range(medications)))
+
+    return {
+        'patients': [u['email'] for u in patient_users],
+        'doctors': [d['name'] for d in doctor_docs],
+        'doctorUsers': [u['email'] for u in doctor_users],
+        'dates': dates,
+        'counts': {'patients': patients, 'doctors': doctors, 'appointments': len(appointment_docs),
+                   'healthRecords': patients * health_records, 'medications': patients * medications},
+    }
@@ -0,0 +1,265 @@
+"""Load-test MediSmart AI with local stand-ins for MongoDB, SMTP and the LLM.
+
+In-process against mongomock (no services needed):
+
+    pip install -r requirements.txt -r benchmarks/requirements.txt
+    python -m benchmarks.run --scenario dashboard --requests 2000 --concurrency 16 --output before.json
+
+Against a local mongod, with the app running in-process:
+
+    python -m benchmarks.run --mongo-uri mongodb://localhost:27017/ --scenario all
+
+Against an already running server (seed the same database it uses). Seeding
+wipes the database, so --db defaults to medismart_bench and any name without
+"bench" in it is refused unless --force-wipe is given:
+
+    MONGO_DB=medismart_bench OPENROUTER_BASE_URL=http://localhost:8001/v1 gunicorn -c gunicorn.conf.py wsgi:application
+    python -m benchmarks.run --target http://localhost:5000 --mongo-uri mongodb://localhost:27017/
+
+Compare two result files:
+
+    python -m benchmarks.run --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from benchmarks.fixtures import is_bench_db, seed
+from benchmarks.scenarios import SCENARIOS, FlaskClient, HTTPClient, is_ok, login
+from benchmarks.standins import LLMStandIn, SMTPStandIn, use_mongomock
+
+BENCH_DB = 'medismart_bench'
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(scenario, latencies, statuses, errors, elapsed, concurrency):
+    ordered = sorted(latencies)
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    total = len(latencies)
+    ok = sum(count for status, count in statuses.items() if is_ok(scenario, status))
+    return {
+        'scenario': scenario,
+        'requests': total,
+        'concurrency': concurrency,
+        'ok': ok,
+        'failed': total - ok,
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'elapsedSeconds': round(elapsed, 3),
+        'rps': round(total / elapsed, 2) if elapsed else None,
+        'latencyMs': {
+            'mean': ms(statistics.fmean(ordered)) if ordered else None,
+            'p50': ms(percentile(ordered, 50)),
+            'p95': ms(percentile(ordered, 95)),
+            'p99': ms(percentile(ordered, 99)),
+            'max': ms(ordered[-1]) if ordered else None,
+        },
+    }
+
+
+def run_scenario(name, make_client, ctx, requests, concurrency, warmup, rng_seed):
+    """Runs `requests` calls of one scenario spread over `concurrency` virtual users."""
+    action = SCENARIOS[name]
+    remaining = [requests]
+    counter_lock = threading.Lock()
+    latencies, statuses, errors = [], Counter(), []
+    results_lock = threading.Lock()
+    ready = threading.Barrier(concurrency + 1)
+
+    def take():
+        with counter_lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def virtual_user(index):
+        rng = random.Random(rng_seed + index)
+        client = make_client()
+        try:
+            if name != 'login':
+                login(client, ctx, rng)
+            for _ in range(warmup):
+                action(client, ctx, rng)
+        finally:
+            ready.wait()
+        local_latencies, local_statuses, local_errors = [], Counter(), []
+        while take():
+            started = time.perf_counter()
+            try:
+                status = action(client, ctx, rng)
+            except Exception as e:
+                status = 0
+                local_errors.append(f"{type(e).__name__}: {e}")
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] += 1
+        with results_lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+            errors.extend(local_errors)
+
+    threads = [threading.Thread(target=virtual_user, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()  # Logins and warm-up are not part of the measurement
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    summary = summarize(name, latencies, statuses, len(errors), elapsed, concurrency)
+    if errors:
+        summary['sampleErrors'] = sorted(set(errors))[:5]
+    return summary
+
+
+def start_in_process_app(args):
+    """Starts the stand-ins, points app.py at them through its env config, then imports it."""
+    llm = LLMStandIn(latency=args.llm_latency, token_delay=args.llm_token_delay).start()
+    smtp = SMTPStandIn(port=args.smtp_port, latency=args.smtp_latency).start()
+    os.environ.update({
+        'OPENROUTER_API_KEY': 'stub',
+        'OPENROUTER_BASE_URL': llm.base_url,
+        'MAIL_SERVER': '127.0.0.1',
+        'MAIL_PORT': str(args.smtp_port),
+        'MAIL_USE_TLS': 'false',
+        'MAIL_USERNAME': 'bench@medismart.local',
+        'MONGO_DB': args.db,
+        'CHANGE_FEED_MODE': 'bus',
+    })
+    if args.mongo_uri:
+        os.environ['MONGO_URI'] = args.mongo_uri
+    else:
+        use_mongomock()
+
+    import app as app_module
+
+    app_module.create_app()
+    app_module.app.config['TESTING'] = True
+    app_module.job_workers.start()
+    return app_module, [llm, smtp]
+
+
+def print_summary(summary):
+    latency = summary['latencyMs']
+    print(f"{summary['scenario']:<22} {summary['requests']:>7} req  {summary['rps'] or 0:>9.1f} req/s  "
+          f"p50 {latency['p50']:>8} ms  p95 {latency['p95']:>8} ms  p99 {latency['p99']:>8} ms  "
+          f"failed {summary['failed']}")
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {s['scenario']: s for s in json.load(f)['results']}
+    with open(after_path) as f:
+        after = {s['scenario']: s for s in json.load(f)['results']}
+    change = lambda old, new: f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+    print(f"{'scenario':<22} {'rps':>20} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22}")
+    for name in [n for n in before if n in after]:
+        b, a = before[name], after[name]
+        cells = [f"{b['rps']}->{a['rps']} {change(b['rps'], a['rps'])}"]
+        for key in ('p50', 'p95', 'p99'):
+            old, new = b['latencyMs'][key], a['latencyMs'][key]
+            cells.append(f"{old}->{new} {change(old, new)}")
+        print(f"{name:<22} " + ' '.join(f"{cell:>22}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', default='all', choices=['all'] + list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=500, help='Measured requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8, help='Virtual users, one thread each')
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per virtual user')
+    parser.add_argument('--target', help='Base URL of a running server; default runs the app in-process')
+    parser.add_argument('--mongo-uri', help='Use this MongoDB instead of mongomock')
+    parser.add_argument('--db', default=BENCH_DB, help='Database to seed and test; it is wiped unless --no-seed')
+    parser.add_argument('--force-wipe', action='store_true',
+                        help='Allow seeding a database whose name does not contain "bench"')
+    parser.add_argument('--no-seed', action='store_true', help='Reuse the data already in the database')
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--doctors', type=int, default=100)
+    parser.add_argument('--appointments', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--llm-latency', type=float, default=0.3, help='Seconds before the stub LLM replies')
+    parser.add_argument('--llm-token-delay', type=float, default=0.02)
+    parser.add_argument('--smtp-port', type=int, default=8025)
+    parser.add_argument('--smtp-latency', type=float, default=0.05, help='Seconds the SMTP sink takes per message')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for fixtures and scenarios')
+    parser.add_argument('--output', help='Write machine-readable results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not args.no_seed and not args.force_wipe and not is_bench_db(args.db):
+        parser.error(f"seeding wipes '{args.db}', and its name does not contain 'bench'; "
+                     "pass --force-wipe if that is really what you want")
+
+    standins = []
+    if args.target:
+        if not args.mongo_uri:
+            parser.error('--target needs --mongo-uri pointing at the database the server uses')
+        from pymongo import MongoClient
+        make_client = lambda: HTTPClient(args.target)
+        db = MongoClient(args.mongo_uri)[args.db]
+    else:
+        app_module, standins = start_in_process_app(args)
+        make_client = lambda: FlaskClient(app_module.app)
+        db = app_module.db
+
+    try:
+        if args.no_seed:
+            ctx = {
+                'patients': [u['email'] for u in db.users.find({'role': 'Patient'}, {'email': 1})],
+                'doctors': db.doctors.distinct('name'),
+                'dates': sorted(db.slot_ledger.distinct('date')),
+            }
+        else:
+            started = time.perf_counter()
+            ctx = seed(db, patients=args.patients, doctors=args.doctors, appointments=args.appointments,
+                       days=args.days, rng_seed=args.seed, force_wipe=args.force_wipe)
+            print(f"--- Seeded {ctx['counts']} in {time.perf_counter() - started:.1f}s ---")
+        if not ctx['patients'] or not ctx['doctors'] or not ctx['dates']:
+            sys.exit('The benchmark database has no patients, doctors or bookable dates')
+
+        names = list(SCENARIOS) if args.scenario == 'all' else [args.scenario]
+        results = []
+        for name in names:
+            summary = run_scenario(name, make_client, ctx, args.requests, args.concurrency, args.warmup, args.seed)
+            results.append(summary)
+            print_summary(summary)
+    finally:
+        for standin in standins:
+            standin.stop()
+
+    if args.output:
+        report = {
+            'createdAt': datetime.utcnow().isoformat() + 'Z',
+            'target': args.target or 'in-process',
+            'mongo': args.mongo_uri or 'mongomock',
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"--- Results written to {args.output} ---")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import http.cookiejar
+import json
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from benchmarks.fixtures import BENCH_PASSWORD, TIMES
+
+# --- Scripted Scenarios ---
+# Each scenario is one user action against the API and returns the HTTP
+# status. Virtual users get their own client (and so their own session
+# cookie); everything except `login` runs with an already logged-in user.
+
+SYMPTOMS = [
+    'chest pain and shortness of breath when climbing stairs',
+    'itchy red rash on both arms for a week',
+    'severe headache with blurred vision and dizziness',
+    'child has high fever and a persistent cough',
+    'knee pain and swelling after a fall',
+    'feeling tired all the time and mild body ache',
+    'ringing in the ears and trouble hearing',
+    'persistent sadness, poor sleep and loss of appetite',
+]
+
+
+class FlaskClient:
+    """Runs requests in-process through Flask's test client."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+        self.location = None  # Location header of the last response
+
+    def _status(self, response):
+        self.location = response.headers.get('Location')
+        return response.status_code
+
+    def get(self, path):
+        return self._status(self.client.get(path))
+
+    def post_json(self, path, payload):
+        return self._status(self.client.post(path, json=payload))
+
+    def post_form(self, path, form):
+        return self._status(self.client.post(path, data=form))
+
+
+class HTTPClient:
+    """Runs requests against a live server, keeping cookies like a browser."""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.location = None  # Location header of the last response
+        # Redirects are not followed, so a login measures only the POST itself.
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def _send(self, request):
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                self.location = response.headers.get('Location')
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            self.location = e.headers.get('Location')
+            return e.code
+
+    def get(self, path):
+        return self._send(urllib.request.Request(self.base_url + path))
+
+    def post_json(self, path, payload):
+        return self._send(urllib.request.Request(
+            self.base_url + path, data=json.dumps(payload).encode(), method='POST',
+            headers={'Content-Type': 'application/json'}))
+
+    def post_form(self, path, form):
+        return self._send(urllib.request.Request(
+            self.base_url + path, data=urllib.parse.urlencode(form).encode(), method='POST'))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def login(client, ctx, rng):
+    email = rng.choice(ctx['patients'])
+    status = client.post_form('/login', {'email': email, 'password': BENCH_PASSWORD})
+    if status == 302 and not login_succeeded(client.location):
+        return 401  # A rejected login also redirects, back to the login page
+    return status
+
+
+def login_succeeded(location):
+    """A successful login redirects to the dashboard; a failed one back to /login."""
+    return bool(location) and urllib.parse.urlsplit(location).path.rstrip('/') != '/login'
+
+
+def schedule_suggestions(client, ctx, rng):
+    return client.post_json('/api/schedule-suggestions',
+                            {'doctorName': rng.choice(ctx['doctors']), 'date': rng.choice(ctx['dates'])})
+
+
+def booking(client, ctx, rng):
+    return client.post_json('/api/appointments', {
+        'doctorName': rng.choice(ctx['doctors']), 'date': rng.choice(ctx['dates']), 'time': rng.choice(TIMES),
+        'appointmentType': 'Online', 'additionalNotes': 'benchmark',
+    })
+
+
+def dashboard(client, ctx, rng):
+    return client.get('/api/my-appointments?limit=20')
+
+
+def symptom_check(client, ctx, rng):
+    return client.post_json('/api/symptom-check', {'symptoms': rng.choice(SYMPTOMS)})
+
+
+SCENARIOS = {
+    'login': login,
+    'schedule-suggestions': schedule_suggestions,
+    'booking': booking,
+    'dashboard': dashboard,
+    'symptom-check': symptom_check,
+}
+
+# Responses that count as success. A 409 on booking means the slot ledger
+# correctly refused a slot that was already taken. A login only reports 302
+# when it redirected away from the login page (see login()).
+OK_STATUSES = {
+    'login': {302},
+    'booking': {201, 409},
+}
+
+
+def is_ok(scenario, status):
+    return status in OK_STATUSES.get(scenario, {200})
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+
+from stub_llm_server import make_server
+
+# --- Local Stand-ins ---
+# Replacements for the external services app.py talks to: MongoDB (mongomock
+# or a local mongod), SMTP (an aiosmtpd sink) and OpenRouter (the stub
+# chat-completions server). mongomock and aiosmtpd are only needed for
+# benchmarking; see benchmarks/requirements.txt.
+
+
+def use_mongomock():
+    """Makes `from pymongo import MongoClient` in app.py return an in-memory mongomock client.
+
+    Must run before app is imported. mongomock is single-process and not
+    built for heavy concurrency, so use a local mongod for real numbers.
+    """
+    import mongomock
+    import pymongo
+
+    shared = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: shared
+    return shared
+
+
+class LLMStandIn:
+    """The stub chat-completions server on a free local port."""
+
+    def __init__(self, latency=0.3, token_delay=0.02):
+        self.server = make_server(port=0, latency=latency, token_delay=token_delay)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _SinkHandler:
+    def __init__(self, latency):
+        self.latency = latency
+        self.messages = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.messages += 1
+        return '250 Message accepted for delivery'
+
+
+class SMTPStandIn:
+    """An aiosmtpd server that accepts and discards every message."""
+
+    def __init__(self, port=8025, latency=0.0):
+        from aiosmtpd.controller import Controller
+
+        self.handler = _SinkHandler(latency)
+        self.port = port
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=port)
+
+    @property
+    def messages(self):
+        return self.handler.messages
+
+    def start(self):
+        self.controller.start()
+        return self
+
+    def stop(self):
+        self.controller.stop()
@@ -0,0 +1,390 @@
+"""Bulk import and export of doctors, appointments and health records.
+
+Imports read CSV (with a header row) or NDJSON one row at a time. Each row
+is validated, and valid rows are written in batches with unordered bulk
+writes, so one bad row never blocks the rest. The result is a report with
+per-row errors. Exports stream straight from a Mongo cursor, one line at a
+time.
+
+    python bulk_io.py import doctors doctors.csv
+    python bulk_io.py import doctors doctors.ndjson --upsert
+    python bulk_io.py import appointments appointments.csv
+    python bulk_io.py export appointments -o appointments.csv --from 2025-01-01 --to 2025-01-31
+    python bulk_io.py export health-records --format ndjson --user-id <id> > records.ndjson
+
+The same operations are served over HTTP under /api/bulk/ (see app.py).
+"""
+import argparse
+import codecs
+import csv
+import io
+import json
+import os
+import sys
+from datetime import date, datetime, time, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from doctor_search import FILTER_KEYS_FIELD, filter_keys
+from slot_ledger import validate_slot
+
+FORMATS = ('csv', 'ndjson')
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+DOCTOR_FIELDS = ['name', 'domain', 'degree', 'specialization', 'experience',
+                 'hospitalName', 'hospitalLocation', 'contact', 'image', 'appointmentTypes']
+APPOINTMENT_FIELDS = ['doctorName', 'date', 'time', 'appointmentType', 'additionalNotes', 'hospitalName',
+                      'hospitalLocation', 'patientName', 'patientEmail', 'patientId']
+HEALTH_RECORD_FIELDS = ['userId', 'metric', 'value', 'date']
+APPOINTMENT_TYPES = ('Online', 'Offline')
+# List fields (appointmentTypes) are written to CSV cells joined by this separator
+LIST_SEPARATOR = ';'
+
+
+# --- Parsing ---
+def detect_format(name=None, content_type=None, default='csv'):
+    """Picks csv or ndjson from an explicit name, a file extension or a Content-Type."""
+    for hint in (name, content_type):
+        if not hint:
+            continue
+        hint = hint.lower()
+        if hint in FORMATS:
+            return hint
+        if hint.endswith(('.ndjson', '.jsonl')) or 'ndjson' in hint or 'jsonl' in hint:
+            return 'ndjson'
+        if hint.endswith('.csv') or 'csv' in hint:
+            return 'csv'
+    return default
+
+
+def read_rows(binary_stream, fmt):
+    """Yields (row_number, row dict) pairs; malformed NDJSON lines yield (row_number, ValueError)."""
+    text = codecs.getreader('utf-8-sig')(binary_stream)
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, {key.strip(): value.strip() for key, value in row.items()
+                           if key is not None and value not in (None, '')}
+        return
+    for number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, ValueError(f'Invalid JSON: {e}')
+            continue
+        yield number, row if isinstance(row, dict) else ValueError('Each line must be a JSON object')
+
+
+# --- Validation ---
+def _pick(row, fields):
+    return {field: row[field] for field in fields if row.get(field) not in (None, '')}
+
+
+def _appointment_types(value):
+    """A list (NDJSON) or separator-joined string (CSV) of appointment types, in APPOINTMENT_TYPES order."""
+    if isinstance(value, str):
+        value = [part.strip() for part in value.split(LIST_SEPARATOR) if part.strip()]
+    if not isinstance(value, list) or not all(isinstance(t, str) and t in APPOINTMENT_TYPES for t in value):
+        raise ValueError(f"appointmentTypes must list some of {', '.join(APPOINTMENT_TYPES)}")
+    return [t for t in APPOINTMENT_TYPES if t in value]
+
+
+def validate_doctor(row):
+    doc = _pick(row, DOCTOR_FIELDS)
+    for field in ('name', 'domain'):
+        if not isinstance(doc.get(field), str) or not doc[field].strip():
+            raise ValueError(f'{field} is required')
+    if 'experience' in doc:
+        try:
+            doc['experience'] = int(doc['experience'])
+        except (TypeError, ValueError):
+            raise ValueError('experience must be a whole number of years')
+        if doc['experience'] < 0:
+            raise ValueError('experience must not be negative')
+    if 'appointmentTypes' in doc:
+        doc['appointmentTypes'] = _appointment_types(doc['appointmentTypes'])
+    doc[FILTER_KEYS_FIELD] = filter_keys(doc)
+    return doc
+
+
+def validate_appointment(row):
+    doc = _pick(row, APPOINTMENT_FIELDS)
+    validate_slot(doc.get('doctorName'), doc.get('date'), doc.get('time'))
+    try:
+        date.fromisoformat(doc['date'])
+    except ValueError:
+        raise ValueError(f"{doc['date']} is not a valid date")
+    appointment_type = doc.setdefault('appointmentType', 'Offline')
+    if appointment_type not in APPOINTMENT_TYPES:
+        raise ValueError(f"appointmentType must be one of {', '.join(APPOINTMENT_TYPES)}")
+    if not doc.get('patientName') and not doc.get('patientEmail'):
+        raise ValueError('patientName or patientEmail is required')
+    return doc
+
+
+# --- Import ---
+class ImportReport:
+    def __init__(self):
+        self.received = 0
+        self.written = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, row_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def to_dict(self):
+        return {'received': self.received, 'written': self.written, 'failed': self.failed,
+                'errors': self.errors, 'errorsTruncated': self.failed > len(self.errors)}
+
+
+# An unreadable upload (bad CSV quoting, NUL bytes, non-UTF-8) stops the import where it broke.
+READ_ERRORS = (csv.Error, UnicodeDecodeError)
+
+
+def _batches(rows, validate, report, batch_size):
+    """Validates rows and groups the valid ones into (row_numbers, docs) batches.
+
+    If reading fails part-way, the rows before the failure are still yielded
+    before the READ_ERRORS exception propagates, so the report stays exact.
+    """
+    numbers, docs = [], []
+    try:
+        for number, row in rows:
+            report.received += 1
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                doc = validate(row)
+            except ValueError as e:
+                report.error(number, str(e))
+                continue
+            numbers.append(number)
+            docs.append(doc)
+            if len(docs) >= batch_size:
+                yield numbers, docs
+                numbers, docs = [], []
+    except READ_ERRORS:
+        if docs:
+            yield numbers, docs
+        raise
+    if docs:
+        yield numbers, docs
+
+
+def _write_errors(e):
+    return [(error['index'], error.get('errmsg', 'write failed')) for error in e.details.get('writeErrors', [])]
+
+
+def _duplicate_message(message):
+    return 'Duplicate: this slot is already booked' if 'E11000' in message else message
+
+
+def import_doctors(collection, rows, batch_size=DEFAULT_BATCH_SIZE, upsert=False, report=None):
+    """Inserts doctors, or with upsert=True updates existing ones matched on (name, domain).
+
+    Pass a `report` to keep the partial counts if the upload turns out to be unreadable.
+    """
+    report = report if report is not None else ImportReport()
+    for numbers, docs in _batches(rows, validate_doctor, report, batch_size):
+        try:
+            if upsert:
+                result = collection.bulk_write([
+                    UpdateOne({'name': doc['name'], 'domain': doc['domain']}, {'$set': doc}, upsert=True)
+                    for doc in docs
+                ], ordered=False)
+                report.written += result.upserted_count + result.matched_count
+            else:
+                report.written += len(collection.insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            details = e.details
+            report.written += details.get('nInserted', 0) + details.get('nUpserted', 0) + details.get('nMatched', 0)
+            for index, message in _write_errors(e):
+                report.error(numbers[index], message)
+    return report
+
+
+def import_appointments(collection, slot_ledger, rows, batch_size=DEFAULT_BATCH_SIZE, report=None):
+    """Inserts appointments, claiming each slot in the ledger first, like a normal booking.
+
+    Pass a `report` to keep the partial counts if the upload turns out to be unreadable.
+    """
+    report = report if report is not None else ImportReport()
+    for numbers, docs in _batches(rows, validate_appointment, report, batch_size):
+        for doc in docs:
+            doc['_id'] = ObjectId()
+        claims = [(doc['doctorName'], doc['date'], doc['time'], doc['_id']) for doc in docs]
+        settled = False
+        try:
+            taken = slot_ledger.claim_many(claims)
+            for index in sorted(taken):
+                report.error(numbers[index], 'Duplicate: this slot is already booked')
+            keep = [i for i in range(len(docs)) if i not in taken]
+            failed = []
+            if keep:
+                try:
+                    collection.insert_many([docs[i] for i in keep], ordered=False)
+                except BulkWriteError as e:
+                    for index, message in _write_errors(e):
+                        failed.append(keep[index])
+                        report.error(numbers[keep[index]], _duplicate_message(message))
+                slot_ledger.release_many([claims[i] for i in failed])
+            report.written += len(keep) - len(failed)
+            settled = True
+        finally:
+            if not settled:
+                _release_unwritten(collection, slot_ledger, claims)
+    return report
+
+
+def _release_unwritten(collection, slot_ledger, claims):
+    """After a failed batch, frees the claims whose appointment never made it into the collection."""
+    try:
+        written = {doc['_id'] for doc in collection.find({'_id': {'$in': [claim[3] for claim in claims]}}, {'_id': 1})}
+        slot_ledger.release_many([claim for claim in claims if claim[3] not in written])
+    except Exception as e:
+        # The original error is re-raised; `python slot_ledger.py --rebuild` frees anything left over.
+        print(f"Error releasing slots after a failed import batch: {e}")
+
+
+# --- Export ---
+def export_query(kind, doctor_name=None, user_id=None, date_from=None, date_to=None):
+    """Returns (filter, sort) for an export; the sorts follow existing indexes."""
+    query = {}
+    if kind == 'doctors':
+        return query, [('_id', ASCENDING)]
+    if date_from or date_to:
+        # Appointment dates are YYYY-MM-DD strings; health record dates are datetimes.
+        as_bound = date.isoformat if kind == 'appointments' else (lambda day: datetime.combine(day, time()))
+        query['date'] = {}
+        if date_from:
+            query['date']['$gte'] = as_bound(date.fromisoformat(date_from))
+        if date_to:
+            query['date']['$lt'] = as_bound(date.fromisoformat(date_to) + timedelta(days=1))
+    if kind == 'appointments':
+        if doctor_name:
+            query['doctorName'] = doctor_name
+        return query, [('doctorName', ASCENDING), ('date', ASCENDING), ('time', ASCENDING)]
+    if user_id:
+        query['userId'] = user_id
+    return query, [('userId', ASCENDING), ('date', ASCENDING), ('_id', ASCENDING)]
+
+
+EXPORT_FIELDS = {
+    'doctors': DOCTOR_FIELDS,
+    'appointments': APPOINTMENT_FIELDS,
+    'health-records': HEALTH_RECORD_FIELDS,
+}
+
+
+def _csv_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return LIST_SEPARATOR.join(str(item) for item in value)
+    return value
+
+
+def export_lines(cursor, fields, fmt):
+    """Yields the documents as CSV (with a header) or NDJSON lines, one at a time."""
+    columns = ['_id'] + fields
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def line(values):
+            writer.writerow(values)
+            value = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return value
+
+        yield line(columns)
+        for doc in cursor:
+            yield line([_csv_cell(doc.get(column)) for column in columns])
+        return
+    for doc in cursor:
+        yield json.dumps({column: doc[column] for column in columns if column in doc}, default=str) + '\n'
+
+
+def export_cursor(collection, kind, batch_size=DEFAULT_BATCH_SIZE, **filters):
+    query, sort = export_query(kind, **filters)
+    projection = {field: 1 for field in EXPORT_FIELDS[kind]}
+    return collection.find(query, projection).sort(sort).batch_size(batch_size)
+
+
+def main():
+    from pymongo import MongoClient
+
+    from db_indexes import ensure_indexes
+    from doctor_search import bump_version
+    from slot_ledger import SlotLedger
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'))
+    parser.add_argument('--db', default=os.environ.get('MONGO_DB', 'medismart_db'))
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    importer = commands.add_parser('import', help='Import a CSV or NDJSON file')
+    importer.add_argument('kind', choices=['doctors', 'appointments'])
+    importer.add_argument('path', help="Input file, or - for stdin")
+    importer.add_argument('--format', choices=FORMATS)
+    importer.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    importer.add_argument('--upsert', action='store_true', help='Doctors: update existing (name, domain) matches')
+
+    exporter = commands.add_parser('export', help='Export to CSV or NDJSON')
+    exporter.add_argument('kind', choices=list(EXPORT_FIELDS))
+    exporter.add_argument('-o', '--output', help='Output file (default: stdout)')
+    exporter.add_argument('--format', choices=FORMATS)
+    exporter.add_argument('--doctor-name')
+    exporter.add_argument('--user-id')
+    exporter.add_argument('--from', dest='date_from', help='YYYY-MM-DD, inclusive')
+    exporter.add_argument('--to', dest='date_to', help='YYYY-MM-DD, inclusive')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri)[args.db]
+    if args.command == 'import':
+        ensure_indexes(db)
+        fmt = args.format or detect_format(args.path)
+        stream = sys.stdin.buffer if args.path == '-' else open(args.path, 'rb')
+        report = ImportReport()
+        read_error = None
+        with stream:
+            rows = read_rows(stream, fmt)
+            try:
+                if args.kind == 'doctors':
+                    import_doctors(db.doctors, rows, args.batch_size, upsert=args.upsert, report=report)
+                else:
+                    import_appointments(db.appointments, SlotLedger(db.slot_ledger), rows, args.batch_size,
+                                        report=report)
+            except READ_ERRORS as e:
+                read_error = e
+        if args.kind == 'doctors' and report.written:
+            bump_version(db.counters)  # Running app processes reload their search index
+        print(json.dumps(report.to_dict(), indent=2))
+        if read_error is not None:
+            sys.exit(f"Import stopped after {report.received} rows: the file could not be read ({read_error})")
+        return
+
+    fmt = args.format or detect_format(args.output)
+    collection = db[args.kind.replace('-', '_')]
+    cursor = export_cursor(collection, args.kind, doctor_name=args.doctor_name, user_id=args.user_id,
+                           date_from=args.date_from, date_to=args.date_to)
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for line in export_lines(cursor, EXPORT_FIELDS[args.kind], fmt):
+            out.write(line)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+import json
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+# --- ElderCare Change Feed ---
+# Pushes per-user deltas for medications, appointments and health records over
+# server-sent events, so dashboards no longer poll. On a replica set (a
+# single-node one is enough: `mongod --replSet rs0` then `rs.initiate()`),
+# changes come from a MongoDB change stream and reach every app process. On a
+# standalone server, the routes publish their own writes to an in-process
+# event bus. Medication reminder due-times are computed here, so the browser
+# only renders what it is sent.
+
+WATCHED_COLLECTIONS = ('appointments', 'medications', 'health_records')
+MODE_CHANGE_STREAM = 'changestream'
+MODE_BUS = 'bus'
+# Consecutive change-stream failures (without ever opening) before falling back to the bus
+MAX_WATCH_FAILURES = 5
+# Real UTC offsets run from -14:00 to +12:00; anything outside +/-14h is rejected
+MAX_TZ_OFFSET = 840
+
+
+def routing_keys(collection_name, doc):
+    """Subscriber keys that should receive a change to this document."""
+    if collection_name == 'appointments':
+        keys = []
+        if doc.get('patientId'):
+            keys.append(f"user:{doc['patientId']}")
+        if doc.get('doctorName'):
+            keys.append(f"doctor:{doc['doctorName']}")
+        return keys
+    return [f"user:{doc['userId']}"] if doc.get('userId') else []
+
+
+def subscriber_keys(user):
+    keys = [f"user:{user.id}"]
+    if user.role == 'Doctor':
+        keys.append(f"doctor:{user.name}")
+    return keys
+
+
+def parse_time(time_str):
+    """Returns (hour, minute) for a valid 'HH:MM' time of day, else None."""
+    try:
+        hour, minute = (int(part) for part in str(time_str).split(':')[:2])
+    except ValueError:
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour, minute
+
+
+def parse_tz_offset(value):
+    """Returns a Date.getTimezoneOffset() value in minutes, or None if it is not an integer within MAX_TZ_OFFSET."""
+    try:
+        offset = int(value)
+    except (TypeError, ValueError):
+        return None
+    return offset if -MAX_TZ_OFFSET <= offset <= MAX_TZ_OFFSET else None
+
+
+def next_due(time_str, tz_offset, now=None):
+    """Next UTC instant at which a daily 'HH:MM' local-time dose is due, or None for an invalid time.
+
+    tz_offset is the browser's Date.getTimezoneOffset(): minutes to add to
+    local time to get UTC.
+    """
+    parsed = parse_time(time_str)
+    if parsed is None:
+        return None
+    hour, minute = parsed
+    now = now or datetime.utcnow()
+    local_now = now - timedelta(minutes=tz_offset)
+    due_local = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if due_local <= local_now:
+        due_local += timedelta(days=1)
+    return due_local + timedelta(minutes=tz_offset)
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class Subscription:
+    def __init__(self, keys, queue_size):
+        self.keys = keys
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class EventBus:
+    """In-process publish/subscribe keyed by subscriber keys."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, keys):
+        sub = Subscription(keys, self.queue_size)
+        with self._lock:
+            for key in keys:
+                self._subscribers.setdefault(key, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for key in sub.keys:
+                subs = self._subscribers.get(key)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[key]
+
+    def publish(self, keys, event):
+        with self._lock:
+            targets = set()
+            for key in keys:
+                targets |= self._subscribers.get(key, set())
+        for sub in targets:
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                sub.overflowed = True  # The client is told to resync instead
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({sub for subs in self._subscribers.values() for sub in subs})
+
+
+class ChangeFeed:
+    """Feeds collection changes into an EventBus from a change stream or from the app's own writes."""
+
+    def __init__(self, db, projections, mode='auto', heartbeat=25, max_streams=16):
+        self.db = db
+        self.projections = projections
+        self.requested_mode = mode
+        self.mode = None
+        self.heartbeat = heartbeat
+        # Each open event stream holds a server thread, so this process serves at most this many at once.
+        self.max_streams = max_streams
+        self.open_streams = 0
+        self.bus = EventBus()
+        self.pre_images = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Picks change streams when MongoDB is a replica set, else the in-process bus. Safe to call repeatedly."""
+        with self._lock:
+            if self.mode is not None:
+                return self.mode
+            mode = self.requested_mode
+            if mode == 'auto':
+                try:
+                    is_replica_set = bool(self.db.client.admin.command('hello').get('setName'))
+                except Exception as e:
+                    print(f"Change feed: could not inspect MongoDB topology: {e}")
+                    is_replica_set = False
+                mode = MODE_CHANGE_STREAM if is_replica_set else MODE_BUS
+            if mode == MODE_CHANGE_STREAM:
+                self.pre_images = self._enable_pre_images()
+                self._thread = threading.Thread(target=self._watch, name='change-feed', daemon=True)
+                self._thread.start()
+            self.mode = mode
+            print(f"--- Change feed running in '{mode}' mode ---")
+            return mode
+
+    def _enable_pre_images(self):
+        """Turns on pre-images for the watched collections. Returns False if the server cannot provide them."""
+        # Delete events only carry the _id; pre-images (MongoDB 6.0+) tell us whose document it was.
+        try:
+            version = self.db.client.server_info().get('versionArray', [0])
+        except Exception as e:
+            print(f"Change feed: could not read the MongoDB version, deletes will not be pushed: {e}")
+            return False
+        if version[0] < 6:
+            print("Change feed: MongoDB is older than 6.0, so there are no pre-images; deletes will not be pushed")
+            return False
+        enabled = True
+        for name in WATCHED_COLLECTIONS:
+            try:
+                self.db.command('collMod', name, changeStreamPreAndPostImages={'enabled': True})
+            except Exception as e:
+                print(f"Change feed: pre-images unavailable for {name}, deletes will not be pushed: {e}")
+                enabled = False
+        return enabled
+
+    def _project(self, collection_name, doc):
+        fields = self.projections.get(collection_name, {})
+        projected = {field: doc[field] for field in fields if field in doc}
+        projected['_id'] = str(doc['_id'])
+        return projected
+
+    def _dispatch(self, collection_name, op, doc):
+        keys = routing_keys(collection_name, doc)
+        if not keys:
+            return
+        event = {'collection': collection_name, 'op': op, 'id': str(doc['_id'])}
+        if op != 'delete':
+            event['doc'] = self._project(collection_name, doc)
+        self.bus.publish(keys, event)
+
+    def publish_change(self, collection_name, op, doc):
+        """Called by routes after a write. Ignored when a change stream is already delivering changes."""
+        if self.mode == MODE_BUS:
+            self._dispatch(collection_name, op, doc)
+
+    def _watch(self):
+        pipeline = [{'$match': {'ns.coll': {'$in': list(WATCHED_COLLECTIONS)},
+                                'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}]
+        options = {'full_document': 'updateLookup'}
+        if self.pre_images:
+            # Servers before 6.0 reject this option outright.
+            options['full_document_before_change'] = 'whenAvailable'
+        resume_token = None
+        failures = 0
+        while True:
+            try:
+                with self.db.watch(pipeline, resume_after=resume_token, **options) as stream:
+                    failures = 0
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        op = change['operationType']
+                        if op == 'delete':
+                            doc = change.get('fullDocumentBeforeChange')
+                        else:
+                            doc = change.get('fullDocument')
+                            op = 'insert' if op == 'insert' else 'update'
+                        if doc:
+                            self._dispatch(change['ns']['coll'], op, doc)
+            except Exception as e:
+                failures += 1
+                if failures >= MAX_WATCH_FAILURES:
+                    # Only this process's own writes reach its subscribers from here on.
+                    self.mode = MODE_BUS
+                    print(f"\n!!! Change feed: the change stream failed {failures} times in a row ({e}). "
+                          f"Falling back to '{MODE_BUS}' mode; changes made by other processes will not be "
+                          f"pushed until restart. !!!\n")
+                    return
+                print(f"Change feed: change stream error, reconnecting: {e}")
+                time.sleep(2 * failures)
+
+    # --- Server-sent event stream ---
+    def open_stream(self):
+        """Reserves one of the process's stream slots. Returns False when all are taken."""
+        with self._lock:
+            if self.open_streams >= self.max_streams:
+                return False
+            self.open_streams += 1
+            return True
+
+    def close_stream(self):
+        with self._lock:
+            self.open_streams = max(0, self.open_streams - 1)
+
+    def _schedule(self, medications, tz_offset, now):
+        due = {}
+        for med_id, med in medications.items():
+            due_at = next_due(med.get('time'), tz_offset, now)
+            if due_at is not None:
+                due[med_id] = due_at
+        return due
+
+    def event_stream(self, user, load_medications, tz_offset=0):
+        """Yields SSE messages for one user until the client disconnects.
+
+        Events: `schedule` (medications with their next dueAt), `change`
+        (a collection delta), `reminder` (a dose is due now), and `resync`
+        (the client fell behind and should reload).
+        """
+        sub = self.bus.subscribe(subscriber_keys(user))
+        try:
+            medications = {m['_id']: m for m in load_medications()}
+            due = self._schedule(medications, tz_offset, datetime.utcnow())
+            yield sse('schedule', self._schedule_payload(medications, due))
+            while True:
+                now = datetime.utcnow()
+                wait = self.heartbeat
+                if due:
+                    wait = max(0.0, min(wait, (min(due.values()) - now).total_seconds()))
+                try:
+                    event = sub.queue.get(timeout=wait)
+                except queue.Empty:
+                    event = None
+
+                messages = []
+                if sub.overflowed:
+                    sub.overflowed = False
+                    medications = {m['_id']: m for m in load_medications()}
+                    due = self._schedule(medications, tz_offset, datetime.utcnow())
+                    messages.append(sse('resync', {}))
+                    messages.append(sse('schedule', self._schedule_payload(medications, due)))
+                elif event is not None:
+                    messages.append(sse('change', event))
+                    if event['collection'] == 'medications':
+                        if event['op'] == 'delete':
+                            medications.pop(event['id'], None)
+                        else:
+                            medications[event['id']] = event['doc']
+                        due = self._schedule(medications, tz_offset, datetime.utcnow())
+                        messages.append(sse('schedule', self._schedule_payload(medications, due)))
+
+                now = datetime.utcnow()
+                for med_id, due_at in list(due.items()):
+                    if due_at <= now:
+                        messages.append(sse('reminder', {**medications[med_id], 'dueAt': due_at.isoformat() + 'Z'}))
+                        due[med_id] = next_due(medications[med_id].get('time'), tz_offset, due_at + timedelta(seconds=1))
+
+                yield ''.join(messages) if messages else ': keepalive\n\n'
+        finally:
+            self.bus.unsubscribe(sub)
+
+    @staticmethod
+    def _schedule_payload(medications, due):
+        return [{**med, 'dueAt': due[med_id].isoformat() + 'Z' if med_id in due else None}
+                for med_id, med in medications.items()]
@@ -0,0 +1,66 @@
+import os
+
+# --- Application Configuration ---
+# Every setting can be overridden from the environment (or .env). create_app()
+# in app.py loads this object; pass a subclass to create_app() to change
+# settings in code, e.g. for the benchmark harness.
+
+
+def env_flag(name, default):
+    return os.environ.get(name, 'true' if default else 'false').lower() == 'true'
+
+
+class Config:
+    # Must be identical in every worker process, or sessions made by one
+    # worker are rejected by the others. gunicorn.conf.py generates a shared
+    # one when it is missing; set it explicitly so sessions survive restarts.
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    # Off unless FLASK_DEBUG=true; `python app.py` and `flask run` both read it from here.
+    DEBUG = env_flag('FLASK_DEBUG', False)
+    PORT = int(os.environ.get('PORT', 5000))
+
+    # --- MongoDB ---
+    MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+    MONGO_DB = os.environ.get('MONGO_DB', 'medismart_db')
+    MONGO_AUTO_INDEX = env_flag('MONGO_AUTO_INDEX', True)
+
+    # --- Mail ---
+    # MAIL_SERVER/MAIL_PORT/MAIL_USE_TLS can be overridden to point at a local
+    # debugging server, e.g. `python -m aiosmtpd -n -l localhost:1025` with
+    # MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_USE_TLS=false.
+    MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USE_TLS = env_flag('MAIL_USE_TLS', True)
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_USERNAME')
+
+    # --- Background services ---
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    CHANGE_FEED_MODE = os.environ.get('CHANGE_FEED_MODE', 'auto')
+    # Open ElderCare event streams per process. Each holds a server thread;
+    # gunicorn.conf.py adds this many threads on top of GUNICORN_THREADS.
+    SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 16))
+    AI_CACHE_PERSISTENT = env_flag('AI_CACHE_PERSISTENT', True)
+    # Load the scikit-learn models in create_app() instead of on first use.
+    # gunicorn.conf.py turns this on so forked workers start warm.
+    WARM_MODELS = env_flag('WARM_MODELS', False)
+    # Retrain the learned scheduler on the booking history this often
+    # (seconds); 0 turns periodic retraining off.
+    SCHEDULER_RETRAIN_INTERVAL = int(os.environ.get('SCHEDULER_RETRAIN_INTERVAL', 6 * 3600))
+    SCHEDULER_BUSY_THRESHOLD = float(os.environ.get('SCHEDULER_BUSY_THRESHOLD', 0.5))
+
+    # --- Doctor directory search (see doctor_search.py): 'memory' or 'mongo' ---
+    DOCTOR_SEARCH_MODE = os.environ.get('DOCTOR_SEARCH_MODE', 'memory')
+    DOCTOR_SEARCH_CHECK_INTERVAL = float(os.environ.get('DOCTOR_SEARCH_CHECK_INTERVAL', 5))
+
+    # --- Bulk import/export (see bulk_io.py); the /api/bulk/ routes are off while unset ---
+    BULK_API_TOKEN = os.environ.get('BULK_API_TOKEN')
+
+    # --- Instrumentation (see instrumentation.py) ---
+    # Profiling needs PROFILE_TOKEN too; requests opt in with `X-Profile: <token>`.
+    PROFILING_ENABLED = env_flag('PROFILING_ENABLED', False)
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    REQUEST_LOG_SLOW_MS = float(os.environ['REQUEST_LOG_SLOW_MS']) if os.environ.get('REQUEST_LOG_SLOW_MS') else None
@@ -0,0 +1,98 @@
+import os
+import threading
+
+from pymongo import MongoClient
+
+# --- Process-local MongoDB Client ---
+# A MongoClient must not be shared across fork(): its connection pool and
+# monitor threads belong to the parent. The app's module-level collections are
+# proxies that resolve against a client owned by the current process, so the
+# same code works under the dev server, a preloading gunicorn master and its
+# forked workers. No connection is opened until the first operation.
+
+
+class ProcessLocalMongo:
+    def __init__(self, uri='mongodb://localhost:27017/', db_name='medismart_db', **client_options):
+        self.uri = uri
+        self.db_name = db_name
+        self.client_options = client_options
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def configure(self, uri, db_name):
+        """Points at a different server or database; later operations use a fresh client."""
+        with self._lock:
+            if (uri, db_name) != (self.uri, self.db_name):
+                self.uri, self.db_name = uri, db_name
+                self._client = None
+
+    @property
+    def client(self):
+        pid = os.getpid()
+        if self._client is None or self._pid != pid:
+            with self._lock:
+                if self._client is None or self._pid != pid:
+                    # After a fork the inherited client is abandoned, not closed:
+                    # closing it would touch sockets the parent still uses.
+                    self._client = MongoClient(self.uri, connect=False, **self.client_options)
+                    self._pid = pid
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
+
+    def database(self):
+        return DatabaseProxy(self)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+
+
+class DatabaseProxy:
+    """Behaves like a pymongo Database bound to the current process's client."""
+
+    def __init__(self, mongo):
+        self._mongo = mongo
+        self._collections = {}
+
+    def __getitem__(self, name):
+        proxy = self._collections.get(name)
+        if proxy is None:
+            proxy = self._collections.setdefault(name, CollectionProxy(self._mongo, name))
+        return proxy
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._mongo.db, name)
+
+
+class CollectionProxy:
+    """Behaves like a pymongo Collection bound to the current process's client."""
+
+    def __init__(self, mongo, name):
+        self._mongo = mongo
+        self._name = name
+        self._client = None
+        self._target = None
+
+    @property
+    def _collection(self):
+        client = self._mongo.client
+        if client is not self._client:
+            self._target = client[self._mongo.db_name][self._name]
+            self._client = client
+        return self._target
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._collection, name)
+
+    def __repr__(self):
+        return f"CollectionProxy({self._mongo.db_name}.{self._name})"
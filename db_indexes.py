@@ -0,0 +1,166 @@
+"""Index declarations for every MediSmart Mongo collection.
+
+`ensure_indexes(db)` runs at app startup and creates anything missing.
+Run this module directly to create the indexes by hand, or with --explain to
+run each route's query through explain() and flag collection scans and
+in-memory sorts:
+
+    python db_indexes.py --explain
+"""
+import argparse
+import os
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, MongoClient
+from pymongo.errors import OperationFailure
+
+# --- Index Declarations ---
+# collection -> list of (keys, options). Names are given explicitly so that
+# changed options show up as a conflict instead of a silent duplicate.
+INDEXES = {
+    'users': [
+        ([('email', ASCENDING)], {'name': 'email_unique', 'unique': True}),
+    ],
+    'doctors': [
+        ([('domain', ASCENDING), ('name', ASCENDING)], {'name': 'domain_name'}),
+        # Directory search in DOCTOR_SEARCH_MODE=mongo filters on normalized keys (see doctor_search.py)
+        ([('filterKeys.domain', ASCENDING), ('name', ASCENDING)], {'name': 'filter_domain_name'}),
+        ([('filterKeys.location', ASCENDING), ('name', ASCENDING)], {'name': 'filter_location_name'}),
+        ([('name', ASCENDING)], {'name': 'name'}),
+        ([('name', TEXT), ('specialization', TEXT), ('domain', TEXT), ('hospitalName', TEXT),
+          ('hospitalLocation', TEXT)],
+         {'name': 'doctor_text', 'weights': {'name': 3, 'specialization': 2, 'domain': 2}}),
+    ],
+    'appointments': [
+        # One booking per doctor/date/time; also serves doctorName-only and doctorName+date lookups.
+        ([('doctorName', ASCENDING), ('date', ASCENDING), ('time', ASCENDING)],
+         {'name': 'doctor_date_time_unique', 'unique': True}),
+        # Doctor dashboard pages sort on date, time and _id (see APPOINTMENT_SORT in app.py)
+        ([('doctorName', ASCENDING), ('date', ASCENDING), ('time', ASCENDING), ('_id', ASCENDING)],
+         {'name': 'doctor_date_time'}),
+        ([('patientId', ASCENDING), ('date', ASCENDING), ('time', ASCENDING), ('_id', ASCENDING)],
+         {'name': 'patient_date_time'}),
+    ],
+    'slot_ledger': [
+        ([('doctorName', ASCENDING), ('date', ASCENDING)], {'name': 'doctor_date'}),
+    ],
+    'health_records': [
+        ([('userId', ASCENDING), ('date', DESCENDING), ('_id', DESCENDING)], {'name': 'user_date'}),
+    ],
+    'health_series': [
+        # Series queries match one user's metric over a day range (see health_series.py).
+        ([('userId', ASCENDING), ('metric', ASCENDING), ('day', ASCENDING)], {'name': 'user_metric_day'}),
+    ],
+    'medications': [
+        ([('userId', ASCENDING), ('_id', ASCENDING)], {'name': 'user'}),
+    ],
+    'jobs': [
+        ([('status', ASCENDING), ('runAt', ASCENDING)], {'name': 'status_run_at'}),
+        ([('status', ASCENDING), ('lockedAt', ASCENDING)], {'name': 'status_locked_at'}),
+    ],
+    'ai_cache': [
+        ([('expiresAt', ASCENDING)], {'name': 'expires_at_ttl', 'expireAfterSeconds': 0}),
+    ],
+    'user_invalidations': [
+        # Every process polls for markers newer than the last it saw (see user_cache.py).
+        ([('at', ASCENDING)], {'name': 'at'}),
+        ([('expiresAt', ASCENDING)], {'name': 'expires_at_ttl', 'expireAfterSeconds': 0}),
+    ],
+}
+
+
+def ensure_indexes(db):
+    """Creates every declared index. Returns a list of (collection, index, error) failures."""
+    failures = []
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for keys, options in indexes:
+            try:
+                collection.create_index(keys, **options)
+            except OperationFailure as e:
+                # e.g. existing duplicates blocking a unique index, or an option conflict
+                print(f"Index {collection_name}.{options['name']} could not be created: {e}")
+                failures.append((collection_name, options['name'], str(e)))
+    return failures
+
+
+# --- Query Plan Diagnostics ---
+def route_queries(db):
+    """The queries each route issues, as (label, cursor) pairs ready for explain()."""
+    sample_id = ObjectId()
+    return [
+        ('login/signup: users by email', db.users.find({'email': 'someone@example.com'})),
+        ('load_user: users by _id', db.users.find({'_id': sample_id})),
+        ('schedule-suggestions: slot ledger day', db.slot_ledger.find({'_id': '["Smith","2025-01-01"]'}, {'slots': 1})),
+        ('availability: slot ledger by doctors+date range',
+         db.slot_ledger.find({'doctorName': {'$in': ['Smith', 'Jones']},
+                              'date': {'$gte': '2025-01-01', '$lte': '2025-01-07'}})),
+        ('availability: doctors by domain', db.doctors.find({'domain': 'Cardiologist'}, {'name': 1, '_id': 0})),
+        ('my-appointments: patient page',
+         db.appointments.find({'patientId': str(sample_id)}).sort([('date', 1), ('time', 1), ('_id', 1)]).limit(21)),
+        ('my-appointments: doctor page',
+         db.appointments.find({'doctorName': 'Smith'}).sort([('date', 1), ('time', 1), ('_id', 1)]).limit(21)),
+        ('cancel: appointment by _id', db.appointments.find({'_id': sample_id})),
+        ('health-records: user page, newest first',
+         db.health_records.find({'userId': str(sample_id)}).sort([('date', -1), ('_id', -1)]).limit(21)),
+        ('health-records: series buckets for a metric',
+         db.health_series.find({'userId': str(sample_id), 'metric': 'blood_pressure',
+                                'day': {'$gte': datetime(2025, 1, 1), '$lt': datetime(2025, 4, 1)}},
+                               {'day': 1, 'count': 1, 'summary': 1})),
+        ('medications: user', db.medications.find({'userId': str(sample_id)}).sort('_id', 1)),
+        ('doctors: listing page', db.doctors.find({}).sort('_id', 1).limit(21)),
+        ('doctors: search by location (mongo mode)',
+         db.doctors.find({'filterKeys.location': 'pune'}).sort('name', 1).limit(20)),
+        ('doctors: directory page (mongo mode)', db.doctors.find({}).sort('name', 1).limit(20)),
+        ('jobs: claim next due job',
+         db.jobs.find({'status': 'queued', 'runAt': {'$lte': datetime.utcnow()}}).sort('runAt', ASCENDING)),
+        ('user cache: invalidations since last sync', db.user_invalidations.find({'at': {'$gt': 0}}, {'at': 1})),
+        ('ai cache: lookup by key', db.ai_cache.find({'_id': 'symptom:x', 'expiresAt': {'$gt': datetime.utcnow()}})),
+    ]
+
+
+def plan_stages(plan):
+    """Returns every stage name in a winning plan tree."""
+    plan = plan.get('queryPlan', plan)  # Slot-based engine wraps the classic plan
+    stages = [plan.get('stage')]
+    for child_key in ('inputStage', 'outerStage', 'innerStage'):
+        if child_key in plan:
+            stages += plan_stages(plan[child_key])
+    for child in plan.get('inputStages', []):
+        stages += plan_stages(child)
+    return [s for s in stages if s]
+
+
+def explain_routes(db):
+    """Explains each route query and prints its plan. Returns the labels of plans that scan or sort in memory."""
+    flagged = []
+    for label, cursor in route_queries(db):
+        stages = plan_stages(cursor.explain()['queryPlanner']['winningPlan'])
+        problems = [s for s in stages if s in ('COLLSCAN', 'SORT')]
+        marker = 'FLAG' if problems else 'ok  '
+        print(f"[{marker}] {label}: {' <- '.join(stages)}")
+        if problems:
+            flagged.append(label)
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'))
+    parser.add_argument('--db', default=os.environ.get('MONGO_DB', 'medismart_db'))
+    parser.add_argument('--explain', action='store_true', help='Explain each route query and flag COLLSCANs')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri)[args.db]
+    failures = ensure_indexes(db)
+    print(f"--- Indexes ensured ({len(failures)} failed) ---")
+    if args.explain:
+        flagged = explain_routes(db)
+        print(f"--- {len(flagged)} route queries use a collection scan or in-memory sort ---")
+        raise SystemExit(1 if flagged or failures else 0)
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
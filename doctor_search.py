@@ -0,0 +1,344 @@
+"""Doctor directory search.
+
+Search takes an optional free-text query plus filters for domain (the
+specialty), specialization, hospital, location and appointment type. The
+results are ranked and paginated on the server, so pages no longer download
+the whole directory to filter it in the browser.
+
+Each app process holds the directory in an in-process inverted index:
+
+- Every word of a doctor's name, specialization, domain, hospital and
+  location is a token. A token posts to the doctors it appears for, weighted
+  by field, so a name hit outranks a hospital hit.
+- Query words match tokens exactly, by prefix (search as you type), or,
+  from four letters up, within about one typo. Typos are found through a
+  deletion neighbourhood: a word and a token match when deleting at most one
+  letter from each makes them equal.
+- Each doctor's score is the sum of its best match per query word. Every
+  word must match. Ties go to name order.
+
+The index is rebuilt from a snapshot outside any lock and swapped in as a
+whole, so readers never wait for a rebuild. Writes bump a version counter in MongoDB. The writing process
+applies its own change at once. Other processes read the counter at most
+every `check_interval` seconds and reload when it has moved. The version
+also serves as the ETag for search and facet responses, so an unchanged
+listing is answered with a 304 before any search work is done.
+
+With mode='mongo', queries go to MongoDB instead, using the text index and
+the compound indexes on the doctors collection (see db_indexes.py). Use it
+for directories too large to hold in every worker. It keeps the filters and
+ranking by text score but loses prefix and typo matching. Filters match the
+normalized copies each doctor stores under `filterKeys` (see filter_keys()),
+so they ignore case, punctuation and spacing exactly as the in-process
+index does. Writers must store them; backfill_filter_keys() adds any that
+are missing.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from pymongo import ReturnDocument, UpdateOne
+
+# Field weights for ranking
+SEARCH_FIELDS = {'name': 3.0, 'specialization': 2.0, 'domain': 2.0, 'hospitalName': 1.0, 'hospitalLocation': 1.0}
+# Match quality multipliers
+EXACT, PREFIX, FUZZY = 1.0, 0.6, 0.35
+MIN_FUZZY_LENGTH = 4
+MAX_PREFIX_EXPANSIONS = 50
+# Query parameter -> doctor field, for exact (case-insensitive) filters
+FILTERS = {'domain': 'domain', 'specialization': 'specialization', 'hospital': 'hospitalName',
+           'location': 'hospitalLocation'}
+FACETS = {'domains': 'domain', 'locations': 'hospitalLocation', 'hospitals': 'hospitalName'}
+APPOINTMENT_TYPES = ('Online', 'Offline')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+DOCTOR_FIELDS = {'name': 1, 'domain': 1, 'degree': 1, 'specialization': 1, 'experience': 1,
+                 'hospitalName': 1, 'hospitalLocation': 1, 'contact': 1, 'image': 1, 'appointmentTypes': 1}
+VERSION_ID = 'doctors'
+FILTER_KEYS_FIELD = 'filterKeys'
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(value):
+    return _WORD.findall(value.casefold()) if isinstance(value, str) else []
+
+
+def normalize(value):
+    return ' '.join(tokenize(value))
+
+
+def filter_keys(doc):
+    """Normalized filter values to store on a doctor document under FILTER_KEYS_FIELD, for mode='mongo'."""
+    keys = {key: normalize(doc.get(field)) for key, field in FILTERS.items()}
+    return {key: value for key, value in keys.items() if value}
+
+
+def backfill_filter_keys(collection, batch_size=1000):
+    """Stores filter keys on doctors written without them. Returns the number updated."""
+    updated = 0
+    operations = []
+    for doc in collection.find({FILTER_KEYS_FIELD: {'$exists': False}}, dict.fromkeys(FILTERS.values(), 1)):
+        operations.append(UpdateOne({'_id': doc['_id']}, {'$set': {FILTER_KEYS_FIELD: filter_keys(doc)}}))
+        if len(operations) >= batch_size:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += collection.bulk_write(operations, ordered=False).modified_count
+    return updated
+
+
+def one_letter_deletes(token):
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def bump_version(versions_collection):
+    """Marks the directory as changed for every process. Returns the new version."""
+    doc = versions_collection.find_one_and_update({'_id': VERSION_ID}, {'$inc': {'version': 1}}, upsert=True,
+                                                  return_document=ReturnDocument.AFTER)
+    return doc['version']
+
+
+def offers(doc, appointment_type):
+    """Doctors without an appointmentTypes list take both kinds."""
+    types = doc.get('appointmentTypes')
+    return not types or appointment_type in types
+
+
+class DoctorIndex:
+    """Immutable inverted index over one snapshot of the doctors collection."""
+
+    def __init__(self, docs, version=0):
+        self.version = version
+        self.docs = {}
+        self.postings = defaultdict(dict)  # token -> {doctor id: best field weight}
+        self.filters = {key: defaultdict(set) for key in FILTERS}  # key -> normalized value -> ids
+        self.labels = {field: {} for field in FACETS.values()}  # field -> normalized value -> display value
+        for doc in docs:
+            self._add(doc)
+        self.tokens = sorted(self.postings)
+        self.fuzzy = defaultdict(set)  # one-letter deletion -> tokens
+        for token in self.tokens:
+            if len(token) >= MIN_FUZZY_LENGTH:
+                for variant in one_letter_deletes(token):
+                    self.fuzzy[variant].add(token)
+        order = sorted(self.docs, key=lambda doc_id: (normalize(self.docs[doc_id].get('name')), doc_id))
+        self.rank = {doc_id: i for i, doc_id in enumerate(order)}
+
+    def _add(self, doc):
+        doc_id = str(doc['_id'])
+        self.docs[doc_id] = {**doc, '_id': doc_id}
+        for field, weight in SEARCH_FIELDS.items():
+            for token in tokenize(doc.get(field)):
+                posting = self.postings[token]
+                posting[doc_id] = max(posting.get(doc_id, 0), weight)
+        for key, field in FILTERS.items():
+            value = normalize(doc.get(field))
+            if value:
+                self.filters[key][value].add(doc_id)
+                if field in self.labels:
+                    self.labels[field].setdefault(value, doc[field].strip())
+
+    def with_doc(self, doc, version):
+        return DoctorIndex(list(self.docs.values()) + [doc], version)
+
+    def expand(self, term):
+        """Index tokens matching one query word, with their match quality."""
+        matches = {}
+        start = bisect_left(self.tokens, term)
+        for token in self.tokens[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            matches[token] = EXACT if token == term else PREFIX
+        if len(term) >= MIN_FUZZY_LENGTH:
+            variants = one_letter_deletes(term)
+            candidates = set(self.fuzzy.get(term, ()))
+            for variant in variants:
+                candidates |= self.fuzzy.get(variant, set())
+                if variant in self.postings:
+                    candidates.add(variant)
+            for token in candidates:
+                matches.setdefault(token, FUZZY)
+        return matches
+
+    def search(self, query='', filters=None, appointment_type=None):
+        """Returns the matching doctor ids, best first."""
+        candidates = None
+        for key, value in (filters or {}).items():
+            ids = self.filters[key].get(normalize(value), set())
+            candidates = ids if candidates is None else candidates & ids
+        if appointment_type:
+            pool = self.docs if candidates is None else candidates
+            candidates = {doc_id for doc_id in pool if offers(self.docs[doc_id], appointment_type)}
+
+        terms = tokenize(query)
+        if not terms:
+            ids = self.docs if candidates is None else candidates
+            return sorted(ids, key=self.rank.__getitem__)
+
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token, quality in self.expand(term).items():
+                for doc_id, weight in self.postings[token].items():
+                    if candidates is not None and doc_id not in candidates:
+                        continue
+                    if quality * weight > term_scores.get(doc_id, 0):
+                        term_scores[doc_id] = quality * weight
+            if scores is not None:
+                term_scores = {doc_id: scores[doc_id] + s for doc_id, s in term_scores.items() if doc_id in scores}
+            scores = term_scores
+            if not scores:
+                return []
+        return sorted(scores, key=lambda doc_id: (-scores[doc_id], self.rank[doc_id]))
+
+    def facets(self):
+        return {facet: sorted(self.labels[field].values(), key=str.casefold) for facet, field in FACETS.items()}
+
+
+def parse_search_args(args):
+    """Returns (query, filters, appointment_type, page, limit) from the query string. Raises ValueError."""
+    filters = {key: args[key] for key in FILTERS if args.get(key)}
+    appointment_type = args.get('appointmentType') or None
+    if appointment_type and appointment_type not in APPOINTMENT_TYPES:
+        raise ValueError(f"appointmentType must be one of {', '.join(APPOINTMENT_TYPES)}")
+    try:
+        page = int(args.get('page', 1))
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('page and limit must be integers')
+    if page < 1 or limit < 1:
+        raise ValueError('page and limit must be positive')
+    return (args.get('q') or '').strip(), filters, appointment_type, page, min(limit, MAX_PAGE_SIZE)
+
+
+class DoctorSearch:
+    """Keeps the process's DoctorIndex current and answers search and facet queries."""
+
+    def __init__(self, collection, versions_collection, mode='memory', check_interval=5):
+        self.collection = collection
+        self.versions = versions_collection
+        self.mode = mode
+        self.check_interval = check_interval
+        self._index = None
+        self._version = 0
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    # --- Versioning ---
+    def current_version(self):
+        doc = self.versions.find_one({'_id': VERSION_ID}, {'version': 1})
+        return doc['version'] if doc else 0
+
+    def version(self):
+        """The directory version this process answers with; used as the ETag."""
+        if self.mode == 'mongo':
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                self._version, self._checked_at = self.current_version(), now
+            return self._version
+        return self.index().version
+
+    def etag(self):
+        return f"doctors-{self.mode}-{self.version()}"
+
+    # --- In-process index ---
+    def index(self):
+        now = time.monotonic()
+        if self._index is None or self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self._index
+
+    def refresh(self, force=False):
+        """Reloads the index if the stored version moved (or when forced). Returns the active version.
+
+        The new index is built without holding the lock; requests keep using
+        the old one until it is swapped in.
+        """
+        self._checked_at = time.monotonic()
+        # Read the version before the documents: a write landing mid-load bumps it again and is picked up next check.
+        version = self.current_version()
+        current = self._index
+        if current is not None and version == current.version and not force:
+            return version
+        started = time.monotonic()
+        index = DoctorIndex(self.collection.find({}, DOCTOR_FIELDS).batch_size(1000), version)
+        self._swap(index)
+        print(f"--- Doctor search index v{version}: {len(index.docs)} doctors, "
+              f"{len(index.tokens)} terms in {time.monotonic() - started:.2f}s ---")
+        return self._index.version
+
+    def _swap(self, index, expected=None):
+        """Installs `index` unless a newer one (or, given `expected`, any other one) got there first."""
+        with self._lock:
+            if expected is not None and self._index is not expected:
+                return False
+            if self._index is not None and self._index.version > index.version:
+                return False
+            self._index = index
+            return True
+
+    def record_insert(self, doc):
+        """Call after inserting a doctor: other processes see the new version, this one indexes the doc now."""
+        version = bump_version(self.versions)
+        if self.mode == 'mongo':
+            self._checked_at = None
+            return
+        current = self._index
+        if current is not None and current.version == version - 1:
+            index = current.with_doc({field: doc[field] for field in ('_id', *DOCTOR_FIELDS) if field in doc},
+                                     version)
+            if self._swap(index, expected=current):
+                return
+        self.refresh(force=True)
+
+    def mark_changed(self):
+        """Call after bulk or out-of-band writes to the doctors collection."""
+        bump_version(self.versions)
+        self._checked_at = None
+        if self.mode == 'mongo':
+            backfill_filter_keys(self.collection)
+        else:
+            self.refresh(force=True)
+
+    # --- Queries ---
+    def search(self, query='', filters=None, appointment_type=None, page=1, limit=DEFAULT_PAGE_SIZE):
+        """Returns {'items', 'total', 'page', 'limit', 'nextPage'} for one page of ranked results."""
+        if self.mode == 'mongo':
+            items, total = self._mongo_search(query, filters or {}, appointment_type, page, limit)
+        else:
+            index = self.index()
+            ids = index.search(query, filters, appointment_type)
+            total = len(ids)
+            items = [index.docs[doc_id] for doc_id in ids[(page - 1) * limit:page * limit]]
+        return {'items': items, 'total': total, 'page': page, 'limit': limit,
+                'nextPage': page + 1 if page * limit < total else None}
+
+    def _mongo_search(self, query, filters, appointment_type, page, limit):
+        criteria = {f'{FILTER_KEYS_FIELD}.{key}': normalize(value) for key, value in filters.items()}
+        if appointment_type:
+            criteria['$or'] = [{'appointmentTypes': appointment_type}, {'appointmentTypes': {'$exists': False}},
+                               {'appointmentTypes': {'$size': 0}}]
+        projection = dict(DOCTOR_FIELDS)
+        if query:
+            criteria['$text'] = {'$search': query}
+            projection['score'] = {'$meta': 'textScore'}
+            sort = [('score', {'$meta': 'textScore'}), ('name', 1)]
+        else:
+            sort = [('name', 1)]
+        total = self.collection.count_documents(criteria)
+        cursor = self.collection.find(criteria, projection).sort(sort).skip((page - 1) * limit).limit(limit)
+        items = [{**doc, '_id': str(doc['_id'])} for doc in cursor]
+        for item in items:
+            item.pop('score', None)
+        return items, total
+
+    def facets(self):
+        """Distinct domains, locations and hospitals, for filter dropdowns."""
+        if self.mode == 'mongo':
+            return {facet: sorted((value for value in self.collection.distinct(field) if isinstance(value, str)),
+                                  key=str.casefold)
+                    for facet, field in FACETS.items()}
+        return self.index().facets()
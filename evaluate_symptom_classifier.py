@@ -0,0 +1,95 @@
+"""Offline evaluation of the local symptom classifier.
+
+Trains on the bundled examples and scores a held-out set, reporting accuracy
+and how many queries would be answered locally at each confidence threshold.
+
+    python evaluate_symptom_classifier.py
+    python evaluate_symptom_classifier.py --threshold 0.6 --show-errors
+"""
+import argparse
+from collections import Counter
+
+from symptom_classifier import train_symptom_classifier
+
+HELD_OUT_DATA = [
+    ("pain in my chest and left shoulder", 'Cardiologist'),
+    ("my heart is beating very fast", 'Cardiologist'),
+    ("breathless when walking, legs swelling", 'Cardiologist'),
+    ("itchy skin with red bumps", 'Dermatologist'),
+    ("pimples all over my back", 'Dermatologist'),
+    ("scalp itching and hair falling out", 'Dermatologist'),
+    ("ear ache and cannot hear properly", 'ENT Specialist'),
+    ("throat pain while swallowing food", 'ENT Specialist'),
+    ("stuffy nose and sinus headache", 'ENT Specialist'),
+    ("high fever and chills", 'General Physician'),
+    ("cough and mild cold since two days", 'General Physician'),
+    ("loose motions and stomach upset", 'General Physician'),
+    ("my periods are late and irregular", 'Gynecologist'),
+    ("severe cramps during periods", 'Gynecologist'),
+    ("i am pregnant and need a checkup", 'Gynecologist'),
+    ("migraine headaches every week", 'Neurologist'),
+    ("tingling and numb feet", 'Neurologist'),
+    ("had a seizure yesterday", 'Neurologist'),
+    ("my vision is blurry", 'Ophthalmologist'),
+    ("eyes are red and watering", 'Ophthalmologist'),
+    ("seeing double", 'Ophthalmologist'),
+    ("knee hurts when climbing stairs", 'Orthopedic'),
+    ("pain in lower back", 'Orthopedic'),
+    ("twisted my ankle and it is swollen", 'Orthopedic'),
+    ("my baby has a fever", 'Pediatrician'),
+    ("child is vomiting", 'Pediatrician'),
+    ("toddler has a rash", 'Pediatrician'),
+    ("feeling anxious all the time", 'Psychiatrist'),
+    ("i feel sad and depressed", 'Psychiatrist'),
+    ("can't sleep at night because of stress", 'Psychiatrist'),
+    # Misspellings the character n-grams should tolerate
+    ("chest pian", 'Cardiologist'),
+    ("hedache and migrane", 'Neurologist'),
+    ("skin rashh", 'Dermatologist'),
+]
+
+THRESHOLDS = [0.3, 0.4, 0.5, 0.55, 0.6, 0.7, 0.8, 0.9]
+
+
+def evaluate(classifier, data):
+    """Returns (predicted, confidence, expected, text) tuples for the data set."""
+    results = []
+    for text, expected in data:
+        predicted, confidence = classifier.predict(text)
+        results.append((predicted, confidence, expected, text))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='Only report this confidence threshold instead of the default sweep')
+    parser.add_argument('--show-errors', action='store_true', help='List misclassified examples')
+    args = parser.parse_args()
+
+    classifier = train_symptom_classifier()
+    results = evaluate(classifier, HELD_OUT_DATA)
+    total = len(results)
+    correct = sum(1 for predicted, _, expected, _ in results if predicted == expected)
+    print(f"Held-out examples: {total}")
+    print(f"Top-1 accuracy (no threshold): {correct / total:.1%}\n")
+
+    print(f"{'threshold':>9}  {'local':>7}  {'accuracy':>8}  {'to LLM':>6}")
+    for threshold in ([args.threshold] if args.threshold is not None else THRESHOLDS):
+        answered = [r for r in results if r[1] >= threshold]
+        right = sum(1 for predicted, _, expected, _ in answered if predicted == expected)
+        accuracy = f"{right / len(answered):.1%}" if answered else '-'
+        print(f"{threshold:>9.2f}  {len(answered) / total:>7.1%}  {accuracy:>8}  {total - len(answered):>6}")
+
+    if args.show_errors:
+        print("\nMisclassified:")
+        for predicted, confidence, expected, text in results:
+            if predicted != expected:
+                print(f"  {text!r}: predicted {predicted} ({confidence:.2f}), expected {expected}")
+        confusion = Counter((expected, predicted) for predicted, _, expected, _ in results if predicted != expected)
+        for (expected, predicted), count in confusion.most_common():
+            print(f"  {expected} -> {predicted}: {count}")
+
+
+if __name__ == '__main__':
+    main()
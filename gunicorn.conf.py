@@ -0,0 +1,42 @@
+"""gunicorn settings for serving MediSmart AI on every core:
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+The app is preloaded in the master, so imports, the scikit-learn models and
+the PDF template are loaded once and shared with forked workers. Each worker
+opens its own MongoDB client on first use (see db_client.py) and runs its own
+job workers and change feed. All settings can be overridden from the
+environment, e.g. WEB_CONCURRENCY=8 GUNICORN_THREADS=16 SSE_MAX_STREAMS=32.
+"""
+import multiprocessing
+import os
+import secrets
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Threaded workers. Each open ElderCare event stream (/api/elder/events) holds
+# a thread for as long as the dashboard is open, so the pool is sized as
+# GUNICORN_THREADS for ordinary requests plus SSE_MAX_STREAMS for streams.
+# The app refuses streams beyond SSE_MAX_STREAMS per worker with a 503 (the
+# page then falls back to polling), so idle dashboards can never take every
+# thread. A worker therefore serves at most SSE_MAX_STREAMS live dashboards;
+# raise it (memory: roughly one thread stack each) or add workers for more.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) + int(os.environ.get('SSE_MAX_STREAMS', 16))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = 5
+preload_app = True
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # Request logs already come from instrumentation.py
+
+# Every worker must sign sessions with the same key. Generating one here,
+# before the workers fork, keeps sessions valid across workers; set
+# SECRET_KEY yourself so they also survive a restart.
+if not os.environ.get('SECRET_KEY'):
+    print("!!! WARNING: SECRET_KEY not set; generated one for this server run. !!!")
+    os.environ['SECRET_KEY'] = secrets.token_hex(32)
+os.environ.setdefault('WARM_MODELS', 'true')
+
+
+def post_worker_init(worker):
+    from app import start_background_services
+    start_background_services()
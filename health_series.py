@@ -0,0 +1,340 @@
+"""Time-series storage and aggregation for ElderCare health readings.
+
+Every health record is still saved to `health_records`, which serves the
+paginated list and the change feed. A numeric reading is also added to a
+bucket document in `health_series`, one per user, metric and UTC day:
+
+    {_id: "<userId>|blood_pressure|2025-03-01", userId, metric, day: <datetime>,
+     count: 3, readings: [{t: <datetime>, values: {systolic: 120, diastolic: 80}, recordId}],
+     summary: {systolic: {sum, n, min, max}, diastolic: {...}}}
+
+Each write updates the summaries with $inc/$min/$max. Day, week and month
+windows are therefore grouped from at most one small document per day,
+without unwinding individual readings. Hour windows unwind the readings of
+the few days they cover. The aggregation API caps the number of windows it
+returns, so a chart costs the same for a month as for years of readings.
+
+The buckets are derived data, like the slot ledger. Rebuild them from
+health_records, after converting records saved before this layout (string
+dates) to datetimes, with:
+
+    python health_series.py --migrate
+    python health_series.py --rebuild
+"""
+import argparse
+import os
+import re
+from datetime import date, datetime, time, timedelta
+
+from pymongo import UpdateOne
+
+# --- Metric Catalogue ---
+# Known metrics get a stable key, a unit and named components. The free-text
+# metric typed by the user is matched against the aliases. Other metrics are
+# keyed by their slug and aggregated as a single 'value'.
+METRICS = {
+    'blood_pressure': {'label': 'Blood Pressure', 'unit': 'mmHg', 'components': ('systolic', 'diastolic'),
+                       'aliases': ('bp', 'blood_pressure', 'pressure')},
+    'blood_sugar': {'label': 'Blood Sugar', 'unit': 'mg/dL', 'components': ('value',),
+                    'aliases': ('sugar', 'blood_sugar', 'glucose', 'blood_glucose', 'sugar_level')},
+    'heart_rate': {'label': 'Heart Rate', 'unit': 'bpm', 'components': ('value',),
+                   'aliases': ('heart_rate', 'pulse', 'pulse_rate', 'hr')},
+    'temperature': {'label': 'Temperature', 'unit': '°', 'components': ('value',),
+                    'aliases': ('temperature', 'temp', 'body_temperature')},
+    'weight': {'label': 'Weight', 'unit': 'kg', 'components': ('value',), 'aliases': ('weight', 'body_weight')},
+    'oxygen': {'label': 'Oxygen Saturation', 'unit': '%', 'components': ('value',),
+               'aliases': ('oxygen', 'spo2', 'oxygen_saturation', 'o2')},
+}
+ALIASES = {alias: key for key, spec in METRICS.items() for alias in spec['aliases']}
+
+WINDOWS = ('hour', 'day', 'week', 'month')
+MAX_POINTS = 120
+# A trailing average over more windows than a chart can hold means nothing
+MAX_ROLLING = MAX_POINTS
+DEFAULT_RANGE_DAYS = 90
+DEFAULT_ROLLING = 7
+
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+_PRESSURE = re.compile(r'(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)')
+_SLUG = re.compile(r'[^0-9a-z]+')
+
+
+def metric_key(name):
+    slug = _SLUG.sub('_', str(name or '').casefold()).strip('_')
+    return ALIASES.get(slug, slug) or None
+
+
+def describe_metric(key):
+    spec = METRICS.get(key)
+    if spec is None:
+        return {'key': key, 'label': key.replace('_', ' ').title(), 'unit': None, 'components': ['value']}
+    return {'key': key, 'label': spec['label'], 'unit': spec['unit'], 'components': list(spec['components'])}
+
+
+def components_of(key):
+    return METRICS[key]['components'] if key in METRICS else ('value',)
+
+
+def parse_reading(metric, value):
+    """Returns (metric key, {component: number}), or None when the value holds no usable number."""
+    key = metric_key(metric)
+    if key is None or value is None:
+        return None
+    text = str(value)
+    if key == 'blood_pressure':
+        match = _PRESSURE.search(text)
+        if not match:
+            return None
+        return key, {'systolic': float(match.group(1)), 'diastolic': float(match.group(2))}
+    match = _NUMBER.search(text)
+    if not match:
+        return None
+    return key, {'value': float(match.group())}
+
+
+# --- Writes ---
+def day_start(moment):
+    return datetime.combine(moment.date(), time())
+
+
+def bucket_id(user_id, metric, day):
+    return f"{user_id}|{metric}|{day.date().isoformat()}"
+
+
+def bucket_change(record):
+    """(filter, update) adding a parsed health record (metricKey, values, datetime date) to its bucket."""
+    moment, values = record['date'], record['values']
+    day = day_start(moment)
+    inc, lowest, highest = {'count': 1}, {}, {}
+    for component, number in values.items():
+        inc[f'summary.{component}.sum'] = number
+        inc[f'summary.{component}.n'] = 1
+        lowest[f'summary.{component}.min'] = number
+        highest[f'summary.{component}.max'] = number
+    return (
+        {'_id': bucket_id(record['userId'], record['metricKey'], day)},
+        {'$setOnInsert': {'userId': record['userId'], 'metric': record['metricKey'], 'day': day},
+         '$push': {'readings': {'t': moment, 'values': values, 'recordId': record.get('_id')}},
+         '$inc': inc, '$min': lowest, '$max': highest},
+    )
+
+
+def record_reading(series_collection, record):
+    series_collection.update_one(*bucket_change(record), upsert=True)
+
+
+# --- Aggregation ---
+def parse_series_args(args, today=None):
+    """Returns (metric key, start, end, window, rolling) from a query string. Raises ValueError."""
+    key = metric_key(args.get('metric'))
+    if key is None:
+        raise ValueError('metric is required')
+    today = today or datetime.utcnow().date()
+    try:
+        end = date.fromisoformat(args['to']) if args.get('to') else today
+        start = date.fromisoformat(args['from']) if args.get('from') else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    except ValueError:
+        raise ValueError('from and to must be YYYY-MM-DD dates')
+    if start > end:
+        raise ValueError('from must not be after to')
+    window = args.get('window', 'auto')
+    if window not in WINDOWS + ('auto',):
+        raise ValueError(f"window must be auto or one of {', '.join(WINDOWS)}")
+    try:
+        rolling = int(args.get('rolling', DEFAULT_ROLLING))
+    except ValueError:
+        raise ValueError('rolling must be an integer')
+    if not 0 <= rolling <= MAX_ROLLING:
+        raise ValueError(f'rolling must be between 0 and {MAX_ROLLING}')
+    start, end = datetime.combine(start, time()), datetime.combine(end + timedelta(days=1), time())
+    if window == 'auto':
+        window = next((w for w in WINDOWS if window_count(w, start, end) <= MAX_POINTS), None)
+        if window is None:
+            # Even monthly windows would exceed MAX_POINTS: keep the latest MAX_POINTS months.
+            window = 'month'
+            first = window_ordinal('month', end - timedelta(microseconds=1)) - MAX_POINTS
+            start = datetime(first // 12, first % 12 + 1, 1)
+    elif window_count(window, start, end) > MAX_POINTS:
+        raise ValueError(f'More than {MAX_POINTS} {window} windows in that range; use a larger window')
+    return key, start, end, window, rolling
+
+
+def _window_start(window, field):
+    if window == 'day':
+        return field
+    if window == 'week':
+        return {'$dateFromParts': {'isoWeekYear': {'$isoWeekYear': field}, 'isoWeek': {'$isoWeek': field},
+                                   'isoDayOfWeek': 1}}
+    if window == 'month':
+        return {'$dateFromParts': {'year': {'$year': field}, 'month': {'$month': field}, 'day': 1}}
+    return {'$dateFromParts': {'year': {'$year': field}, 'month': {'$month': field},
+                               'day': {'$dayOfMonth': field}, 'hour': {'$hour': field}}}
+
+
+def series_pipeline(user_id, metric, start, end, window):
+    """Groups a user's buckets into windows, with per-component sum, count, min and max."""
+    match = {'userId': user_id, 'metric': metric, 'day': {'$gte': start, '$lt': end}}
+    components = components_of(metric)
+    if window == 'hour':
+        # Hours come from the raw readings of the (few) buckets in range.
+        stages = [{'$match': match}, {'$project': {'readings': 1}}, {'$unwind': '$readings'},
+                  {'$match': {'readings.t': {'$gte': start, '$lt': end}}}]
+        group = {'_id': _window_start(window, '$readings.t'), 'count': {'$sum': 1}}
+        for c in components:
+            value = f'$readings.values.{c}'
+            group[f'{c}_sum'] = {'$sum': value}
+            group[f'{c}_n'] = {'$sum': {'$cond': [{'$gt': [value, None]}, 1, 0]}}
+            group[f'{c}_min'] = {'$min': value}
+            group[f'{c}_max'] = {'$max': value}
+    else:
+        stages = [{'$match': match}, {'$project': {'day': 1, 'count': 1, 'summary': 1}}]
+        group = {'_id': _window_start(window, '$day'), 'count': {'$sum': '$count'}}
+        for c in components:
+            group[f'{c}_sum'] = {'$sum': f'$summary.{c}.sum'}
+            group[f'{c}_n'] = {'$sum': f'$summary.{c}.n'}
+            group[f'{c}_min'] = {'$min': f'$summary.{c}.min'}
+            group[f'{c}_max'] = {'$max': f'$summary.{c}.max'}
+    return stages + [{'$group': group}, {'$sort': {'_id': 1}}]
+
+
+def window_ordinal(window, start):
+    """Consecutive windows get consecutive ordinals, so gaps are visible to the rolling average."""
+    if window == 'hour':
+        return start.toordinal() * 24 + start.hour
+    if window == 'day':
+        return start.toordinal()
+    if window == 'week':
+        return start.toordinal() // 7
+    return start.year * 12 + start.month
+
+
+def window_count(window, start, end):
+    """How many windows the range [start, end) touches; weeks are ISO weeks starting on Monday."""
+    last = end - timedelta(microseconds=1)
+    if window == 'week':
+        return (last.toordinal() - 1) // 7 - (start.toordinal() - 1) // 7 + 1
+    return window_ordinal(window, last) - window_ordinal(window, start) + 1
+
+
+def _round(number):
+    return None if number is None else round(number, 1)
+
+
+def build_series(rows, metric, window, rolling):
+    """Turns grouped rows into chart points with averages, min/max and a trailing rolling average."""
+    components = components_of(metric)
+    points, history = [], []
+    for row in rows:
+        ordinal = window_ordinal(window, row['_id'])
+        history.append((ordinal, row))
+        point = {'start': row['_id'].isoformat(), 'count': row['count']}
+        for c in components:
+            n = row.get(f'{c}_n') or 0
+            stats = {'avg': _round(row[f'{c}_sum'] / n) if n else None,
+                     'min': _round(row.get(f'{c}_min')), 'max': _round(row.get(f'{c}_max'))}
+            if rolling:
+                recent = [r for o, r in history if o > ordinal - rolling]
+                total_n = sum(r.get(f'{c}_n') or 0 for r in recent)
+                total = sum(r.get(f'{c}_sum') or 0 for r in recent)
+                stats['rollingAvg'] = _round(total / total_n) if total_n else None
+            point[c] = stats
+        points.append(point)
+        history = [(o, r) for o, r in history if o > ordinal - rolling]
+    return points
+
+
+def summarize(points, metric):
+    """Whole-range min/max and the change between the first and last window averages."""
+    summary = {}
+    for c in components_of(metric):
+        averages = [p[c]['avg'] for p in points if p[c]['avg'] is not None]
+        minimums = [p[c]['min'] for p in points if p[c]['min'] is not None]
+        maximums = [p[c]['max'] for p in points if p[c]['max'] is not None]
+        summary[c] = {'min': min(minimums, default=None), 'max': max(maximums, default=None),
+                      'first': averages[0] if averages else None, 'last': averages[-1] if averages else None,
+                      'change': _round(averages[-1] - averages[0]) if len(averages) > 1 else None}
+    return summary
+
+
+def get_series(series_collection, user_id, metric, start, end, window, rolling=DEFAULT_ROLLING):
+    rows = series_collection.aggregate(series_pipeline(user_id, metric, start, end, window))
+    points = build_series(rows, metric, window, rolling)
+    return {'metric': describe_metric(metric), 'window': window, 'rolling': rolling,
+            'from': start.date().isoformat(), 'to': (end - timedelta(days=1)).date().isoformat(),
+            'points': points, 'summary': summarize(points, metric)}
+
+
+def user_metrics(series_collection, user_id):
+    return [describe_metric(key) for key in sorted(series_collection.distinct('metric', {'userId': user_id}))]
+
+
+# --- Maintenance ---
+def migrate_dates(records_collection, batch_size=1000):
+    """Converts string dates of older health records to datetimes and parses their readings. Returns the count."""
+    converted = 0
+    operations = []
+    for record in records_collection.find({'date': {'$type': 'string'}}, {'date': 1, 'metric': 1, 'value': 1}):
+        try:
+            moment = datetime.strptime(record['date'], '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            print(f"Health record {record['_id']} has an unreadable date {record['date']!r}, skipping it")
+            continue
+        update = {'date': moment}
+        reading = parse_reading(record.get('metric'), record.get('value'))
+        if reading:
+            update['metricKey'], update['values'] = reading
+        operations.append(UpdateOne({'_id': record['_id']}, {'$set': update}))
+        if len(operations) >= batch_size:
+            converted += records_collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        converted += records_collection.bulk_write(operations, ordered=False).modified_count
+    return converted
+
+
+def rebuild(records_collection, series_collection, batch_size=1000):
+    """Recreates every bucket from the parsed health records. Returns the number of readings written."""
+    series_collection.delete_many({})
+    written = 0
+    operations = []
+    cursor = records_collection.find({'values': {'$exists': True}, 'date': {'$type': 'date'}},
+                                     {'userId': 1, 'metricKey': 1, 'values': 1, 'date': 1}).batch_size(batch_size)
+    for record in cursor:
+        if not record.get('userId') or not record.get('metricKey'):
+            continue
+        operations.append(UpdateOne(*bucket_change(record), upsert=True))
+        if len(operations) >= batch_size:
+            # Ordered, so two upserts of the same new bucket in one batch cannot race.
+            series_collection.bulk_write(operations, ordered=True)
+            written += len(operations)
+            operations = []
+    if operations:
+        series_collection.bulk_write(operations, ordered=True)
+        written += len(operations)
+    return written
+
+
+def main():
+    from pymongo import MongoClient
+
+    from db_indexes import ensure_indexes
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'))
+    parser.add_argument('--db', default=os.environ.get('MONGO_DB', 'medismart_db'))
+    parser.add_argument('--migrate', action='store_true', help='Convert string dates in health_records to datetimes')
+    parser.add_argument('--rebuild', action='store_true', help='Recreate health_series buckets from health_records')
+    args = parser.parse_args()
+    if not (args.migrate or args.rebuild):
+        parser.print_help()
+        return
+    db = MongoClient(args.mongo_uri)[args.db]
+    ensure_indexes(db)
+    if args.migrate:
+        print(f"--- {migrate_dates(db.health_records)} health records converted ---")
+    if args.rebuild:
+        print(f"--- {rebuild(db.health_records, db.health_series)} readings bucketed ---")
+
+
+if __name__ == '__main__':
+    main()
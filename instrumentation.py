@@ -0,0 +1,289 @@
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+# --- Instrumentation ---
+# Per-route and per-dependency latency histograms (db, pdf, smtp, llm,
+# sklearn) exported in the Prometheus text format at /metrics, one structured
+# JSON log line per request with a timing breakdown, and an opt-in cProfile
+# run triggered per request with an X-Profile header carrying PROFILE_TOKEN.
+#
+# Dependency timings are collected through a context variable, so work done
+# on behalf of a request (Mongo commands, the LLM call) shows up in that
+# request's log line, and work done by a background job (the confirmation
+# PDF and email) shows up in that job's log line.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+request_logger = logging.getLogger('medismart.requests')
+job_logger = logging.getLogger('medismart.jobs')
+
+
+class Histogram:
+    """A Prometheus-style cumulative histogram with one series per label set."""
+
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {'counts': list(s['counts']), 'sum': s['sum'], 'count': s['count']}
+                    for key, s in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key))
+            prefix = labels + ',' if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series["count"]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+REQUEST_SECONDS = Histogram('medismart_request_duration_seconds',
+                            'Time from request start until the response headers are ready.',
+                            ('method', 'route', 'status'))
+DEPENDENCY_SECONDS = Histogram('medismart_dependency_duration_seconds',
+                               'Time spent in downstream dependencies.',
+                               ('dependency', 'operation'))
+JOB_SECONDS = Histogram('medismart_job_duration_seconds',
+                        'Time spent running one background job attempt.',
+                        ('job_type', 'outcome'))
+HISTOGRAMS = (REQUEST_SECONDS, DEPENDENCY_SECONDS, JOB_SECONDS)
+
+# Breakdown for the current request or job: {dependency: [calls, seconds]}; None otherwise.
+_breakdown = contextvars.ContextVar('medismart_breakdown', default=None)
+
+
+def record_dependency(dependency, operation, seconds):
+    DEPENDENCY_SECONDS.observe({'dependency': dependency, 'operation': operation}, seconds)
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        entry = breakdown.setdefault(dependency, [0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+
+
+@contextmanager
+def timed(dependency, operation):
+    """Times the enclosed block as one call to a dependency."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_dependency(dependency, operation, time.perf_counter() - started)
+
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Times every MongoDB command; pass it to MongoClient(event_listeners=[...])."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        record_dependency('db', event.command_name, event.duration_micros / 1e6)
+
+    def failed(self, event):
+        record_dependency('db', event.command_name, event.duration_micros / 1e6)
+
+
+def _format_breakdown(breakdown):
+    return {name: {'calls': calls, 'ms': round(seconds * 1000, 2)} for name, (calls, seconds) in sorted(breakdown.items())}
+
+
+@contextmanager
+def job_timer(job_id, job_type):
+    """Times one job attempt and logs its dependency breakdown, like a request log line."""
+    token = _breakdown.set({})
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except BaseException:
+        outcome = 'error'
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        breakdown = _breakdown.get()
+        _breakdown.reset(token)
+        JOB_SECONDS.observe({'job_type': job_type, 'outcome': outcome}, duration)
+        job_logger.info(json.dumps({'jobId': str(job_id), 'type': job_type, 'outcome': outcome,
+                                    'durationMs': round(duration * 1000, 2),
+                                    'breakdown': _format_breakdown(breakdown)}))
+
+
+def configure_logging():
+    """Gives the request and job loggers a plain JSON-lines handler unless one is configured."""
+    for logger in (request_logger, job_logger):
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+
+
+def render_metrics():
+    return '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
+
+
+# --- Request Profiling ---
+# cProfile can only profile one request at a time per process, so concurrent
+# profile requests are skipped rather than queued.
+_profile_lock = threading.Lock()
+
+
+class RequestProfiler:
+    """Profiles requests sent with `X-Profile: <token>`, plus a random sample_rate share of all requests.
+
+    Profiling stays off without a token: cProfile slows a request down many
+    times over, so anyone able to switch it on could load the server at will.
+    """
+
+    def __init__(self, enabled=False, token=None, sample_rate=0.0, output_dir=None, top=25):
+        if enabled and not token:
+            print("\n!!! WARNING: PROFILING_ENABLED is set but PROFILE_TOKEN is not; profiling stays off. !!!\n")
+            enabled = False
+        self.enabled = enabled
+        self.token = token
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.top = top
+
+    def wanted(self, request):
+        if not self.enabled:
+            return False
+        header = request.headers.get('X-Profile')
+        if header:
+            return hmac.compare_digest(header.encode('utf-8'), self.token.encode('utf-8'))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self):
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            _profile_lock.release()  # Another profiler (e.g. a debugger) is active
+            return None
+        return profiler
+
+    def finish(self, profiler, request_id):
+        """Stops the profiler and returns (top functions as text, .prof path or None)."""
+        try:
+            profiler.disable()
+        finally:
+            _profile_lock.release()
+        path = None
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f"{request_id}.prof")
+            profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(self.top)
+        return out.getvalue(), path
+
+
+def init_app(app, profiler=None, slow_request_ms=None):
+    """Registers the request hooks and the /metrics endpoint on a Flask app."""
+    from flask import Response, g, request
+
+    profiler = profiler or RequestProfiler()
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.breakdown_token = _breakdown.set({})
+        g.profiler = profiler.start() if profiler.wanted(request) else None
+
+    @app.after_request
+    def _finish_request_timer(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        duration = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.observe({'method': request.method, 'route': route, 'status': response.status_code}, duration)
+
+        breakdown = _breakdown.get() or {}
+        token = g.pop('breakdown_token', None)
+        if token is not None:
+            _breakdown.reset(token)
+        entry = {
+            'requestId': g.request_id,
+            'method': request.method,
+            'route': route,
+            'path': request.path,
+            'status': response.status_code,
+            'durationMs': round(duration * 1000, 2),
+            'breakdown': _format_breakdown(breakdown),
+        }
+        active_profiler = g.pop('profiler', None)
+        if active_profiler is not None:
+            stats, path = profiler.finish(active_profiler, g.request_id)
+            entry['profile'] = path or stats
+            response.headers['X-Profile-Id'] = g.request_id
+        response.headers['X-Request-ID'] = g.request_id
+
+        if response.status_code >= 500:
+            request_logger.error(json.dumps(entry))
+        elif slow_request_ms is None or entry['durationMs'] >= slow_request_ms:
+            request_logger.info(json.dumps(entry))
+        return response
+
+    @app.teardown_request
+    def _release_request_state(error):
+        # after_request is skipped when an exception propagates (e.g. in debug mode).
+        token = g.pop('breakdown_token', None)
+        if token is not None:
+            _breakdown.reset(token)
+        active_profiler = g.pop('profiler', None)
+        if active_profiler is not None:
+            profiler.finish(active_profiler, g.get('request_id', 'failed'))
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    configure_logging()
@@ -0,0 +1,224 @@
+import random
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+
+from instrumentation import job_timer
+
+# --- Background Job Queue ---
+# Jobs are stored in a Mongo collection so they survive restarts and can be
+# processed by any app process. A job moves queued -> running -> done, or back
+# to queued with an exponential backoff delay until it runs out of attempts
+# and is marked failed.
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class JobQueue:
+    """Persistent job queue backed by a Mongo collection."""
+
+    def __init__(self, collection, max_attempts=5, backoff_base=5.0, backoff_max=600.0, lease_seconds=300):
+        self.collection = collection
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.handlers = {}
+        self.listeners = []
+
+    def register(self, job_type):
+        """Decorator that registers the handler function for a job type."""
+        def decorator(func):
+            self.handlers[job_type] = func
+            return func
+        return decorator
+
+    def enqueue(self, job_type, payload, owner_id=None, max_attempts=None):
+        """Stores a new job and returns its id as a string."""
+        if job_type not in self.handlers:
+            raise ValueError(f"No handler registered for job type '{job_type}'")
+        now = datetime.utcnow()
+        result = self.collection.insert_one({
+            'type': job_type,
+            'payload': payload,
+            'ownerId': owner_id,
+            'status': JOB_QUEUED,
+            'attempts': 0,
+            'maxAttempts': max_attempts or self.max_attempts,
+            'runAt': now,
+            'createdAt': now,
+            'updatedAt': now,
+            'lastError': None,
+        })
+        for listener in self.listeners:
+            listener()
+        return str(result.inserted_id)
+
+    def schedule_recurring(self, job_type, interval_seconds, payload=None):
+        """Ensures one recurring job of this type exists. Safe to call from every process.
+
+        The job has a fixed _id, so concurrent calls cannot create duplicates.
+        When it finishes (or runs out of attempts) it is queued again
+        interval_seconds later instead of being marked done.
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f"No handler registered for job type '{job_type}'")
+        now = datetime.utcnow()
+        job_id = f"recurring:{job_type}"
+        self.collection.update_one(
+            {'_id': job_id},
+            {'$set': {'interval': interval_seconds, 'payload': payload or {}},
+             '$setOnInsert': {'type': job_type, 'ownerId': None, 'status': JOB_QUEUED, 'attempts': 0,
+                              'maxAttempts': self.max_attempts, 'runAt': now, 'createdAt': now,
+                              'updatedAt': now, 'lastError': None}},
+            upsert=True,
+        )
+        return job_id
+
+    def _reschedule(self, job, now, last_error=None):
+        self.collection.update_one(
+            {'_id': job['_id']},
+            {'$set': {'status': JOB_QUEUED, 'attempts': 0, 'updatedAt': now, 'lastError': last_error,
+                      'lastRunAt': now, 'runAt': now + timedelta(seconds=job['interval'])},
+             '$unset': {'lockedAt': '', 'lockedBy': ''}},
+        )
+
+    def get(self, job_id):
+        """Returns the job document, or None if the id is unknown."""
+        try:
+            return self.collection.find_one({'_id': ObjectId(job_id)})
+        except Exception:
+            return None
+
+    def claim(self, worker_id):
+        """Atomically marks the oldest due job as running and returns it."""
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {'status': JOB_QUEUED, 'runAt': {'$lte': now}},
+            {'$set': {'status': JOB_RUNNING, 'lockedAt': now, 'lockedBy': worker_id, 'updatedAt': now},
+             '$inc': {'attempts': 1}},
+            sort=[('runAt', ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def complete(self, job):
+        if job.get('interval'):
+            self._reschedule(job, datetime.utcnow())
+            return
+        self.collection.update_one(
+            {'_id': job['_id']},
+            {'$set': {'status': JOB_DONE, 'updatedAt': datetime.utcnow(), 'lastError': None},
+             '$unset': {'lockedAt': '', 'lockedBy': ''}},
+        )
+
+    def retry_delay(self, attempts):
+        """Exponential backoff with jitter, capped at backoff_max seconds."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def fail(self, job, error):
+        """Schedules a retry, or marks the job failed once it is out of attempts."""
+        now = datetime.utcnow()
+        update = {'updatedAt': now, 'lastError': str(error)}
+        if job['attempts'] >= job.get('maxAttempts', self.max_attempts):
+            if job.get('interval'):
+                self._reschedule(job, now, str(error))
+                return
+            update['status'] = JOB_FAILED
+        else:
+            update['status'] = JOB_QUEUED
+            update['runAt'] = now + timedelta(seconds=self.retry_delay(job['attempts']))
+        self.collection.update_one(
+            {'_id': job['_id']},
+            {'$set': update, '$unset': {'lockedAt': '', 'lockedBy': ''}},
+        )
+
+    def requeue_stale(self):
+        """Returns jobs whose worker died mid-run to the queue."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        result = self.collection.update_many(
+            {'status': JOB_RUNNING, 'lockedAt': {'$lt': cutoff}},
+            {'$set': {'status': JOB_QUEUED, 'runAt': datetime.utcnow(), 'updatedAt': datetime.utcnow()},
+             '$unset': {'lockedAt': '', 'lockedBy': ''}},
+        )
+        return result.modified_count
+
+    def run_job(self, job):
+        handler = self.handlers.get(job['type'])
+        try:
+            if handler is None:
+                raise ValueError(f"No handler registered for job type '{job['type']}'")
+            with job_timer(job['_id'], job['type']):
+                handler(job['payload'])
+        except Exception as e:
+            print(f"Job {job['_id']} ({job['type']}) failed on attempt {job['attempts']}: {e}")
+            traceback.print_exc()
+            self.fail(job, e)
+            return False
+        self.complete(job)
+        return True
+
+    def run_pending(self, worker_id='inline'):
+        """Claims and runs a single due job. Returns False if none was due."""
+        job = self.claim(worker_id)
+        if job is None:
+            return False
+        self.run_job(job)
+        return True
+
+
+class WorkerPool:
+    """A small pool of daemon threads that drain a JobQueue."""
+
+    def __init__(self, queue, size=2, poll_interval=1.0):
+        self.queue = queue
+        self.size = size
+        self.poll_interval = poll_interval
+        self.threads = []
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        queue.listeners.append(self.wakeup.set)
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self.threads)
+
+    def start(self):
+        """Starts the worker threads. Safe to call more than once."""
+        with self.lock:
+            if self.running or self.size <= 0:
+                return
+            self.stopping.clear()
+            self.queue.requeue_stale()
+            prefix = f"{socket.gethostname()}-{threading.get_native_id()}"
+            self.threads = [
+                threading.Thread(target=self._run, args=(f"{prefix}-{i}",), name=f"job-worker-{i}", daemon=True)
+                for i in range(self.size)
+            ]
+            for thread in self.threads:
+                thread.start()
+
+    def stop(self, timeout=10):
+        self.stopping.set()
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+
+    def _run(self, worker_id):
+        while not self.stopping.is_set():
+            try:
+                if self.queue.run_pending(worker_id):
+                    continue
+            except Exception as e:
+                print(f"Job worker {worker_id} error: {e}")
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from datetime import datetime
+
+# --- Model Artifact Store ---
+# Fitted scikit-learn models are pickled to MODEL_DIR, so app processes load
+# them instead of training on boot. Artifacts record the scikit-learn version
+# they were fitted with and a fingerprint of their training data; a mismatch
+# in either (or a missing/corrupt file) refits the model and rewrites the
+# artifact, so editing the training data in code takes effect on the next
+# load. Writes go to a temp file that is renamed
+# into place, so a reader never sees a half-written model. Pre-fit with:
+#
+#     python model_store.py --fit
+#
+# Models that are retrained while the app runs (the learned scheduler) are
+# stored as timestamped versions in MODEL_DIR/<name>/ with a CURRENT pointer
+# file; readers follow the pointer, so publishing a version is one rename.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get('MODEL_DIR', os.path.join(BASE_DIR, 'model_artifacts'))
+
+_lock = threading.Lock()
+
+
+def artifact_path(name, model_dir=None):
+    return os.path.join(model_dir or MODEL_DIR, f"{name}.pkl")
+
+
+def data_fingerprint(data):
+    """A short, stable hash of JSON-serializable training data."""
+    encoded = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _sklearn_version():
+    import sklearn
+    return sklearn.__version__
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _payload(model, metadata):
+    payload = {'model': model, 'sklearn': _sklearn_version(), 'createdAt': datetime.utcnow().isoformat() + 'Z',
+               **metadata}
+    return pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def save_model(name, model, model_dir=None, **metadata):
+    """Atomically writes the model artifact. Returns its path."""
+    path = artifact_path(name, model_dir)
+    _atomic_write(path, _payload(model, metadata))
+    return path
+
+
+def _read_payload(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        print(f"Model artifact {path} could not be loaded, ignoring it: {e}")
+        return None
+    if payload.get('sklearn') != _sklearn_version():
+        print(f"Model artifact {path} was fitted with scikit-learn {payload.get('sklearn')}, ignoring it")
+        return None
+    return payload
+
+
+def load_artifact(name, model_dir=None):
+    """Returns the stored payload dict, or None if it is missing, unreadable or from another sklearn version."""
+    return _read_payload(artifact_path(name, model_dir))
+
+
+# --- Versioned artifacts ---
+CURRENT_POINTER = 'CURRENT'
+
+
+def _version_dir(name, model_dir=None):
+    return os.path.join(model_dir or MODEL_DIR, name)
+
+
+def save_version(name, model, model_dir=None, keep=5, **metadata):
+    """Writes a new version and points CURRENT at it. Returns the version string."""
+    directory = _version_dir(name, model_dir)
+    version = datetime.utcnow().strftime('%Y%m%dT%H%M%S%fZ')
+    _atomic_write(os.path.join(directory, f"{version}.pkl"), _payload(model, {'version': version, **metadata}))
+    _atomic_write(os.path.join(directory, CURRENT_POINTER), version.encode('ascii'))
+    versions = list_versions(name, model_dir)
+    for old in versions[:-keep] if keep else []:
+        if old != version:
+            os.remove(os.path.join(directory, f"{old}.pkl"))
+    return version
+
+
+def list_versions(name, model_dir=None):
+    directory = _version_dir(name, model_dir)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(entry[:-4] for entry in os.listdir(directory) if entry.endswith('.pkl') and not entry.startswith('.'))
+
+
+def current_version(name, model_dir=None):
+    """The version CURRENT points at, or None if nothing has been published."""
+    try:
+        with open(os.path.join(_version_dir(name, model_dir), CURRENT_POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def load_version(name, version, model_dir=None):
+    return _read_payload(os.path.join(_version_dir(name, model_dir), f"{version}.pkl"))
+
+
+def load_or_fit(name, fit, model_dir=None, fingerprint=None):
+    """Loads a pre-fitted model, or fits it with fit() and stores the artifact for the next boot.
+
+    An artifact whose stored fingerprint differs from `fingerprint` was fitted
+    on other training data and is refitted.
+    """
+    with _lock:
+        payload = load_artifact(name, model_dir)
+        if payload is not None:
+            if payload.get('fingerprint') == fingerprint:
+                return payload['model']
+            print(f"Model artifact for {name} was fitted on different training data, refitting it")
+        model = fit()
+        try:
+            save_model(name, model, model_dir, fingerprint=fingerprint)
+        except OSError as e:
+            print(f"Model artifact for {name} could not be written: {e}")
+        return model
+
+
+def main():
+    import argparse
+
+    from ai_models import MODEL_FITTERS
+
+    parser = argparse.ArgumentParser(description='Fit the scikit-learn models and write their artifacts.')
+    parser.add_argument('--fit', action='store_true', help='Fit every model and overwrite its artifact')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    args = parser.parse_args()
+    if not args.fit:
+        parser.print_help()
+        return
+    for name, (fit, fingerprint) in MODEL_FITTERS.items():
+        path = save_model(name, fit(), args.model_dir, fingerprint=fingerprint)
+        print(f"--- {name} written to {path} ---")
+
+
+if __name__ == '__main__':
+    main()
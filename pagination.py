@@ -0,0 +1,115 @@
+import base64
+import json
+
+from bson import json_util
+from flask import Response, stream_with_context
+
+# --- Keyset Pagination & Streamed JSON ---
+# List endpoints page with `?limit=N&after=<cursor>`. The cursor is an opaque
+# token holding the sort-key values of the last item returned, so each page
+# is an index range scan no matter how deep the client has paged. Results are
+# encoded one document at a time instead of building the whole list first.
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(doc, sort):
+    values = [doc.get(field) for field, _ in sort]
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, sort):
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _after(field, direction, value):
+    """Condition for `field` sorting strictly after `value`, or None if nothing can.
+
+    MongoDB sorts null and missing values before everything else, and $gt/$lt
+    never match them, so they need their own cases.
+    """
+    if value is None:
+        return {field: {'$ne': None}} if direction > 0 else None
+    if direction > 0:
+        return {field: {'$gt': value}}
+    return {'$or': [{field: {'$lt': value}}, {field: None}]}
+
+
+def keyset_filter(sort, values):
+    """Builds the filter matching documents that sort strictly after the given key values.
+
+    The sort must end in a unique field (normally _id), or rows that tie on
+    every key are skipped at page boundaries.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        after = _after(field, direction, values[i])
+        if after is None:
+            continue
+        # Equal on every earlier key; {field: None} also matches a missing field, as the sort does
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause.update(after)
+        clauses.append(clause)
+    return {'$or': clauses} if clauses else {'_id': {'$in': []}}
+
+
+def parse_page_args(args):
+    """Returns (limit, after) from the query string; limit is None when the client did not ask for paging."""
+    limit = args.get('limit')
+    after = args.get('after')
+    if limit is None and after is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, MAX_PAGE_SIZE), after
+
+
+def _encode_doc(doc):
+    return json.dumps({**doc, '_id': str(doc['_id'])}, default=str)
+
+
+def json_list_response(collection, query, projection, sort, args):
+    """Streams the matching documents as JSON.
+
+    Without paging arguments the response is a plain JSON array, as before.
+    With `limit`/`after` it is `{"items": [...], "nextCursor": <token or null>}`.
+    Raises ValueError for bad paging arguments, before anything is sent.
+    """
+    limit, after = parse_page_args(args)
+    paged = limit is not None
+    if after:
+        query = {'$and': [query, keyset_filter(sort, decode_cursor(after, sort))]}
+    cursor = collection.find(query, projection).sort(sort)
+    if paged:
+        cursor = cursor.limit(limit + 1)  # One extra row tells us whether another page exists
+
+    def generate():
+        yield '{"items": [' if paged else '['
+        last = None
+        count = 0
+        has_more = False
+        for doc in cursor:
+            if paged and count == limit:
+                has_more = True
+                break
+            yield (',' if count else '') + _encode_doc(doc)
+            last = doc
+            count += 1
+        if paged:
+            next_cursor = encode_cursor(last, sort) if has_more else None
+            yield f'], "nextCursor": {json.dumps(next_cursor)}}}'
+        else:
+            yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
@@ -0,0 +1,151 @@
+import copy
+import math
+import threading
+
+from instrumentation import timed
+
+# --- Appointment Confirmation Renderer ---
+# The header, footer and styling of the confirmation are identical for every
+# appointment, so they are drawn once into a template document. Each
+# confirmation is a copy of that template with only the appointment details
+# and the surrounding box added, rendered straight to bytes.
+
+FOOTER_TEXT = ("Thank you for choosing MediSmart AI. Please arrive 15 minutes early for offline appointments. "
+               "If you need to cancel, please do so from your dashboard.")
+BOX_MARGIN = 20
+BOX_RADIUS = 5
+LABEL_WIDTH = 40
+ROW_HEIGHT = 10
+
+
+def _rounded_rect(pdf, x, y, w, h, r, style=''):
+    """Draws a rectangle with rounded corners using Bezier arcs."""
+    k, page_h = pdf.k, pdf.h
+    op = 'f' if style == 'F' else ('B' if style in ('FD', 'DF') else 'S')
+    arc = 4 / 3 * (math.sqrt(2) - 1)
+
+    def line_to(px, py):
+        pdf._out('%.2F %.2F l' % (px * k, (page_h - py) * k))
+
+    def curve(x1, y1, x2, y2, x3, y3):
+        pdf._out('%.2F %.2F %.2F %.2F %.2F %.2F c' % (
+            x1 * k, (page_h - y1) * k, x2 * k, (page_h - y2) * k, x3 * k, (page_h - y3) * k))
+
+    pdf._out('%.2F %.2F m' % ((x + r) * k, (page_h - y) * k))
+    xc, yc = x + w - r, y + r
+    line_to(xc, y)
+    curve(xc + r * arc, yc - r, xc + r, yc - r * arc, xc + r, yc)
+    xc, yc = x + w - r, y + h - r
+    line_to(x + w, yc)
+    curve(xc + r, yc + r * arc, xc + r * arc, yc + r, xc, yc + r)
+    xc, yc = x + r, y + h - r
+    line_to(xc, y + h)
+    curve(xc - r * arc, yc + r, xc - r, yc + r * arc, xc - r, yc)
+    xc, yc = x + r, y + r
+    line_to(x, yc)
+    curve(xc - r, yc - r * arc, xc - r * arc, yc - r, xc, yc - r)
+    pdf._out(op)
+
+
+def _pdf_bytes(pdf):
+    """Returns the finished document as bytes (fpdf returns a latin-1 str, fpdf2 a bytearray)."""
+    data = pdf.output(dest='S')
+    if isinstance(data, str):
+        data = data.encode('latin-1')
+    return bytes(data)
+
+
+class ConfirmationRenderer:
+    """Renders appointment confirmation PDFs in memory from a cached template."""
+
+    def __init__(self):
+        self._template = None
+        self._box_top = None
+        self._lock = threading.Lock()
+
+    def _build_template(self):
+        from fpdf import FPDF  # Imported on first render to keep app startup fast
+
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_auto_page_break(auto=True, margin=15)
+
+        # --- Header ---
+        pdf.set_font("Arial", "B", 20)
+        pdf.set_text_color(0, 119, 182)  # Blue color
+        pdf.cell(0, 15, "MediSmart AI", 0, 1, 'C')
+        pdf.set_font("Arial", "", 12)
+        pdf.set_text_color(100, 100, 100)  # Gray color
+        pdf.cell(0, 8, "Your Appointment Confirmation", 0, 1, 'C')
+        pdf.ln(15)
+        box_top = pdf.get_y()
+
+        # --- Footer ---
+        pdf.set_y(-40)
+        pdf.set_font("Arial", "I", 10)
+        pdf.set_text_color(150, 150, 150)
+        pdf.multi_cell(0, 5, FOOTER_TEXT, 0, 'C')
+
+        # --- Styling for the details box ---
+        pdf.set_text_color(0, 0, 0)  # Black color
+        pdf.set_draw_color(220, 220, 220)  # Light gray border
+        pdf.set_line_width(0.5)
+        return pdf, box_top
+
+    def template(self):
+        """Returns the cached (template, box_top) pair, building it on first use."""
+        if self._template is None:
+            with self._lock:
+                if self._template is None:
+                    self._template, self._box_top = self._build_template()
+        return self._template, self._box_top
+
+    def _draw_details(self, pdf, box_top, appointment_data):
+        content_width = pdf.w - (2 * BOX_MARGIN)
+        text_x_pos = BOX_MARGIN + 5
+        rows = [
+            ("Patient:", appointment_data['patientName']),
+            ("Doctor:", f"Dr. {appointment_data['doctorName']}"),
+            ("Date:", appointment_data['date']),
+            ("Time:", appointment_data['time']),
+            ("Type:", appointment_data['appointmentType']),
+        ]
+
+        pdf.set_y(box_top + 5)
+        for label, value in rows:
+            pdf.set_x(text_x_pos)
+            pdf.set_font("Arial", "B", 12)
+            pdf.cell(LABEL_WIDTH, ROW_HEIGHT, label, 0, 0)
+            pdf.set_font("Arial", "", 12)
+            pdf.cell(0, ROW_HEIGHT, str(value), 0, 1)
+
+        # Conditionally add Hospital Location for Offline appointments
+        if appointment_data.get('appointmentType') == 'Offline':
+            pdf.set_x(text_x_pos)
+            pdf.set_font("Arial", "B", 12)
+            pdf.cell(LABEL_WIDTH, ROW_HEIGHT, "Location:", 0, 0)
+            pdf.set_font("Arial", "", 12)
+            location = f"{appointment_data.get('hospitalName', 'N/A')}, {appointment_data.get('hospitalLocation', 'N/A')}"
+            pdf.multi_cell(content_width - 50, ROW_HEIGHT, location, 0, 'L')
+
+        pdf.ln(5)  # Add padding at the bottom
+        _rounded_rect(pdf, BOX_MARGIN, box_top, content_width, pdf.get_y() - box_top, BOX_RADIUS, 'D')
+
+    def render(self, appointment_data):
+        """Returns the confirmation PDF for one appointment as bytes."""
+        with timed('pdf', 'render'):
+            template, box_top = self.template()
+            pdf = copy.deepcopy(template)
+            self._draw_details(pdf, box_top, appointment_data)
+            return _pdf_bytes(pdf)
+
+    def render_many(self, appointments):
+        """Renders a batch of confirmations, returning (appointment, pdf_bytes) pairs."""
+        return [(appointment, self.render(appointment)) for appointment in appointments]
+
+
+def confirmation_filename(appointment_data):
+    return f"appointment_{appointment_data['_id']}.pdf"
+
+
+confirmation_renderer = ConfirmationRenderer()
@@ -0,0 +1,309 @@
+"""Learned appointment scheduler trained on the booking history.
+
+For every doctor, weekday and half-hour slot, the model predicts how likely
+the slot is to be booked, from the doctor's historical fill rate for that
+slot and weekday, their overall load and their cancellation rate. Slots
+that usually fill up are shown as 'busy'; the rest are 'optimal', which
+spreads patients towards quieter times.
+
+Training streams the appointments collection in (doctor, date) order over
+the unique doctor/date/time index and feeds mini-batches to an
+SGDClassifier's partial_fit, so memory stays bounded as history grows. Every
+working day in a doctor's active range is a training day, including days
+nobody booked, so quiet days count as unbooked slots rather than vanishing.
+Each day's features use only the days before it. Only past days and
+cancellations are used, since future days are still filling up. Every run publishes a new versioned
+artifact through model_store, and app processes pick it up without a
+restart. Retrain by hand with:
+
+    python scheduler_model.py --train
+"""
+import argparse
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from model_store import current_version, load_version, save_version
+
+MODEL_NAME = 'learned_scheduler'
+TIME_SLOTS = [f"{h:02d}:{m:02d}" for h in range(9, 17) for m in (0, 30)]
+SLOT_INDEX = {slot: i for i, slot in enumerate(TIME_SLOTS)}
+SLOT_COUNT = len(TIME_SLOTS)
+# weekday one-hot, slot one-hot, then slot fill, weekday fill, doctor fill,
+# cancellation rate and history depth.
+FEATURE_COUNT = 7 + SLOT_COUNT + 5
+HISTORY_SATURATION = math.log1p(52)  # About a year of one weekday
+
+
+def weekday_of(date_str):
+    return date.fromisoformat(date_str).weekday()
+
+
+class DoctorHistory:
+    """Running per-weekday booking counts for one doctor."""
+
+    def __init__(self):
+        self.booked = np.zeros((7, SLOT_COUNT))
+        self.days = np.zeros(7)
+
+    def record_day(self, weekday, booked_mask):
+        self.booked[weekday] += booked_mask
+        self.days[weekday] += 1
+
+    def overall_fill(self):
+        return (self.booked.sum() + 1) / (self.days.sum() * SLOT_COUNT + 2)
+
+
+def slot_features(history, weekday, cancellations):
+    """Feature rows for all slots of one doctor on one weekday."""
+    features = np.zeros((SLOT_COUNT, FEATURE_COUNT))
+    features[:, weekday] = 1
+    features[np.arange(SLOT_COUNT), 7 + np.arange(SLOT_COUNT)] = 1
+    days = history.days[weekday]
+    slot_fill = (history.booked[weekday] + 1) / (days + 2)  # Laplace-smoothed, 0.5 with no history
+    base = 7 + SLOT_COUNT
+    features[:, base] = slot_fill
+    features[:, base + 1] = slot_fill.mean()
+    features[:, base + 2] = history.overall_fill()
+    if cancellations is not None:
+        cancelled = cancellations[weekday]
+        features[:, base + 3] = cancelled / (cancelled + history.booked[weekday] + 1)
+    features[:, base + 4] = min(math.log1p(days) / HISTORY_SATURATION, 1.0)
+    return features
+
+
+def load_cancellation_counts(collection, until, batch_size=5000):
+    """Cancelled bookings per doctor as a (weekday x slot) count matrix, from before the `until` date."""
+    counts = {}
+    if collection is None:
+        return counts
+    cutoff = datetime.combine(date.fromisoformat(until), datetime.min.time())
+    query = {'date': {'$lt': until}, 'cancelledAt': {'$not': {'$gte': cutoff}}}
+    for row in collection.find(query, {'doctorName': 1, 'date': 1, 'time': 1, '_id': 0}).batch_size(batch_size):
+        slot = SLOT_INDEX.get(row.get('time'))
+        if slot is None or not row.get('doctorName'):
+            continue
+        try:
+            weekday = weekday_of(row['date'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        counts.setdefault(row['doctorName'], np.zeros((7, SLOT_COUNT)))[weekday, slot] += 1
+    return counts
+
+
+def working_days(booked_days):
+    """(date, mask) for every day from the first to the last booked day that falls on a weekday the doctor works.
+
+    `booked_days` maps ISO dates to booked-slot masks. A doctor works the
+    weekdays they have ever had a booking on; other days in the range get
+    an all-zero mask.
+    """
+    dates = sorted(booked_days)
+    weekdays = {weekday_of(day) for day in dates}
+    day, last = date.fromisoformat(dates[0]), date.fromisoformat(dates[-1])
+    while day <= last:
+        if day.weekday() in weekdays:
+            key = day.isoformat()
+            yield key, booked_days.get(key, np.zeros(SLOT_COUNT))
+        day += timedelta(days=1)
+
+
+def iter_doctor_days(appointments_collection, until, batch_size=5000):
+    """Yields (doctorName, date, booked slot mask) for each past working day of each doctor, booked or not.
+
+    Rows arrive sorted by doctor, so only one doctor's days are held at a time.
+    """
+    cursor = appointments_collection.find(
+        {'date': {'$lt': until}}, {'doctorName': 1, 'date': 1, 'time': 1, '_id': 0},
+    ).sort([('doctorName', 1), ('date', 1), ('time', 1)]).batch_size(batch_size)
+    doctor, booked_days = None, {}
+    for row in cursor:
+        slot = SLOT_INDEX.get(row.get('time'))
+        if slot is None or not row.get('doctorName') or not isinstance(row.get('date'), str):
+            continue
+        try:
+            weekday_of(row['date'])
+        except ValueError:
+            continue
+        if row['doctorName'] != doctor:
+            if booked_days:
+                for day, mask in working_days(booked_days):
+                    yield doctor, day, mask
+            doctor, booked_days = row['doctorName'], {}
+        booked_days.setdefault(row['date'], np.zeros(SLOT_COUNT))[slot] = 1
+    if booked_days:
+        for day, mask in working_days(booked_days):
+            yield doctor, day, mask
+
+
+class LearnedScheduler:
+    """A fitted booking-probability model plus the per-doctor history it scores with."""
+
+    def __init__(self, model, histories, cancellations, trained_through, samples, busy_threshold=0.5):
+        self.model = model
+        self.histories = histories
+        self.cancellations = cancellations
+        self.trained_through = trained_through
+        self.samples = samples
+        self.busy_threshold = busy_threshold
+        self._init_cache()
+
+    def _init_cache(self, maxsize=4096):
+        self._tables = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ('_tables', '_maxsize', '_lock'):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_cache()
+
+    def booking_probabilities(self, doctor_name, weekday):
+        history = self.histories.get(doctor_name) or DoctorHistory()
+        features = slot_features(history, weekday, self.cancellations.get(doctor_name))
+        return self.model.predict_proba(features)[:, 1]
+
+    def score_table(self, doctor_name, weekday):
+        """Cached (slot, status) table for a doctor and weekday."""
+        key = (doctor_name, weekday)
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+        probabilities = self.booking_probabilities(doctor_name, weekday)
+        table = tuple((slot, 'busy' if p >= self.busy_threshold else 'optimal')
+                      for slot, p in zip(TIME_SLOTS, probabilities))
+        with self._lock:
+            self._tables[key] = table
+            if len(self._tables) > self._maxsize:
+                self._tables.popitem(last=False)
+        return table
+
+    def describe(self):
+        return {'trainedThrough': self.trained_through, 'samples': self.samples, 'doctors': len(self.histories),
+                'busyThreshold': self.busy_threshold}
+
+
+def train_scheduler(appointments_collection, cancellations_collection=None, until=None, batch_rows=20000,
+                    busy_threshold=0.5):
+    """Streams the booking history into a new LearnedScheduler. Returns None without enough history."""
+    from sklearn.linear_model import SGDClassifier
+
+    until = until or date.today().isoformat()
+    model = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=0)
+    cancellations = load_cancellation_counts(cancellations_collection, until)
+    histories = {}
+    features, labels = [], []
+    samples = positives = 0
+    fitted = False
+
+    def flush():
+        nonlocal fitted
+        if labels:
+            model.partial_fit(np.vstack(features), np.concatenate(labels), classes=np.array([0, 1]))
+            fitted = True
+            features.clear()
+            labels.clear()
+
+    for doctor_name, day, mask in iter_doctor_days(appointments_collection, until):
+        weekday = weekday_of(day)
+        history = histories.setdefault(doctor_name, DoctorHistory())
+        features.append(slot_features(history, weekday, cancellations.get(doctor_name)))
+        labels.append(mask)
+        history.record_day(weekday, mask)
+        samples += SLOT_COUNT
+        positives += int(mask.sum())
+        if len(labels) * SLOT_COUNT >= batch_rows:
+            flush()
+    flush()
+
+    if not fitted or positives in (0, samples):
+        return None
+    return LearnedScheduler(model, histories, cancellations, until, samples, busy_threshold)
+
+
+def retrain(appointments_collection, cancellations_collection=None, busy_threshold=0.5, model_dir=None):
+    """Trains on the current history and publishes a new artifact version. Returns the version or None."""
+    started = time.monotonic()
+    scheduler = train_scheduler(appointments_collection, cancellations_collection, busy_threshold=busy_threshold)
+    if scheduler is None:
+        print("--- Learned scheduler: not enough booking history to train yet ---")
+        return None
+    version = save_version(MODEL_NAME, scheduler, model_dir, **scheduler.describe())
+    print(f"--- Learned scheduler {version} trained on {scheduler.samples} slots "
+          f"in {time.monotonic() - started:.1f}s ---")
+    return version
+
+
+class SchedulerRegistry:
+    """Holds the active LearnedScheduler and swaps in newer published versions.
+
+    The CURRENT pointer is checked at most every `check_interval` seconds, and
+    a new version replaces the active one in a single assignment, so requests
+    never see a half-loaded model.
+    """
+
+    def __init__(self, name=MODEL_NAME, check_interval=60, model_dir=None):
+        self.name = name
+        self.check_interval = check_interval
+        self.model_dir = model_dir
+        self._active = (None, None)  # (version, scheduler)
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self.refresh()
+        return self._active[1]
+
+    def refresh(self):
+        """Loads the published version if it differs from the active one. Returns the active version."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version = current_version(self.name, self.model_dir)
+            if version is None or version == self._active[0]:
+                return self._active[0]
+            payload = load_version(self.name, version, self.model_dir)
+            if payload is not None:
+                self._active = (version, payload['model'])
+                print(f"--- Learned scheduler {version} loaded ---")
+            return self._active[0]
+
+    def get_stats(self):
+        version, scheduler = self._active
+        if scheduler is None:
+            return {'version': None}
+        return {'version': version, **scheduler.describe()}
+
+
+def main():
+    from pymongo import MongoClient
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'))
+    parser.add_argument('--db', default=os.environ.get('MONGO_DB', 'medismart_db'))
+    parser.add_argument('--busy-threshold', type=float,
+                        default=float(os.environ.get('SCHEDULER_BUSY_THRESHOLD', 0.5)))
+    parser.add_argument('--train', action='store_true', help='Train on the booking history and publish a version')
+    args = parser.parse_args()
+    if not args.train:
+        parser.print_help()
+        return
+    db = MongoClient(args.mongo_uri)[args.db]
+    retrain(db.appointments, db.appointment_cancellations, busy_threshold=args.busy_threshold)
+
+
+if __name__ == '__main__':
+    main()
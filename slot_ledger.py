@@ -0,0 +1,214 @@
+"""Per-doctor, per-day slot ledger.
+
+Each document holds one doctor's bookings for one date:
+
+    {'_id': '["Smith","2025-01-06"]', 'doctorName': 'Smith', 'date': '2025-01-06',
+     'slots': {'09:00': '<appointment id>', '10:30': '<appointment id>'}}
+
+A booking claims its slot with a single conditional upsert, so two concurrent
+requests for the same slot cannot both succeed, and availability is a
+single-document read.
+
+The app rebuilds the ledger from the appointments on startup when it was
+never built or was built in an older format (see ensure_current()). Rebuild
+it by hand, for example after editing appointments directly, with:
+
+    python slot_ledger.py --rebuild
+
+A rebuild makes every day's slots match the appointments exactly and drops
+days with none left, so run it while no bookings are being made.
+"""
+import argparse
+import json
+import os
+import re
+
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from db_indexes import ensure_indexes
+
+# Bump when ledger documents change shape; ensure_current() then rebuilds the ledger on startup.
+LEDGER_FORMAT = 2
+FORMAT_ID = 'slot_ledger_format'
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TIME_PATTERN = re.compile(r'^([01]\d|2[0-3]):[0-5]\d$')
+
+
+class SlotTakenError(Exception):
+    """Raised when the requested slot is already held by another appointment."""
+
+
+def ledger_id(doctor_name, date):
+    # JSON-encoded so a '|' or any other character in a doctor's name cannot make two days collide.
+    return json.dumps([doctor_name, date], separators=(',', ':'))
+
+
+def validate_slot(doctor_name, date, time):
+    """Raises ValueError unless the booking names a doctor, a YYYY-MM-DD date and an HH:MM time."""
+    if not doctor_name or not isinstance(doctor_name, str):
+        raise ValueError('Doctor name is required')
+    if not isinstance(date, str) or not DATE_PATTERN.match(date):
+        raise ValueError('Date must be in YYYY-MM-DD format')
+    if not isinstance(time, str) or not TIME_PATTERN.match(time):
+        raise ValueError('Time must be in HH:MM format')
+
+
+class SlotLedger:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def claim(self, doctor_name, date, time, appointment_id):
+        """Atomically reserves a slot for the appointment; raises SlotTakenError if it is held."""
+        validate_slot(doctor_name, date, time)
+        try:
+            result = self.collection.update_one(
+                {'_id': ledger_id(doctor_name, date), f'slots.{time}': {'$exists': False}},
+                {'$set': {f'slots.{time}': str(appointment_id)},
+                 '$setOnInsert': {'doctorName': doctor_name, 'date': date}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The day's document exists and the filter did not match: the slot is taken.
+            raise SlotTakenError(f'{time} on {date} is already booked')
+        if result.matched_count == 0 and result.upserted_id is None:
+            raise SlotTakenError(f'{time} on {date} is already booked')
+
+    def release(self, doctor_name, date, time, appointment_id):
+        """Frees a slot, but only if it is still held by this appointment."""
+        if not time or '.' in str(time) or str(time).startswith('$'):
+            return False
+        result = self.collection.update_one(
+            {'_id': ledger_id(doctor_name, date), f'slots.{time}': str(appointment_id)},
+            {'$unset': {f'slots.{time}': ''}},
+        )
+        return result.modified_count == 1
+
+    def claim_many(self, claims):
+        """Reserves many already-validated (doctorName, date, time, appointment_id) slots in one bulk write.
+
+        Returns the indexes of the claims whose slot was already held.
+        """
+        if not claims:
+            return set()
+        operations = [UpdateOne(
+            {'_id': ledger_id(doctor_name, date), f'slots.{time}': {'$exists': False}},
+            {'$set': {f'slots.{time}': str(appointment_id)},
+             '$setOnInsert': {'doctorName': doctor_name, 'date': date}},
+            upsert=True,
+        ) for doctor_name, date, time, appointment_id in claims]
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != 11000 for error in errors):
+                raise
+            return {error['index'] for error in errors}
+        return set()
+
+    def release_many(self, claims):
+        """Frees many (doctorName, date, time, appointment_id) slots still held by those appointments."""
+        if not claims:
+            return
+        self.collection.bulk_write([UpdateOne(
+            {'_id': ledger_id(doctor_name, date), f'slots.{time}': str(appointment_id)},
+            {'$unset': {f'slots.{time}': ''}},
+        ) for doctor_name, date, time, appointment_id in claims], ordered=False)
+
+    def booked_times(self, doctor_name, date):
+        doc = self.collection.find_one({'_id': ledger_id(doctor_name, date)}, {'slots': 1})
+        return set(doc['slots']) if doc and doc.get('slots') else set()
+
+    def booked_map(self, doctor_names, start_date, end_date):
+        """Booked times for many doctors over a date range, keyed by (doctorName, date)."""
+        cursor = self.collection.find(
+            {'doctorName': {'$in': list(doctor_names)}, 'date': {'$gte': start_date, '$lte': end_date}},
+            {'doctorName': 1, 'date': 1, 'slots': 1},
+        )
+        return {(doc['doctorName'], doc['date']): set(doc.get('slots') or {}) for doc in cursor}
+
+    def rebuild(self, appointments_collection, batch_size=1000):
+        """Makes the ledger match the appointments exactly. Returns (slots written, stale days removed).
+
+        Each day's slots are replaced as a whole, so slots whose appointment is
+        gone are freed, and ledger days without any appointment are deleted.
+        """
+        operations = []
+        kept = set()
+        written = 0
+        day, slots = None, {}
+
+        def flush_day():
+            if day is not None:
+                operations.append(UpdateOne(
+                    {'_id': ledger_id(*day)},
+                    {'$set': {'doctorName': day[0], 'date': day[1], 'slots': slots}},
+                    upsert=True,
+                ))
+                kept.add(ledger_id(*day))
+
+        def flush_batch():
+            if operations:
+                self.collection.bulk_write(operations, ordered=False)
+                operations.clear()
+
+        # Sorted like the unique doctor/date/time index, so each day's appointments arrive together.
+        cursor = appointments_collection.find({}, {'doctorName': 1, 'date': 1, 'time': 1}).sort(
+            [('doctorName', 1), ('date', 1), ('time', 1)])
+        for appointment in cursor.batch_size(batch_size):
+            try:
+                validate_slot(appointment.get('doctorName'), appointment.get('date'), appointment.get('time'))
+            except ValueError:
+                continue  # Legacy rows that cannot be expressed as a slot
+            key = (appointment['doctorName'], appointment['date'])
+            if key != day:
+                flush_day()
+                day, slots = key, {}
+                if len(operations) >= batch_size:
+                    flush_batch()
+            slots[appointment['time']] = str(appointment['_id'])
+            written += 1
+        flush_day()
+        flush_batch()
+
+        stale = [doc['_id'] for doc in self.collection.find({}, {'_id': 1}).batch_size(batch_size)
+                 if doc['_id'] not in kept]
+        for i in range(0, len(stale), batch_size):
+            self.collection.delete_many({'_id': {'$in': stale[i:i + batch_size]}})
+        return written, len(stale)
+
+    def ensure_current(self, appointments_collection, counters_collection):
+        """Rebuilds the ledger if it was never built or is in an older format. Returns True if it rebuilt."""
+        marker = counters_collection.find_one({'_id': FORMAT_ID})
+        if marker and marker.get('format') == LEDGER_FORMAT:
+            return False
+        written, removed = self.rebuild(appointments_collection)
+        mark_current(counters_collection)
+        print(f"--- Slot ledger rebuilt (format {LEDGER_FORMAT}): {written} slots, {removed} stale days removed ---")
+        return True
+
+
+def mark_current(counters_collection):
+    """Records that the ledger is in the current format, e.g. after seeding it directly."""
+    counters_collection.update_one({'_id': FORMAT_ID}, {'$set': {'format': LEDGER_FORMAT}}, upsert=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mongo-uri', default=os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'))
+    parser.add_argument('--db', default=os.environ.get('MONGO_DB', 'medismart_db'))
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the ledger from the appointments collection')
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+
+    db = MongoClient(args.mongo_uri)[args.db]
+    ensure_indexes(db)
+    written, removed = SlotLedger(db.slot_ledger).rebuild(db.appointments)
+    mark_current(db.counters)
+    print(f"--- Slot ledger rebuilt: {written} slots, {removed} stale days removed ---")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,19 +7,18 @@ document.addEventListener("DOMContentLoaded", () => {
     const suggestionsBox = document.getElementById("ai-suggestions-box");
     const suggestionsContainer = document.getElementById("ai-suggestions");
 
-    let doctorsData = [];
+    // Domains come from the directory facets; each domain's doctors are fetched
+    // on demand. Both responses carry ETags, so repeat visits revalidate cheaply.
+    const DOCTORS_PER_DOMAIN = 200;
 
-    // Fetch all doctors to populate dropdowns
-    fetch('/api/doctors')
+    fetch('/api/doctors/facets')
         .then(response => response.json())
-        .then(data => {
-            doctorsData = data;
-            if (doctorsData.length === 0) {
+        .then(facets => {
+            if (facets.domains.length === 0) {
                 domainSelect.innerHTML = '<option value="">No doctors available</option>';
                 return;
             }
-            const uniqueDomains = [...new Set(doctorsData.map(d => d.domain))];
-            uniqueDomains.forEach(domain => {
+            facets.domains.forEach(domain => {
                 const option = document.createElement("option");
                 option.value = domain;
                 option.textContent = domain;
@@ -32,18 +31,62 @@ document.addEventListener("DOMContentLoaded", () => {
         const selectedDomain = domainSelect.value;
         doctorSelect.innerHTML = '<option value="">--Select Doctor--</option>';
         if (selectedDomain) {
-            const filteredDoctors = doctorsData.filter(d => d.domain === selectedDomain);
-            filteredDoctors.forEach(doc => {
-                const option = document.createElement("option");
-                // Store the entire doctor object as a JSON string
-                option.value = JSON.stringify(doc);
-                option.textContent = `Dr. ${doc.name} (${doc.hospitalName})`;
-                doctorSelect.appendChild(option);
-            });
+            const params = new URLSearchParams({ domain: selectedDomain, limit: DOCTORS_PER_DOMAIN });
+            fetch(`/api/doctors/search?${params}`)
+                .then(response => response.json())
+                .then(result => {
+                    if (result.error) throw new Error(result.error);
+                    // Ignore a late response for a domain the user has already moved away from
+                    if (domainSelect.value !== selectedDomain) return;
+                    result.items.forEach(doc => {
+                        const option = document.createElement("option");
+                        // Store the entire doctor object as a JSON string
+                        option.value = JSON.stringify(doc);
+                        option.textContent = `Dr. ${doc.name} (${doc.hospitalName})`;
+                        doctorSelect.appendChild(option);
+                    });
+                })
+                .catch(error => console.error('Error fetching doctors:', error));
         }
     });
 
     // --- AI Scheduling Logic ---
+    // Availability is loaded a week at a time per doctor from the bulk endpoint,
+    // so changing the date within that week needs no extra round trip.
+    const AVAILABILITY_DAYS = 7;
+    let availabilityCache = {}; // { doctorName: { date: [{ time, status }] } }
+
+    function addDays(isoDate, days) {
+        const d = new Date(`${isoDate}T00:00:00Z`);
+        d.setUTCDate(d.getUTCDate() + days);
+        return d.toISOString().slice(0, 10);
+    }
+
+    async function loadAvailability(doctorName, startDate) {
+        const response = await fetch('/api/availability', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                doctorNames: [doctorName],
+                startDate,
+                endDate: addDays(startDate, AVAILABILITY_DAYS - 1)
+            })
+        });
+        const matrix = await response.json();
+        if (matrix.error) throw new Error(matrix.error);
+        const statusByCode = {
+            [matrix.codes.optimal]: 'optimal',
+            [matrix.codes.busy]: 'busy'
+        };
+        const doctorDays = availabilityCache[doctorName] || {};
+        Object.entries(matrix.availability[doctorName] || {}).forEach(([day, codes]) => {
+            doctorDays[day] = matrix.slots
+                .map((time, i) => ({ time, status: statusByCode[codes[i]] }))
+                .filter(slot => slot.status);
+        });
+        availabilityCache[doctorName] = doctorDays;
+    }
+
     async function getAiSuggestions() {
         if (!doctorSelect.value) {
             suggestionsBox.classList.add('hidden');
@@ -59,13 +102,10 @@ document.addEventListener("DOMContentLoaded", () => {
         }
 
         try {
-            const response = await fetch('/api/schedule-suggestions', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ doctorName, date })
-            });
-            const suggestions = await response.json();
-            displaySuggestions(suggestions);
+            if (!(availabilityCache[doctorName] && availabilityCache[doctorName][date])) {
+                await loadAvailability(doctorName, date);
+            }
+            displaySuggestions(availabilityCache[doctorName][date] || []);
         } catch (error) {
             console.error('Error fetching suggestions:', error);
         }
@@ -131,10 +171,13 @@ document.addEventListener("DOMContentLoaded", () => {
                 confirmation.style.color = 'green';
                 document.getElementById("appointmentForm").reset();
                 suggestionsBox.classList.add('hidden');
+                availabilityCache = {}; // The booked slot is no longer free
             })
             .catch(error => {
                 confirmation.textContent = `Error: ${error.message}`;
                 confirmation.style.color = 'red';
+                availabilityCache = {}; // The slot may have been taken meanwhile; refresh it
+                getAiSuggestions();
             });
     });
 });
@@ -3,11 +3,12 @@ document.addEventListener("DOMContentLoaded", () => {
     const bookBtn = document.getElementById('bookBtn');
     const confirmationBox = document.getElementById('confirmationBox');
 
-    // Fetch doctors to populate the dropdown
-    fetch('/api/doctors')
+    // Fetch the doctors who consult online to populate the dropdown
+    const params = new URLSearchParams({ appointmentType: 'Online', limit: 200 });
+    fetch(`/api/doctors/search?${params}`)
         .then(response => response.json())
-        .then(doctorsList => {
-            doctorsList.forEach((doc) => {
+        .then(result => {
+            result.items.forEach((doc) => {
                 const option = document.createElement('option');
                 option.value = JSON.stringify(doc); // Store whole object
                 option.textContent = `${doc.name} (${doc.specialization})`;
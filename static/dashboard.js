@@ -2,27 +2,36 @@ document.addEventListener('DOMContentLoaded', () => {
     const appointmentsListDiv = document.getElementById('appointments-list');
     const container = document.querySelector('.dashboard-container');
     const userRole = container.dataset.userRole;
+    const PAGE_SIZE = 20;
+    let nextCursor = null;
 
-    async function fetchAppointments() {
+    // Appointments are loaded a page at a time; "Load more" follows the server's cursor.
+    async function fetchAppointments(append = false) {
         try {
-            const response = await fetch('/api/my-appointments');
+            const params = new URLSearchParams({ limit: PAGE_SIZE });
+            if (append && nextCursor) params.set('after', nextCursor);
+            const response = await fetch(`/api/my-appointments?${params}`);
             if (!response.ok) {
                 throw new Error('Failed to fetch appointments');
             }
-            const appointments = await response.json();
-            displayAppointments(appointments);
+            const page = await response.json();
+            nextCursor = page.nextCursor;
+            displayAppointments(page.items, append);
         } catch (error) {
             appointmentsListDiv.innerHTML = `<p style="color: red;">Error: ${error.message}</p>`;
         }
     }
 
-    function displayAppointments(appointments) {
-        if (appointments.length === 0) {
+    function displayAppointments(appointments, append) {
+        const loadMoreBtn = appointmentsListDiv.querySelector('.load-more-btn');
+        if (loadMoreBtn) loadMoreBtn.remove();
+
+        if (!append && appointments.length === 0) {
             appointmentsListDiv.innerHTML = '<p>You have no upcoming appointments.</p>';
             return;
         }
 
-        appointmentsListDiv.innerHTML = ''; // Clear loading message
+        if (!append) appointmentsListDiv.innerHTML = ''; // Clear loading message
         appointments.forEach(app => {
             const card = document.createElement('div');
             card.className = 'appointment-card';
@@ -45,10 +54,21 @@ document.addEventListener('DOMContentLoaded', () => {
             `;
             appointmentsListDiv.appendChild(card);
         });
+
+        if (nextCursor) {
+            const moreBtn = document.createElement('button');
+            moreBtn.className = 'load-more-btn';
+            moreBtn.textContent = 'Load more';
+            appointmentsListDiv.appendChild(moreBtn);
+        }
     }
     
     // Event listener for cancellation
     appointmentsListDiv.addEventListener('click', async (e) => {
+        if (e.target.classList.contains('load-more-btn')) {
+            fetchAppointments(true);
+            return;
+        }
         if (e.target.classList.contains('cancel-btn')) {
             const appointmentId = e.target.dataset.id;
             if (confirm('Are you sure you want to cancel this appointment?')) {
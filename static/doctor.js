@@ -4,6 +4,7 @@ document.addEventListener("DOMContentLoaded", () => {
     const addCloseBtn = addModal.querySelector(".close");
     const viewCloseBtn = viewModal.querySelector(".close");
     const doctorForm = document.getElementById("doctorForm");
+    const DOCTORS_PAGE_SIZE = 24;
 
     // --- Add Doctor Modal Logic ---
     document.querySelectorAll(".add-doctor-btn").forEach(btn => {
@@ -25,36 +26,50 @@ document.addEventListener("DOMContentLoaded", () => {
             viewDoctorsContainer.innerHTML = '<p>Loading doctors...</p>';
             viewModal.style.display = "flex";
 
-            fetch('/api/doctors')
-                .then(response => response.json())
-                .then(allDoctors => {
-                    const filteredDoctors = allDoctors.filter(doc => doc.domain === domainName);
-                    
-                    viewDoctorsContainer.innerHTML = ''; 
-                    
-                    if (filteredDoctors.length === 0) {
-                        viewDoctorsContainer.innerHTML = '<p>No doctors found for this domain.</p>';
-                        return;
-                    }
+            const renderDoctor = (doc) => {
+                const docCard = document.createElement('div');
+                docCard.className = 'doctor-card';
+                docCard.innerHTML = `
+                    <img src="${doc.image}" alt="${doc.name}">
+                    <h4>Dr. ${doc.name}</h4>
+                    <p>${doc.degree}, ${doc.specialization}</p>
+                    <p><strong>Experience:</strong> ${doc.experience} years</p>
+                    <p><strong>Hospital:</strong> ${doc.hospitalName}, ${doc.hospitalLocation}</p>
+                    <p><strong>Contact:</strong> ${doc.contact}</p>
+                `;
+                viewDoctorsContainer.appendChild(docCard);
+            };
 
-                    filteredDoctors.forEach(doc => {
-                        const docCard = document.createElement('div');
-                        docCard.className = 'doctor-card';
-                        docCard.innerHTML = `
-                            <img src="${doc.image}" alt="${doc.name}">
-                            <h4>Dr. ${doc.name}</h4>
-                            <p>${doc.degree}, ${doc.specialization}</p>
-                            <p><strong>Experience:</strong> ${doc.experience} years</p>
-                            <p><strong>Hospital:</strong> ${doc.hospitalName}, ${doc.hospitalLocation}</p>
-                            <p><strong>Contact:</strong> ${doc.contact}</p>
-                        `;
-                        viewDoctorsContainer.appendChild(docCard);
+            // The server filters by domain and pages the results; "Load more" fetches the next page.
+            const loadPage = (page) => {
+                const params = new URLSearchParams({ domain: domainName, page, limit: DOCTORS_PAGE_SIZE });
+                return fetch(`/api/doctors/search?${params}`)
+                    .then(response => response.json())
+                    .then(result => {
+                        if (result.error) throw new Error(result.error);
+                        if (page === 1) viewDoctorsContainer.innerHTML = '';
+                        if (result.total === 0) {
+                            viewDoctorsContainer.innerHTML = '<p>No doctors found for this domain.</p>';
+                            return;
+                        }
+                        result.items.forEach(renderDoctor);
+                        if (result.nextPage) {
+                            const moreBtn = document.createElement('button');
+                            moreBtn.className = 'load-more-btn';
+                            moreBtn.textContent = 'Load more';
+                            moreBtn.addEventListener('click', () => {
+                                moreBtn.remove();
+                                loadPage(result.nextPage);
+                            });
+                            viewDoctorsContainer.appendChild(moreBtn);
+                        }
                     });
-                })
-                .catch(error => {
-                    console.error('Error fetching doctors:', error);
-                    viewDoctorsContainer.innerHTML = '<p>Could not load doctors. Please try again.</p>';
-                });
+            };
+
+            loadPage(1).catch(error => {
+                console.error('Error fetching doctors:', error);
+                viewDoctorsContainer.innerHTML = '<p>Could not load doctors. Please try again.</p>';
+            });
         });
     });
 
@@ -1,5 +1,28 @@
 document.addEventListener('DOMContentLoaded', () => {
     let userMedications = [];
+    const PAGE_SIZE = 20;
+
+    // Fetches one page from a paginated list endpoint: { items, nextCursor }.
+    async function fetchPage(url, after, errorMessage) {
+        const params = new URLSearchParams({ limit: PAGE_SIZE });
+        if (after) params.set('after', after);
+        const response = await fetch(`${url}?${params}`);
+        if (!response.ok) throw new Error(errorMessage);
+        return response.json();
+    }
+
+    // Appends a "Load more" button that loads the next page into the same list.
+    function addLoadMore(listEl, nextCursor, loadNext) {
+        if (!nextCursor) return;
+        const moreBtn = document.createElement('button');
+        moreBtn.className = 'load-more-btn';
+        moreBtn.textContent = 'Load more';
+        moreBtn.addEventListener('click', () => {
+            moreBtn.remove();
+            loadNext(nextCursor);
+        });
+        listEl.appendChild(moreBtn);
+    }
 
     // --- SECTION VISIBILITY ---
     window.showSection = function(targetId) {
@@ -11,7 +34,10 @@ document.addEventListener('DOMContentLoaded', () => {
             activeSection.style.display = 'block';
             activeSection.scrollIntoView({ behavior: 'smooth' });
             // Load data for the shown section
-            if (targetId === 'health-records') loadHealthRecords();
+            if (targetId === 'health-records') {
+                loadHealthRecords();
+                loadTrendMetrics();
+            }
             if (targetId === 'appointments') loadAppointments();
             if (targetId === 'medications') loadMedications();
         }
@@ -37,16 +63,17 @@ document.addEventListener('DOMContentLoaded', () => {
     const healthRecordForm = document.getElementById('healthRecordForm');
     const healthRecordsList = document.getElementById('healthRecordsList');
 
-    async function loadHealthRecords() {
-        healthRecordsList.innerHTML = '<p>Loading records...</p>';
+    async function loadHealthRecords(after = null) {
+        if (!after) healthRecordsList.innerHTML = '<p>Loading records...</p>';
         try {
-            const response = await fetch('/api/elder/health-records');
-            if (!response.ok) throw new Error('Could not fetch health records. Please log in.');
-            const records = await response.json();
-            healthRecordsList.innerHTML = '<h3>Saved Records</h3>';
-            if (records.length === 0) {
-                healthRecordsList.innerHTML += '<p>No records found.</p>';
-                return;
+            const page = await fetchPage('/api/elder/health-records', after, 'Could not fetch health records. Please log in.');
+            const records = page.items;
+            if (!after) {
+                healthRecordsList.innerHTML = '<h3>Saved Records</h3>';
+                if (records.length === 0) {
+                    healthRecordsList.innerHTML += '<p>No records found.</p>';
+                    return;
+                }
             }
             records.forEach(r => {
                 const recordEl = document.createElement('div');
@@ -54,6 +81,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 recordEl.innerHTML = `<strong>${r.metric}:</strong> ${r.value} <span class="timestamp">${new Date(r.date + 'Z').toLocaleString()}</span>`;
                 healthRecordsList.appendChild(recordEl);
             });
+            addLoadMore(healthRecordsList, page.nextCursor, loadHealthRecords);
         } catch (error) {
             healthRecordsList.innerHTML = `<p class="error">${error.message}</p>`;
         }
@@ -72,23 +100,125 @@ document.addEventListener('DOMContentLoaded', () => {
              if (!response.ok) throw new Error('Failed to save record.');
             healthRecordForm.reset();
             loadHealthRecords(); // Refresh the list
+            loadTrendMetrics();
         } catch (error) {
             alert(`Error saving record: ${error.message}`);
         }
     });
 
+    // --- HEALTH TRENDS ---
+    // The server returns at most ~120 aggregated windows (hourly, daily, weekly
+    // or monthly, depending on the range), so the chart payload stays small
+    // however many readings have been logged.
+    const trendMetric = document.getElementById('trendMetric');
+    const trendRange = document.getElementById('trendRange');
+    const trendChart = document.getElementById('trendChart');
+    const trendSummary = document.getElementById('trendSummary');
+    const TREND_COLORS = ['#0077b6', '#e76f51'];
+    const WINDOW_LABELS = { hour: 'Hourly', day: 'Daily', week: 'Weekly', month: 'Monthly' };
+
+    async function loadTrendMetrics() {
+        try {
+            const response = await fetch('/api/elder/health-records/metrics');
+            if (!response.ok) throw new Error('Could not fetch your health trends.');
+            const metrics = await response.json();
+            const selected = trendMetric.value;
+            trendMetric.innerHTML = '';
+            metrics.forEach(m => {
+                const option = document.createElement('option');
+                option.value = m.key;
+                option.textContent = m.label;
+                trendMetric.appendChild(option);
+            });
+            if (metrics.length === 0) return;
+            if (metrics.some(m => m.key === selected)) trendMetric.value = selected;
+            loadTrend();
+        } catch (error) {
+            trendChart.innerHTML = `<p class="error">${error.message}</p>`;
+        }
+    }
+
+    async function loadTrend() {
+        if (!trendMetric.value) return;
+        const to = new Date();
+        const from = new Date(to.getTime() - (Number(trendRange.value) - 1) * 86400000);
+        const params = new URLSearchParams({
+            metric: trendMetric.value,
+            from: from.toISOString().slice(0, 10),
+            to: to.toISOString().slice(0, 10)
+        });
+        try {
+            const response = await fetch(`/api/elder/health-records/series?${params}`);
+            const series = await response.json();
+            if (!response.ok) throw new Error(series.error || 'Could not fetch your health trends.');
+            renderTrend(series);
+        } catch (error) {
+            trendChart.innerHTML = `<p class="error">${error.message}</p>`;
+        }
+    }
+
+    function renderTrend(series) {
+        const points = series.points;
+        const components = series.metric.components;
+        if (points.length === 0) {
+            trendChart.innerHTML = '<p>No readings in this period.</p>';
+            trendSummary.innerHTML = '';
+            return;
+        }
+        const W = 640, H = 220, PAD = 32;
+        const values = points.flatMap(p => components.flatMap(c => [p[c].min, p[c].max])).filter(v => v !== null);
+        let lo = Math.min(...values), hi = Math.max(...values);
+        if (lo === hi) { lo -= 1; hi += 1; }
+        const t0 = Date.parse(`${series.from}T00:00:00Z`);
+        const t1 = Date.parse(`${series.to}T00:00:00Z`) + 86400000;
+        const x = start => PAD + (Date.parse(`${start}Z`) - t0) / (t1 - t0) * (W - 2 * PAD);
+        const y = v => H - PAD - (v - lo) / (hi - lo) * (H - 2 * PAD);
+        const line = (c, key) => points
+            .filter(p => p[c][key] !== null && p[c][key] !== undefined)
+            .map(p => `${x(p.start).toFixed(1)},${y(p[c][key]).toFixed(1)}`)
+            .join(' ');
+
+        let svg = `<svg class="trend-svg" viewBox="0 0 ${W} ${H}" role="img" aria-label="${series.metric.label} trend">`;
+        svg += `<text x="2" y="${y(hi) + 4}">${hi}</text><text x="2" y="${y(lo) + 4}">${lo}</text>`;
+        svg += `<text x="${PAD}" y="${H - 8}">${series.from}</text>`;
+        svg += `<text x="${W - PAD}" y="${H - 8}" text-anchor="end">${series.to}</text>`;
+        components.forEach((c, i) => {
+            const color = TREND_COLORS[i % TREND_COLORS.length];
+            svg += `<polyline points="${line(c, 'avg')}" fill="none" stroke="${color}" stroke-width="2"/>`;
+            if (series.rolling) {
+                svg += `<polyline points="${line(c, 'rollingAvg')}" fill="none" stroke="${color}" stroke-width="1.5" stroke-dasharray="5 4" opacity="0.6"/>`;
+            }
+        });
+        trendChart.innerHTML = svg + '</svg>';
+
+        const unit = series.metric.unit ? ` ${series.metric.unit}` : '';
+        const legend = components.map((c, i) => {
+            const s = series.summary[c];
+            const name = components.length > 1 ? c.charAt(0).toUpperCase() + c.slice(1) : series.metric.label;
+            const change = s.change === null ? '' : `, change ${s.change > 0 ? '+' : ''}${s.change}${unit}`;
+            return `<span><span class="swatch" style="background:${TREND_COLORS[i % TREND_COLORS.length]}"></span>`
+                + `${name}: ${s.min}–${s.max}${unit}${change}</span>`;
+        });
+        trendSummary.innerHTML = `<p class="trend-legend">${legend.join('')}</p>`
+            + `<p class="timestamp">${WINDOW_LABELS[series.window]} averages${series.rolling ? `, dashed: ${series.rolling}-${series.window} rolling average` : ''}</p>`;
+    }
+
+    trendMetric.addEventListener('change', loadTrend);
+    trendRange.addEventListener('change', loadTrend);
+
     // --- APPOINTMENTS ---
     const elderAppointmentsList = document.getElementById('elderAppointmentsList');
-    async function loadAppointments() {
-        elderAppointmentsList.innerHTML = '<p>Loading appointments...</p>';
+    async function loadAppointments(after = null) {
+        if (!after) elderAppointmentsList.innerHTML = '<p>Loading appointments...</p>';
         try {
-            const response = await fetch('/api/my-appointments');
-            if (!response.ok) throw new Error('Could not fetch appointments. Please log in.');
-            const appointments = await response.json();
-            elderAppointmentsList.innerHTML = '<h3>Upcoming Appointments</h3>';
-            if (appointments.length === 0) {
-                elderAppointmentsList.innerHTML += '<p>No upcoming appointments found.</p>';
-                return;
+            const page = await fetchPage('/api/my-appointments', after, 'Could not fetch appointments. Please log in.');
+            const appointments = page.items;
+            if (!after) {
+                elderAppointmentsList.innerHTML = '<h3>Upcoming Appointments</h3>';
+                if (appointments.length === 0) {
+                    elderAppointmentsList.innerHTML += '<p>No upcoming appointments found.</p>';
+                    return;
+                }
             }
             appointments.forEach(app => {
                 const appEl = document.createElement('div');
@@ -96,6 +226,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 appEl.innerHTML = `<strong>With Dr. ${app.doctorName}</strong> on ${app.date} at ${app.time}`;
                 elderAppointmentsList.appendChild(appEl);
             });
+            addLoadMore(elderAppointmentsList, page.nextCursor, loadAppointments);
         } catch (error) {
             elderAppointmentsList.innerHTML = `<p class="error">${error.message}</p>`;
         }
@@ -112,23 +243,27 @@ document.addEventListener('DOMContentLoaded', () => {
             if (!response.ok) throw new Error('Could not fetch medication schedule. Please log in.');
             const meds = await response.json();
             userMedications = meds; // Store for the reminder checker
-            medicationsList.innerHTML = '<h3>My Medication Schedule</h3>';
-            if (meds.length === 0) {
-                medicationsList.innerHTML += '<p>No medications added yet.</p>';
-                return;
-            }
-            meds.forEach(m => {
-                const medEl = document.createElement('div');
-                medEl.className = 'item-card';
-                medEl.innerHTML = `
-                    <span><strong>${m.name}</strong> (${m.dosage}) at <strong>${m.time}</strong></span>
-                    <button class="delete-btn" data-id="${m._id}">&times;</button>`;
-                medicationsList.appendChild(medEl);
-            });
+            renderMedications(meds);
         } catch (error) {
             medicationsList.innerHTML = `<p class="error">${error.message}</p>`;
         }
     }
+
+    function renderMedications(meds) {
+        medicationsList.innerHTML = '<h3>My Medication Schedule</h3>';
+        if (meds.length === 0) {
+            medicationsList.innerHTML += '<p>No medications added yet.</p>';
+            return;
+        }
+        meds.forEach(m => {
+            const medEl = document.createElement('div');
+            medEl.className = 'item-card';
+            medEl.innerHTML = `
+                <span><strong>${m.name}</strong> (${m.dosage}) at <strong>${m.time}</strong></span>
+                <button class="delete-btn" data-id="${m._id}">&times;</button>`;
+            medicationsList.appendChild(medEl);
+        });
+    }
     
     medicationForm.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -172,16 +307,20 @@ document.addEventListener('DOMContentLoaded', () => {
         userMedications.forEach(med => {
             if (med.time === currentTime && !med.reminded) {
                 med.reminded = true; // Mark as reminded for this session
-                reminderBanner.innerHTML = `
-                    <div class="reminder-content">
-                        <h2>Time for your medication!</h2>
-                        <p>Please take: <strong>${med.name} (${med.dosage})</strong></p>
-                        <button id="dismissReminderBtn">Dismiss</button>
-                    </div>`;
-                reminderBanner.className = 'reminder-banner-visible';
+                showReminder(med);
             }
         });
     }
+
+    function showReminder(med) {
+        reminderBanner.innerHTML = `
+            <div class="reminder-content">
+                <h2>Time for your medication!</h2>
+                <p>Please take: <strong>${med.name} (${med.dosage})</strong></p>
+                <button id="dismissReminderBtn">Dismiss</button>
+            </div>`;
+        reminderBanner.className = 'reminder-banner-visible';
+    }
     
     // Reset reminders daily to allow for new reminders the next day
     function resetReminders() {
@@ -197,7 +336,46 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
     
-    loadMedications(); // Initial load to check for reminders
-    setInterval(checkMedicationReminders, 15000); // Check every 15 seconds
-    setInterval(resetReminders, 60000); // Check every minute for midnight reset
+    // --- LIVE UPDATES ---
+    // The server pushes the medication schedule, due reminders and changes to
+    // records/appointments, so nothing needs to be polled while the page is open.
+    function isSectionVisible(id) {
+        const section = document.getElementById(id);
+        return section && section.style.display === 'block';
+    }
+
+    function reloadVisibleSections() {
+        if (isSectionVisible('health-records')) loadHealthRecords();
+        if (isSectionVisible('appointments')) loadAppointments();
+    }
+
+    function startPolling() {
+        loadMedications(); // Initial load to check for reminders
+        setInterval(checkMedicationReminders, 15000); // Check every 15 seconds
+        setInterval(resetReminders, 60000); // Check every minute for midnight reset
+    }
+
+    if (window.EventSource) {
+        const events = new EventSource(`/api/elder/events?tzOffset=${new Date().getTimezoneOffset()}`);
+        // A refused stream (e.g. 503 when the server is at its stream limit) is not retried by the browser.
+        events.addEventListener('error', () => {
+            if (events.readyState === EventSource.CLOSED) startPolling();
+        });
+        events.addEventListener('schedule', (e) => {
+            userMedications = JSON.parse(e.data);
+            renderMedications(userMedications);
+        });
+        events.addEventListener('reminder', (e) => showReminder(JSON.parse(e.data)));
+        events.addEventListener('change', (e) => {
+            const change = JSON.parse(e.data);
+            if (change.collection === 'health_records' && isSectionVisible('health-records')) {
+                loadHealthRecords();
+                loadTrendMetrics();
+            }
+            if (change.collection === 'appointments' && isSectionVisible('appointments')) loadAppointments();
+        });
+        events.addEventListener('resync', reloadVisibleSections);
+    } else {
+        startPolling();
+    }
 });
\ No newline at end of file
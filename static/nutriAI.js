@@ -21,26 +21,66 @@ document.addEventListener("DOMContentLoaded", () => {
                 healthRecords: healthRecords // Send the additional details
             };
 
-            fetch('/api/diet-recommendation', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify(dietRequestData)
-            })
-            .then(response => response.json())
-            .then(data => {
-                if (data.error) throw new Error(data.error);
-                
-                routineBox.innerHTML = `
-                    <h3>AI Diet Recommendation for ${name}</h3>
-                    <p><strong>Primary Condition:</strong> ${disease}</p>
-                    <hr>
-                    <p>${data.diet.replace(/\n/g, '<br>')}</p> <hr>
-                    <p><em>This is an AI-generated suggestion. Always consult with a certified doctor or nutritionist.</em></p>
-                `;
-            })
-            .catch(error => {
-                routineBox.innerHTML = `<p style="color: red;">Error: ${error.message}</p>`;
-            });
+            streamDietRecommendation(dietRequestData, name, disease)
+                .catch(error => {
+                    routineBox.innerHTML = `<p style="color: red;">Error: ${error.message}</p>`;
+                });
         });
     }
-});
\ No newline at end of file
+});
+
+// Reads the server-sent events from the streaming endpoint and renders the
+// diet plan as tokens arrive instead of waiting for the whole completion.
+async function streamDietRecommendation(dietRequestData, name, disease) {
+    const routineBox = document.getElementById('routineBox');
+    const response = await fetch('/api/diet-recommendation/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
+        body: JSON.stringify(dietRequestData)
+    });
+    if (!response.ok) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.error || 'Failed to get a diet recommendation.');
+    }
+
+    routineBox.innerHTML = `
+        <h3></h3>
+        <p><strong>Primary Condition:</strong> <span class="diet-condition"></span></p>
+        <hr>
+        <p class="diet-text"></p> <hr>
+        <p><em>This is an AI-generated suggestion. Always consult with a certified doctor or nutritionist.</em></p>
+    `;
+    routineBox.querySelector('h3').textContent = `AI Diet Recommendation for ${name}`;
+    routineBox.querySelector('.diet-condition').textContent = disease;
+    const dietText = routineBox.querySelector('.diet-text');
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const rawEvent of events) {
+            let eventName = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            const payload = data ? JSON.parse(data) : {};
+            if (eventName === 'token') {
+                text += payload.text;
+                dietText.innerText = text;
+            } else if (eventName === 'done') {
+                dietText.innerText = payload.text;
+            } else if (eventName === 'error') {
+                throw new Error(payload.error);
+            }
+        }
+    }
+}
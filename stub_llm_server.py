@@ -0,0 +1,144 @@
+"""A local stand-in for the OpenAI/OpenRouter chat-completions API.
+
+Useful for exercising the AI gateway, streaming and benchmarks without an
+API key or network access:
+
+    python stub_llm_server.py --port 8001 --latency 0.3 --rate-limit-every 5
+    OPENROUTER_API_KEY=stub OPENROUTER_BASE_URL=http://localhost:8001/v1 python app.py
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = ("Focus on whole grains, leafy vegetables, lean proteins and plenty of water, "
+                 "while limiting added sugar, salt and fried foods.")
+
+
+class StubState:
+    def __init__(self, latency=0.0, token_delay=0.02, reply=DEFAULT_REPLY, specialist='General Physician',
+                 rate_limit_every=0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.specialist = specialist
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def next_request(self):
+        with self.lock:
+            self.requests += 1
+            return self.requests
+
+
+def make_handler(state):
+    class ChatCompletionsHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/health'):
+                self._send_json(200, {'status': 'ok', 'requests': state.requests})
+            else:
+                self._send_json(404, {'error': {'message': 'Not found'}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {'error': {'message': 'Not found'}})
+                return
+
+            count = state.next_request()
+            if state.rate_limit_every and count % state.rate_limit_every == 0:
+                self._send_json(429, {'error': {'message': 'Rate limit exceeded (stub)', 'type': 'rate_limit'}},
+                                {'Retry-After': '0.1'})
+                return
+
+            time.sleep(state.latency)
+            system = ' '.join(m.get('content', '') for m in payload.get('messages', []) if m.get('role') == 'system')
+            text = state.specialist if 'specialty' in system.lower() else state.reply
+            model = payload.get('model', 'stub-model')
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+            if payload.get('stream'):
+                self._stream(completion_id, model, text)
+                return
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': len(text.split()), 'total_tokens': len(text.split())},
+            })
+
+        def _stream(self, completion_id, model, text):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            words = text.split(' ')
+            for i, word in enumerate(words):
+                delta = {'content': word + (' ' if i < len(words) - 1 else '')}
+                if i == 0:
+                    delta['role'] = 'assistant'
+                self._event({'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                             'model': model, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]})
+                time.sleep(state.token_delay)
+            self._event({'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+
+        def _event(self, body):
+            self.wfile.write(f"data: {json.dumps(body)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+    return ChatCompletionsHandler
+
+
+def make_server(host='127.0.0.1', port=8001, **options):
+    """Creates (but does not start) a stub server; port 0 picks a free port."""
+    return ThreadingHTTPServer((host, port), make_handler(StubState(**options)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before answering')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='Seconds between streamed tokens')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='Answer every Nth request with HTTP 429')
+    parser.add_argument('--reply', default=DEFAULT_REPLY)
+    parser.add_argument('--specialist', default='General Physician')
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, latency=args.latency, token_delay=args.token_delay,
+                         reply=args.reply, specialist=args.specialist, rate_limit_every=args.rate_limit_every)
+    print(f"--- Stub chat-completions API on http://{args.host}:{server.server_port}/v1 ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# --- Local Symptom -> Specialist Classifier ---
+# A small TF-IDF model over character n-grams, so misspellings like "hedache"
+# still match. It covers the specialties shown on the doctors page. The app
+# loads a pre-fitted copy through model_store; scikit-learn is only imported
+# when a classifier is built. Low-confidence predictions are left to the LLM.
+
+SPECIALISTS = [
+    'Cardiologist', 'Dermatologist', 'ENT Specialist', 'General Physician', 'Gynecologist',
+    'Neurologist', 'Ophthalmologist', 'Orthopedic', 'Pediatrician', 'Psychiatrist',
+]
+
+TRAINING_DATA = [
+    # Cardiologist
+    ("chest pain", 'Cardiologist'),
+    ("chest pain radiating to left arm", 'Cardiologist'),
+    ("tightness in chest when climbing stairs", 'Cardiologist'),
+    ("heart palpitations and racing heartbeat", 'Cardiologist'),
+    ("irregular heartbeat", 'Cardiologist'),
+    ("high blood pressure and chest discomfort", 'Cardiologist'),
+    ("shortness of breath on exertion and swollen ankles", 'Cardiologist'),
+    ("fluttering in chest and fainting", 'Cardiologist'),
+    ("angina", 'Cardiologist'),
+    ("heart attack symptoms pressure in chest sweating", 'Cardiologist'),
+    ("hypertension", 'Cardiologist'),
+    ("slow heart rate and dizziness", 'Cardiologist'),
+    # Dermatologist
+    ("skin rash", 'Dermatologist'),
+    ("itchy red rash on arms", 'Dermatologist'),
+    ("acne and pimples on face", 'Dermatologist'),
+    ("dry flaky skin and eczema", 'Dermatologist'),
+    ("hair loss and dandruff", 'Dermatologist'),
+    ("mole changing shape and color", 'Dermatologist'),
+    ("psoriasis patches on elbows", 'Dermatologist'),
+    ("hives and skin allergy", 'Dermatologist'),
+    ("fungal infection between toes", 'Dermatologist'),
+    ("brittle nails and nail discoloration", 'Dermatologist'),
+    ("blisters and peeling skin", 'Dermatologist'),
+    ("dark spots and pigmentation on skin", 'Dermatologist'),
+    # ENT Specialist
+    ("ear pain", 'ENT Specialist'),
+    ("ringing in ears and hearing loss", 'ENT Specialist'),
+    ("sore throat and difficulty swallowing", 'ENT Specialist'),
+    ("blocked nose and sinus pressure", 'ENT Specialist'),
+    ("frequent nosebleeds", 'ENT Specialist'),
+    ("tonsillitis and swollen tonsils", 'ENT Specialist'),
+    ("hoarse voice for weeks", 'ENT Specialist'),
+    ("ear discharge and itching in ear", 'ENT Specialist'),
+    ("snoring and nasal congestion", 'ENT Specialist'),
+    ("sinusitis", 'ENT Specialist'),
+    ("tinnitus", 'ENT Specialist'),
+    ("vertigo when turning head and ear fullness", 'ENT Specialist'),
+    # General Physician
+    ("fever", 'General Physician'),
+    ("fever and body ache", 'General Physician'),
+    ("cold and cough", 'General Physician'),
+    ("flu symptoms chills and fatigue", 'General Physician'),
+    ("feeling tired and weak", 'General Physician'),
+    ("stomach ache and diarrhea", 'General Physician'),
+    ("vomiting and nausea", 'General Physician'),
+    ("mild headache and runny nose", 'General Physician'),
+    ("loss of appetite and weight loss", 'General Physician'),
+    ("diabetes checkup high blood sugar", 'General Physician'),
+    ("general health checkup", 'General Physician'),
+    ("food poisoning", 'General Physician'),
+    # Gynecologist
+    ("irregular periods", 'Gynecologist'),
+    ("painful menstrual cramps", 'Gynecologist'),
+    ("missed period and pregnancy test positive", 'Gynecologist'),
+    ("heavy menstrual bleeding", 'Gynecologist'),
+    ("vaginal discharge and itching", 'Gynecologist'),
+    ("pelvic pain in women", 'Gynecologist'),
+    ("pcos symptoms", 'Gynecologist'),
+    ("pregnancy care and prenatal checkup", 'Gynecologist'),
+    ("menopause hot flashes", 'Gynecologist'),
+    ("breast lump", 'Gynecologist'),
+    ("spotting between periods", 'Gynecologist'),
+    ("infertility trying to conceive", 'Gynecologist'),
+    # Neurologist
+    ("severe headache", 'Neurologist'),
+    ("migraine with aura", 'Neurologist'),
+    ("seizures", 'Neurologist'),
+    ("numbness and tingling in hands", 'Neurologist'),
+    ("memory loss and confusion", 'Neurologist'),
+    ("tremors in hands", 'Neurologist'),
+    ("weakness on one side of body", 'Neurologist'),
+    ("frequent dizziness and loss of balance", 'Neurologist'),
+    ("slurred speech and facial drooping", 'Neurologist'),
+    ("nerve pain shooting down the leg", 'Neurologist'),
+    ("epilepsy", 'Neurologist'),
+    ("fainting spells and blackouts", 'Neurologist'),
+    # Ophthalmologist
+    ("blurred vision", 'Ophthalmologist'),
+    ("red itchy eyes", 'Ophthalmologist'),
+    ("eye pain and sensitivity to light", 'Ophthalmologist'),
+    ("watery eyes and eye infection", 'Ophthalmologist'),
+    ("difficulty reading small print", 'Ophthalmologist'),
+    ("floaters and flashes in vision", 'Ophthalmologist'),
+    ("cataract cloudy vision", 'Ophthalmologist'),
+    ("double vision", 'Ophthalmologist'),
+    ("dry eyes", 'Ophthalmologist'),
+    ("conjunctivitis pink eye", 'Ophthalmologist'),
+    ("night blindness", 'Ophthalmologist'),
+    ("swollen eyelid", 'Ophthalmologist'),
+    # Orthopedic
+    ("knee pain", 'Orthopedic'),
+    ("back pain", 'Orthopedic'),
+    ("lower back pain when bending", 'Orthopedic'),
+    ("joint pain and stiffness", 'Orthopedic'),
+    ("swollen ankle after fall", 'Orthopedic'),
+    ("possible broken bone", 'Orthopedic'),
+    ("fracture in wrist", 'Orthopedic'),
+    ("shoulder pain and limited movement", 'Orthopedic'),
+    ("neck pain and stiffness", 'Orthopedic'),
+    ("arthritis in hips", 'Orthopedic'),
+    ("sports injury ligament tear", 'Orthopedic'),
+    ("heel pain when walking", 'Orthopedic'),
+    # Pediatrician
+    ("my child has a fever", 'Pediatrician'),
+    ("baby not feeding well", 'Pediatrician'),
+    ("toddler with cough and cold", 'Pediatrician'),
+    ("infant vaccination", 'Pediatrician'),
+    ("newborn jaundice", 'Pediatrician'),
+    ("child rash and fever", 'Pediatrician'),
+    ("kid with ear infection", 'Pediatrician'),
+    ("baby diarrhea and vomiting", 'Pediatrician'),
+    ("child growth and development concerns", 'Pediatrician'),
+    ("my son has stomach pain", 'Pediatrician'),
+    ("my daughter keeps coughing at night", 'Pediatrician'),
+    ("infant crying constantly", 'Pediatrician'),
+    # Psychiatrist
+    ("anxiety and panic attacks", 'Psychiatrist'),
+    ("feeling depressed and hopeless", 'Psychiatrist'),
+    ("insomnia cannot sleep", 'Psychiatrist'),
+    ("mood swings", 'Psychiatrist'),
+    ("stress and overthinking", 'Psychiatrist'),
+    ("suicidal thoughts", 'Psychiatrist'),
+    ("hearing voices", 'Psychiatrist'),
+    ("obsessive thoughts and compulsive behaviour", 'Psychiatrist'),
+    ("loss of interest and low mood", 'Psychiatrist'),
+    ("addiction and alcohol dependence", 'Psychiatrist'),
+    ("trauma flashbacks and nightmares", 'Psychiatrist'),
+    ("attention problems and hyperactivity", 'Psychiatrist'),
+]
+
+
+class SymptomClassifier:
+    """Predicts a specialist from free-text symptoms, with a confidence score."""
+
+    def __init__(self, threshold=0.55):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import make_pipeline
+
+        self.threshold = threshold
+        self.model = make_pipeline(
+            TfidfVectorizer(analyzer='char_wb', ngram_range=(2, 5), sublinear_tf=True),
+            LogisticRegression(C=20, max_iter=1000),
+        )
+
+    def fit(self, texts, labels):
+        self.model.fit(texts, labels)
+        return self
+
+    def predict(self, symptoms):
+        """Returns (specialist, confidence) for a single symptoms string."""
+        probabilities = self.model.predict_proba([str(symptoms).lower()])[0]
+        best = probabilities.argmax()
+        return self.model.classes_[best], float(probabilities[best])
+
+    def classify(self, symptoms, threshold=None):
+        """Returns the specialist if the model is confident enough, otherwise None."""
+        specialist, confidence = self.predict(symptoms)
+        if confidence >= (self.threshold if threshold is None else threshold):
+            return specialist
+        return None
+
+
+def train_symptom_classifier(threshold=0.55, data=TRAINING_DATA):
+    texts, labels = zip(*data)
+    return SymptomClassifier(threshold=threshold).fit(list(texts), list(labels))
@@ -0,0 +1,51 @@
+from ai_cache import ResponseCache, make_cache_key, normalize_text
+from ai_models import diet_cache_key, symptom_cache_key
+
+
+def test_normalize_text_folds_case_punctuation_and_whitespace():
+    assert normalize_text('  Chest-pain,\tFEVER!! ') == 'chest pain fever'
+    assert normalize_text(None) == ''
+    assert normalize_text(38.5) == '38 5'
+
+
+def test_normalize_text_keeps_word_order_and_repeats():
+    assert normalize_text('chest pain, no fever') == 'chest pain no fever'
+    assert normalize_text('fever, no chest pain') == 'fever no chest pain'
+    assert normalize_text('pain pain') == 'pain pain'
+
+
+def test_symptom_keys_differ_when_meaning_differs():
+    assert symptom_cache_key('chest pain, no fever') != symptom_cache_key('fever, no chest pain')
+    assert symptom_cache_key('Chest pain, no fever.') == symptom_cache_key('chest   pain no FEVER')
+
+
+def test_diet_keys_keep_disease_word_order():
+    assert diet_cache_key('type 2 diabetes', 'age 70') != diet_cache_key('2 type diabetes', 'age 70')
+    assert diet_cache_key('Type-2 Diabetes', 'Age: 70') == diet_cache_key('type 2 diabetes', 'age 70')
+
+
+def test_make_cache_key_separates_parts():
+    assert make_cache_key('diet', 'a b', 'c') != make_cache_key('diet', 'a', 'b c')
+
+
+def test_normalize_text_keeps_non_ascii_words():
+    assert normalize_text('सीने में दर्द!') == 'सीने में दर्द'
+    assert normalize_text('糖尿病，') == '糖尿病'
+    assert normalize_text('ＦＥＶＥＲ Straße') == 'fever strasse'
+
+
+def test_distinct_non_ascii_inputs_get_distinct_keys():
+    assert symptom_cache_key('सीने में दर्द') != symptom_cache_key('सिरदर्द')
+    assert symptom_cache_key('सीने') != symptom_cache_key('सने')
+    assert diet_cache_key('糖尿病', '') != diet_cache_key('高血压', '')
+
+
+def test_queries_that_normalize_to_nothing_are_not_cached():
+    assert symptom_cache_key('🤒🤕') is None
+    assert diet_cache_key('!!!', 'age 70') is None
+    assert diet_cache_key('diabetes', '🥗') is None
+    assert diet_cache_key('diabetes', '') is not None
+    cache = ResponseCache()
+    cache.set(None, {'diet': 'x'})
+    assert cache.get(None) is None
+    assert cache.get_stats()['size'] == 0
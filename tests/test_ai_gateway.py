@@ -0,0 +1,298 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from openai import APITimeoutError, AuthenticationError, InternalServerError, RateLimitError
+
+import ai_gateway
+from ai_gateway import AIGateway, CircuitBreaker, CircuitOpenError, DeadlineExceededError
+
+REQUEST = httpx.Request('POST', 'http://llm.test/chat/completions')
+MESSAGES = [{'role': 'user', 'content': 'hi'}]
+
+
+def status_error(cls, status, headers=None):
+    return cls('upstream said no', response=httpx.Response(status, request=REQUEST, headers=headers), body=None)
+
+
+def completion(text):
+    message = type('Message', (), {'content': text})()
+    return type('Completion', (), {'choices': [type('Choice', (), {'message': message})()]})()
+
+
+class ScriptedCompletions:
+    """Returns (or raises) each scripted outcome in turn and records the calls it gets."""
+
+    def __init__(self, *outcomes, gate=None):
+        self.outcomes = list(outcomes)
+        self.calls = []
+        self.gate = gate
+
+    def _next(self, kwargs):
+        self.calls.append(kwargs)
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return completion(outcome)
+
+    def create(self, **kwargs):
+        if self.gate is not None:
+            self.gate.wait(5)
+        return self._next(kwargs)
+
+
+class AsyncScriptedCompletions(ScriptedCompletions):
+    async def create(self, **kwargs):
+        if self.gate is not None:
+            await self.gate.wait()
+        return self._next(kwargs)
+
+
+def fake_client(completions):
+    client = type('Client', (), {})()
+    client.chat = type('Chat', (), {})()
+    client.chat.completions = completions
+    return client
+
+
+def gateway_with(completions, **options):
+    gateway = AIGateway('test-key', 'http://llm.test', **options)
+    gateway.client = fake_client(completions)
+    gateway._async_client = fake_client(completions)
+    return gateway
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records backoff delays instead of sleeping, on both the sync and async paths."""
+    delays = []
+    monkeypatch.setattr(ai_gateway.time, 'sleep', delays.append)
+
+    async def no_wait(delay):
+        delays.append(delay)
+    monkeypatch.setattr(ai_gateway.asyncio, 'sleep', no_wait)
+    return delays
+
+
+class FakeCompletions:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def create(self, **kwargs):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+class Chunk:
+    def __init__(self, text):
+        self.choices = [type('Choice', (), {'delta': type('Delta', (), {'content': text})()})()]
+
+
+class FakeStream:
+    def __init__(self, texts):
+        self.texts = texts
+        self.closed = False
+
+    def __iter__(self):
+        return iter(Chunk(text) for text in self.texts)
+
+    def close(self):
+        self.closed = True
+
+
+def half_open_gateway(outcome, **options):
+    gateway = AIGateway('test-key', 'http://llm.test', failure_threshold=1, reset_timeout=0, **options)
+    gateway.client = type('Client', (), {})()
+    gateway.client.chat = type('Chat', (), {})()
+    gateway.client.chat.completions = FakeCompletions(outcome)
+    gateway.breaker.record_failure()  # Open; reset_timeout=0 makes the next call the half-open trial
+    return gateway
+
+
+# --- CircuitBreaker ---
+def test_breaker_opens_after_threshold_and_admits_one_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    trial = breaker.allow()
+    assert trial and trial is not True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() is False
+
+
+def test_trial_success_closes_and_failure_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_unsettled_trial_reopens_instead_of_sticking_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    trial = breaker.allow()
+    breaker.settle(trial)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow()  # The next trial is admitted after the cool-down
+
+
+def test_settle_ignores_normal_calls_and_settled_trials():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.settle(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    trial = breaker.allow()
+    breaker.record_success()
+    breaker.settle(trial)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+# --- Gateway trial outcomes ---
+def test_client_error_during_trial_closes_the_breaker():
+    gateway = half_open_gateway(status_error(AuthenticationError, 401))
+    with pytest.raises(AuthenticationError):
+        gateway.chat('model', [{'role': 'user', 'content': 'hi'}])
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_server_error_during_trial_reopens_without_retrying():
+    gateway = half_open_gateway(status_error(InternalServerError, 500))
+    with pytest.raises(InternalServerError):
+        gateway.chat('model', [{'role': 'user', 'content': 'hi'}])
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+    assert gateway.stats['retries'] == 0
+
+
+def test_unexpected_error_during_trial_reopens():
+    gateway = half_open_gateway(TypeError('bad argument'))
+    with pytest.raises(TypeError):
+        gateway.chat('model', [{'role': 'user', 'content': 'hi'}])
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+
+
+def test_stream_closed_early_during_trial_settles_the_breaker():
+    stream = FakeStream(['a', 'b', 'c'])
+    gateway = half_open_gateway(stream)
+    deltas = gateway.stream('model', [{'role': 'user', 'content': 'hi'}])
+    assert next(deltas) == 'a'
+    deltas.close()
+    assert stream.closed
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_deadline_during_trial_records_a_failure():
+    gateway = half_open_gateway(FakeStream(['a', 'b']))
+    deltas = gateway.stream('model', [{'role': 'user', 'content': 'hi'}], deadline=-1)
+    with pytest.raises(DeadlineExceededError):
+        list(deltas)
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_breaker_rejects_calls():
+    gateway = half_open_gateway('unused')
+    gateway.breaker.reset_timeout = 60
+    gateway.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        gateway.chat('model', [{'role': 'user', 'content': 'hi'}])
+
+
+# --- Retries ---
+def test_rate_limit_and_server_errors_are_retried_with_growing_backoff(sleeps):
+    completions = ScriptedCompletions(status_error(RateLimitError, 429), status_error(InternalServerError, 503), 'ok')
+    gateway = gateway_with(completions, backoff_base=0.5)
+    assert gateway.chat('model', MESSAGES) == 'ok'
+    assert len(completions.calls) == 3
+    assert gateway.stats['retries'] == 2
+    assert 0.25 <= sleeps[0] <= 0.5 and 0.5 <= sleeps[1] <= 1.0  # base * 2**attempt, jittered down to half
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retry_after_header_sets_the_backoff(sleeps):
+    completions = ScriptedCompletions(status_error(RateLimitError, 429, {'retry-after': '2'}), 'ok')
+    gateway = gateway_with(completions, backoff_max=8.0)
+    assert gateway.chat('model', MESSAGES) == 'ok'
+    assert sleeps == [2.0]
+
+
+def test_retries_stop_after_max_retries(sleeps):
+    completions = ScriptedCompletions(status_error(InternalServerError, 500))
+    gateway = gateway_with(completions, max_retries=2)
+    with pytest.raises(InternalServerError):
+        gateway.chat('model', MESSAGES)
+    assert len(completions.calls) == 3
+    assert len(sleeps) == 2
+
+
+@pytest.mark.parametrize('completions_class, call', [
+    (ScriptedCompletions, lambda gateway: gateway.chat('model', MESSAGES)),
+    (AsyncScriptedCompletions, lambda gateway: asyncio.run(gateway.achat('model', MESSAGES))),
+])
+def test_per_attempt_timeouts_are_retried_on_both_paths(sleeps, completions_class, call):
+    completions = completions_class(APITimeoutError(REQUEST), 'ok')
+    gateway = gateway_with(completions, timeout=3.0)
+    assert call(gateway) == 'ok'
+    assert len(completions.calls) == 2
+    assert gateway.stats['retries'] == 1
+    assert all(0 < c['timeout'] <= 3.0 for c in completions.calls)
+
+
+def test_async_rate_limit_is_retried(sleeps):
+    completions = AsyncScriptedCompletions(status_error(RateLimitError, 429), 'ok')
+    gateway = gateway_with(completions)
+    assert asyncio.run(gateway.achat('model', MESSAGES)) == 'ok'
+    assert len(completions.calls) == 2
+    assert len(sleeps) == 1
+
+
+# --- Coalescing ---
+def test_identical_concurrent_calls_share_one_upstream_request():
+    gate = threading.Event()
+    completions = ScriptedCompletions('shared', gate=gate)
+    gateway = gateway_with(completions)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gateway.chat('model', MESSAGES))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for _ in range(500):
+        if gateway.stats['coalesced'] == 7:
+            break
+        threading.Event().wait(0.01)
+    gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ['shared'] * 8
+    assert len(completions.calls) == 1
+    assert gateway.stats['coalesced'] == 7
+
+
+def test_different_prompts_are_not_coalesced():
+    completions = ScriptedCompletions('a')
+    gateway = gateway_with(completions)
+    gateway.chat('model', MESSAGES)
+    gateway.chat('model', [{'role': 'user', 'content': 'other'}])
+    assert len(completions.calls) == 2
+
+
+def test_identical_concurrent_async_calls_share_one_upstream_request():
+    async def run():
+        completions = AsyncScriptedCompletions('shared', gate=asyncio.Event())
+        gateway = gateway_with(completions)
+        calls = asyncio.gather(*(gateway.achat('model', MESSAGES) for _ in range(8)))
+        await asyncio.sleep(0)
+        completions.gate.set()
+        return await calls, completions, gateway
+
+    results, completions, gateway = asyncio.run(run())
+    assert results == ['shared'] * 8
+    assert len(completions.calls) == 1
+    assert gateway.stats['coalesced'] == 7
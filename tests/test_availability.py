@@ -0,0 +1,32 @@
+import pytest
+
+from availability import MAX_AVAILABILITY_DAYS, parse_availability_request
+
+
+def test_parse_availability_request_defaults_to_one_day():
+    assert parse_availability_request({'doctorNames': ['Dr A'], 'startDate': '2025-03-03'}) == \
+        (['Dr A'], None, '2025-03-03', '2025-03-03')
+
+
+def test_parse_availability_request_day_count():
+    _, domain, start, end = parse_availability_request({'domain': 'Cardiology', 'startDate': '2025-03-03', 'days': 7})
+    assert (domain, start, end) == ('Cardiology', '2025-03-03', '2025-03-09')
+
+
+@pytest.mark.parametrize('body', [
+    [],
+    {'doctorNames': 'Dr A', 'startDate': '2025-03-03'},
+    {'doctorNames': ['Dr A', 3], 'startDate': '2025-03-03'},
+    {'domain': ['Cardiology'], 'startDate': '2025-03-03'},
+    {'doctorNames': ['Dr A'], 'startDate': 20250303},
+    {'doctorNames': ['Dr A'], 'startDate': '03/03/2025'},
+    {'doctorNames': ['Dr A']},
+    {'doctorNames': ['Dr A'], 'startDate': '2025-03-03', 'endDate': 5},
+    {'doctorNames': ['Dr A'], 'startDate': '2025-03-03', 'days': '7'},
+    {'doctorNames': ['Dr A'], 'startDate': '2025-03-03', 'days': True},
+    {'doctorNames': ['Dr A'], 'startDate': '2025-03-03', 'days': 0},
+    {'doctorNames': ['Dr A'], 'startDate': '2025-03-03', 'days': MAX_AVAILABILITY_DAYS + 1},
+])
+def test_parse_availability_request_rejects_bad_input(body):
+    with pytest.raises(ValueError):
+        parse_availability_request(body)
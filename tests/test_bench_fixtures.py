@@ -0,0 +1,24 @@
+import mongomock
+import pytest
+
+from benchmarks.fixtures import seed
+
+
+def test_seed_refuses_a_database_not_named_for_benchmarking():
+    db = mongomock.MongoClient().medismart_db
+    db.users.insert_one({'email': 'real@patient.example'})
+    with pytest.raises(ValueError):
+        seed(db, patients=2, doctors=1, appointments=2, days=1)
+    assert db.users.count_documents({}) == 1
+
+
+def test_seed_wipes_a_bench_database_or_a_forced_one():
+    bench = mongomock.MongoClient().medismart_bench
+    bench.users.insert_one({'email': 'stale@bench.local'})
+    ctx = seed(bench, patients=2, doctors=1, appointments=2, days=1)
+    assert len(ctx['patients']) == 2
+    assert bench.users.count_documents({'email': 'stale@bench.local'}) == 0
+
+    other = mongomock.MongoClient().scratch
+    seed(other, patients=2, doctors=1, appointments=2, days=1, force_wipe=True)
+    assert other.users.count_documents({}) == 3
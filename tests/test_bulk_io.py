@@ -0,0 +1,72 @@
+import csv
+import io
+
+import mongomock
+import pytest
+from pymongo.errors import AutoReconnect
+
+import bulk_io
+from slot_ledger import SlotLedger
+
+HEADER = 'doctorName,date,time,patientName\n'
+
+
+def upload(*lines):
+    return bulk_io.read_rows(io.BytesIO((HEADER + ''.join(lines)).encode('utf-8')), 'csv')
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+def test_import_appointments_claims_slots_and_reports_duplicates(db):
+    ledger = SlotLedger(db.slot_ledger)
+    report = bulk_io.import_appointments(db.appointments, ledger, upload(
+        'Dr A,2025-03-03,09:00,Ann\n', 'Dr A,2025-03-03,09:00,Ben\n', 'Dr A,2025-03-03,9am,Cat\n'))
+    assert (report.received, report.written, report.failed) == (3, 1, 2)
+    assert sorted(error['row'] for error in report.errors) == [2, 3]
+    assert ledger.booked_times('Dr A', '2025-03-03') == {'09:00'}
+
+
+def test_failed_batch_releases_its_claims(db, monkeypatch):
+    ledger = SlotLedger(db.slot_ledger)
+
+    def lose_connection(*args, **kwargs):
+        raise AutoReconnect('connection lost')
+
+    monkeypatch.setattr(db.appointments, 'insert_many', lose_connection)
+    with pytest.raises(AutoReconnect):
+        bulk_io.import_appointments(db.appointments, ledger, upload('Dr A,2025-03-03,09:00,Ann\n',
+                                                                    'Dr A,2025-03-03,10:00,Ben\n'))
+    assert ledger.booked_times('Dr A', '2025-03-03') == set()
+
+
+def test_unreadable_upload_keeps_the_rows_before_it(db):
+    report = bulk_io.ImportReport()
+    with pytest.raises(csv.Error):
+        bulk_io.import_appointments(db.appointments, SlotLedger(db.slot_ledger),
+                                    upload('Dr A,2025-03-03,09:00,Ann\n', 'Dr A,2025-03-03,10:00,' + 'x' * 200000 + '\n'),
+                                    batch_size=10, report=report)
+    assert (report.received, report.written) == (1, 1)
+    assert db.appointments.count_documents({}) == 1
+
+
+def test_validate_doctor_accepts_appointment_types_from_csv_or_ndjson():
+    row = {'name': 'Dr A', 'domain': 'Cardiologist'}
+    assert bulk_io.validate_doctor({**row, 'appointmentTypes': 'Offline; Online'})['appointmentTypes'] == \
+        ['Online', 'Offline']
+    assert bulk_io.validate_doctor({**row, 'appointmentTypes': ['Online']})['appointmentTypes'] == ['Online']
+    assert 'appointmentTypes' not in bulk_io.validate_doctor(row)
+    for bad in ('Online;Video', ['online'], 'Home', 5):
+        with pytest.raises(ValueError):
+            bulk_io.validate_doctor({**row, 'appointmentTypes': bad})
+
+
+def test_doctor_appointment_types_round_trip_through_csv(db):
+    rows = bulk_io.read_rows(io.BytesIO(b'name,domain,appointmentTypes\nDr A,Cardiologist,Online\n'), 'csv')
+    assert bulk_io.import_doctors(db.doctors, rows).written == 1
+    assert db.doctors.find_one()['appointmentTypes'] == ['Online']
+    lines = list(bulk_io.export_lines(bulk_io.export_cursor(db.doctors, 'doctors'), bulk_io.DOCTOR_FIELDS, 'csv'))
+    exported = next(csv.DictReader(lines))
+    assert exported['appointmentTypes'] == 'Online'
@@ -0,0 +1,54 @@
+from datetime import datetime
+
+import pytest
+
+from change_feed import MODE_BUS, ChangeFeed, next_due, parse_time, parse_tz_offset
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('08:30', (8, 30)), ('0:00', (0, 0)), ('23:59', (23, 59)), ('07:05:00', (7, 5)),
+])
+def test_parse_time_accepts_times_of_day(value, expected):
+    assert parse_time(value) == expected
+
+
+@pytest.mark.parametrize('value', ['24:00', '25:00', '12:75', '-1:30', '12', 'noon', '', None])
+def test_parse_time_rejects_out_of_range_and_malformed(value):
+    assert parse_time(value) is None
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('0', 0), ('-330', -330), ('840', 840), ('-840', -840), (0, 0),
+    ('841', None), ('99999999', None), ('-100000', None), ('1.5', None), ('abc', None), (None, None),
+])
+def test_parse_tz_offset_range_checks(value, expected):
+    assert parse_tz_offset(value) == expected
+
+
+def test_next_due_later_today():
+    assert next_due('18:00', 0, now=datetime(2025, 3, 1, 9, 0)) == datetime(2025, 3, 1, 18, 0)
+
+
+def test_next_due_rolls_over_to_tomorrow():
+    assert next_due('08:00', 0, now=datetime(2025, 3, 1, 9, 0)) == datetime(2025, 3, 2, 8, 0)
+    assert next_due('09:00', 0, now=datetime(2025, 3, 1, 9, 0)) == datetime(2025, 3, 2, 9, 0)
+
+
+def test_next_due_applies_the_browser_offset():
+    # UTC+5:30 reports an offset of -330: 08:00 local is 02:30 UTC
+    assert next_due('08:00', -330, now=datetime(2025, 3, 1, 0, 0)) == datetime(2025, 3, 1, 2, 30)
+    # UTC-5 reports 300: 23:00 local on 28 Feb is 04:00 UTC on 1 Mar
+    assert next_due('23:00', 300, now=datetime(2025, 3, 1, 3, 0)) == datetime(2025, 3, 1, 4, 0)
+
+
+@pytest.mark.parametrize('value', ['24:00', '25:00', '12:75', 'soon'])
+def test_next_due_returns_none_for_invalid_times(value):
+    assert next_due(value, 0, now=datetime(2025, 3, 1, 9, 0)) is None
+
+
+def test_stream_slots_are_capped_and_released():
+    feed = ChangeFeed(db=None, projections={}, mode=MODE_BUS, max_streams=2)
+    assert feed.open_stream() and feed.open_stream()
+    assert not feed.open_stream()
+    feed.close_stream()
+    assert feed.open_stream()
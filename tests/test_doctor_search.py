@@ -0,0 +1,82 @@
+import mongomock
+import pytest
+
+from doctor_search import DoctorIndex, DoctorSearch, backfill_filter_keys, filter_keys
+
+DOCTORS = [
+    {'_id': 1, 'name': 'Asha Rao', 'domain': 'Cardiologist', 'specialization': 'Heart failure',
+     'hospitalName': 'City Hospital', 'hospitalLocation': 'Mangaluru', 'appointmentTypes': ['Offline']},
+    {'_id': 2, 'name': 'Bina Shetty', 'domain': 'Dermatologist', 'specialization': 'Skin allergies',
+     'hospitalName': 'Sunrise Clinic', 'hospitalLocation': 'Udupi', 'appointmentTypes': ['Online', 'Offline']},
+    {'_id': 3, 'name': 'Chetan Kamath', 'domain': 'Cardiologist', 'specialization': 'Interventional cardiology',
+     'hospitalName': 'Care Point', 'hospitalLocation': 'Bengaluru'},
+    {'_id': 4, 'name': 'Deepa Cardoza', 'domain': 'General Physician', 'specialization': 'Family medicine',
+     'hospitalName': 'City Hospital', 'hospitalLocation': 'Mangaluru', 'appointmentTypes': ['Online']},
+]
+
+
+@pytest.fixture
+def index():
+    return DoctorIndex(DOCTORS, version=1)
+
+
+def test_empty_query_lists_everyone_in_name_order(index):
+    assert index.search() == ['1', '2', '3', '4']
+
+
+def test_name_hits_outrank_other_fields(index):
+    # "card" prefixes Cardoza (name), and Cardiologist/cardiology (domain, specialization)
+    assert index.search('card') == ['4', '1', '3']
+
+
+def test_every_query_word_must_match(index):
+    assert index.search('cardiologist mangaluru') == ['1']
+
+
+def test_typos_match_from_four_letters(index):
+    assert index.search('dermatolgist') == ['2']
+    assert index.search('udpi') == ['2']
+    assert index.search('xyz') == []
+
+
+def test_filters_ignore_case_punctuation_and_spacing(index):
+    assert index.search(filters={'domain': 'general-physician'}) == ['4']
+    assert index.search(filters={'location': '  MANGALURU '}) == ['1', '4']
+    assert index.search('asha', filters={'hospital': 'city hospital'}) == ['1']
+
+
+def test_appointment_type_treats_missing_types_as_both(index):
+    assert index.search(appointment_type='Online') == ['2', '3', '4']
+    assert index.search(appointment_type='Offline') == ['1', '2', '3']
+
+
+def test_with_doc_returns_a_new_index(index):
+    updated = index.with_doc({'_id': 5, 'name': 'Esha Nayak', 'domain': 'Cardiologist'}, version=2)
+    assert updated.search(filters={'domain': 'cardiologist'}) == ['1', '3', '5']
+    assert index.search(filters={'domain': 'cardiologist'}) == ['1', '3']
+
+
+def test_facets_keep_display_values(index):
+    assert index.facets()['domains'] == ['Cardiologist', 'Dermatologist', 'General Physician']
+
+
+def test_mongo_mode_filters_match_memory_mode():
+    db = mongomock.MongoClient().db
+    db.doctors.insert_many([{**doc, 'filterKeys': filter_keys(doc)} for doc in DOCTORS[:2]])
+    db.doctors.insert_many([dict(doc) for doc in DOCTORS[2:]])  # Written without keys
+    assert backfill_filter_keys(db.doctors) == 2
+    search = DoctorSearch(db.doctors, db.counters, mode='mongo')
+    page = search.search(filters={'domain': 'CARDIOLOGIST'})
+    assert [item['_id'] for item in page['items']] == ['1', '3']
+    assert search.search(filters={'domain': 'general-physician'})['total'] == 1
+
+
+def test_refresh_swaps_in_a_new_index_when_the_version_moves():
+    db = mongomock.MongoClient().db
+    db.doctors.insert_many([dict(doc) for doc in DOCTORS[:2]])
+    search = DoctorSearch(db.doctors, db.counters, check_interval=0)
+    first = search.index()
+    assert len(first.docs) == 2 and search.index() is first
+    db.doctors.insert_one(dict(DOCTORS[2]))
+    search.mark_changed()
+    assert len(search.index().docs) == 3 and search.index().version == 1
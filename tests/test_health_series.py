@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from health_series import (MAX_POINTS, bucket_id, build_series, get_series, parse_reading, parse_series_args,
+                           record_reading, rebuild, window_count)
+
+
+def reading(user_id, metric, value, moment, record_id=None):
+    key, values = parse_reading(metric, value)
+    return {'_id': record_id, 'userId': user_id, 'metric': metric, 'value': value, 'date': moment,
+            'metricKey': key, 'values': values}
+
+
+@pytest.mark.parametrize('metric, value, expected', [
+    ('BP', '120/80 mmHg', ('blood_pressure', {'systolic': 120.0, 'diastolic': 80.0})),
+    ('Sugar Level', '110 mg/dL', ('blood_sugar', {'value': 110.0})),
+    ('Pulse', 72, ('heart_rate', {'value': 72.0})),
+    ('Steps walked', '4500', ('steps_walked', {'value': 4500.0})),
+    ('BP', 'high', None),
+    ('', '5', None),
+])
+def test_parse_reading(metric, value, expected):
+    assert parse_reading(metric, value) == expected
+
+
+@pytest.fixture
+def series():
+    return mongomock.MongoClient().db.health_series
+
+
+def test_readings_on_one_day_share_a_bucket(series):
+    record_reading(series, reading('u1', 'bp', '120/80', datetime(2025, 3, 3, 8, 15)))
+    record_reading(series, reading('u1', 'bp', '140/90', datetime(2025, 3, 3, 20, 45)))
+    record_reading(series, reading('u1', 'bp', '130/85', datetime(2025, 3, 4, 0, 0)))
+    record_reading(series, reading('u2', 'bp', '110/70', datetime(2025, 3, 3, 9, 0)))
+
+    bucket = series.find_one({'_id': bucket_id('u1', 'blood_pressure', datetime(2025, 3, 3))})
+    assert bucket['day'] == datetime(2025, 3, 3)
+    assert bucket['count'] == 2
+    assert bucket['summary']['systolic'] == {'sum': 260.0, 'n': 2, 'min': 120.0, 'max': 140.0}
+    assert bucket['summary']['diastolic'] == {'sum': 170.0, 'n': 2, 'min': 80.0, 'max': 90.0}
+    assert [r['t'] for r in bucket['readings']] == [datetime(2025, 3, 3, 8, 15), datetime(2025, 3, 3, 20, 45)]
+    assert series.count_documents({}) == 3
+
+
+def test_rebuild_matches_incremental_writes(series):
+    records = mongomock.MongoClient().db.health_records
+    docs = [reading('u1', 'pulse', 70 + i, datetime(2025, 3, 1 + i // 2, 9 + i), record_id=i) for i in range(6)]
+    records.insert_many(docs)
+    for doc in docs:
+        record_reading(series, doc)
+    incremental = {doc['_id']: (doc['count'], doc['summary']) for doc in series.find()}
+    rebuild(records, series)
+    assert {doc['_id']: (doc['count'], doc['summary']) for doc in series.find()} == incremental
+
+
+def test_build_series_averages_and_rolls_over_gaps():
+    rows = [
+        {'_id': datetime(2025, 3, 1), 'count': 2, 'value_sum': 140.0, 'value_n': 2, 'value_min': 60.0, 'value_max': 80.0},
+        {'_id': datetime(2025, 3, 2), 'count': 1, 'value_sum': 90.0, 'value_n': 1, 'value_min': 90.0, 'value_max': 90.0},
+        {'_id': datetime(2025, 3, 5), 'count': 1, 'value_sum': 100.0, 'value_n': 1, 'value_min': 100.0, 'value_max': 100.0},
+    ]
+    points = build_series(rows, 'heart_rate', 'day', rolling=2)
+    assert [p['value']['avg'] for p in points] == [70.0, 90.0, 100.0]
+    assert [p['value']['rollingAvg'] for p in points] == [70.0, 76.7, 100.0]  # 3 Mar-4 Mar are empty
+    assert points[0]['start'] == '2025-03-01T00:00:00'
+
+
+def test_parse_series_args_picks_a_window_for_the_range():
+    today = datetime(2025, 3, 31).date()
+    _, start, end, window, rolling = parse_series_args({'metric': 'bp'}, today=today)
+    assert (start, end, window, rolling) == (datetime(2025, 1, 1), datetime(2025, 4, 1), 'day', 7)
+    assert parse_series_args({'metric': 'bp', 'from': '2025-03-30'}, today=today)[3] == 'hour'
+    assert parse_series_args({'metric': 'bp', 'from': '2020-01-01'}, today=today)[3] == 'month'
+    with pytest.raises(ValueError):
+        parse_series_args({'metric': 'bp', 'from': '2025-01-01', 'window': 'hour'}, today=today)
+
+
+def test_parse_series_args_keeps_auto_ranges_within_max_points():
+    today = datetime(2025, 3, 31).date()
+    _, start, end, window, _ = parse_series_args({'metric': 'bp', 'from': '1900-01-01'}, today=today)
+    assert window == 'month'
+    assert start == datetime(2015, 4, 1)
+    assert window_count('month', start, end) == MAX_POINTS
+    with pytest.raises(ValueError):
+        parse_series_args({'metric': 'bp', 'from': '1900-01-01', 'window': 'month'}, today=today)
+
+
+def test_window_count_counts_calendar_windows():
+    assert window_count('day', datetime(2025, 3, 1), datetime(2025, 3, 8)) == 7
+    assert window_count('week', datetime(2025, 3, 2), datetime(2025, 3, 4)) == 2  # Sunday, then Monday
+    assert window_count('month', datetime(2025, 1, 31), datetime(2025, 3, 2)) == 3
+    assert window_count('hour', datetime(2025, 3, 1), datetime(2025, 3, 1, 5)) == 5
+
+
+@pytest.mark.parametrize('rolling', ['-1', str(MAX_POINTS + 1), '99999999', 'x'])
+def test_parse_series_args_bounds_rolling(rolling):
+    with pytest.raises(ValueError):
+        parse_series_args({'metric': 'bp', 'rolling': rolling})
+
+
+def test_get_series_groups_day_buckets(series):
+    for hour, value in ((8, 70), (20, 80)):
+        record_reading(series, reading('u1', 'pulse', value, datetime(2025, 3, 3, hour)))
+    record_reading(series, reading('u1', 'pulse', 90, datetime(2025, 3, 4, 9)))
+    result = get_series(series, 'u1', 'heart_rate', datetime(2025, 3, 1), datetime(2025, 3, 8), 'day', rolling=0)
+    assert [(p['start'][:10], p['count'], p['value']['avg']) for p in result['points']] == [
+        ('2025-03-03', 2, 75.0), ('2025-03-04', 1, 90.0)]
+    assert result['summary']['value']['change'] == 15.0
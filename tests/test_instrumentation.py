@@ -0,0 +1,21 @@
+from types import SimpleNamespace
+
+from instrumentation import RequestProfiler
+
+
+def request(headers=None):
+    return SimpleNamespace(headers=headers or {})
+
+
+def test_profiling_refuses_to_enable_without_a_token():
+    profiler = RequestProfiler(enabled=True, token=None, sample_rate=1.0)
+    assert not profiler.enabled
+    assert not profiler.wanted(request({'X-Profile': 'anything'}))
+    assert not profiler.wanted(request())
+
+
+def test_profile_header_must_carry_the_token():
+    profiler = RequestProfiler(enabled=True, token='s3cret')
+    assert profiler.wanted(request({'X-Profile': 's3cret'}))
+    assert not profiler.wanted(request({'X-Profile': 'guess'}))
+    assert not profiler.wanted(request())
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JobQueue
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(mongomock.MongoClient().db.jobs, max_attempts=2, backoff_base=0.01, backoff_max=0.01)
+    queue.calls = []
+
+    @queue.register('echo')
+    def echo(payload):
+        queue.calls.append(payload)
+
+    @queue.register('boom')
+    def boom(payload):
+        raise RuntimeError('smtp down')
+
+    return queue
+
+
+def make_due(queue, job_id):
+    queue.collection.update_one({'_id': job_id}, {'$set': {'runAt': datetime.utcnow() - timedelta(seconds=1)}})
+
+
+def test_enqueued_job_runs_once_and_is_done(queue):
+    job_id = queue.enqueue('echo', {'n': 1}, owner_id='u1')
+    assert queue.run_pending()
+    assert not queue.run_pending()
+    assert queue.calls == [{'n': 1}]
+    job = queue.get(job_id)
+    assert (job['status'], job['attempts'], job['ownerId']) == (JOB_DONE, 1, 'u1')
+
+
+def test_enqueue_rejects_unknown_job_types(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue('unknown', {})
+
+
+def test_failures_back_off_then_fail_permanently(queue):
+    job_id = queue.enqueue('boom', {})
+    assert queue.run_pending()
+    job = queue.get(job_id)
+    assert (job['status'], job['lastError']) == (JOB_QUEUED, 'smtp down')
+    assert job['runAt'] >= job['updatedAt']  # Retried after a backoff delay
+    make_due(queue, job['_id'])
+    assert queue.run_pending()
+    assert queue.get(job_id)['status'] == JOB_FAILED
+
+
+def test_stale_running_jobs_are_requeued(queue):
+    job_id = queue.enqueue('echo', {})
+    job = queue.claim('worker-1')
+    assert job['status'] == JOB_RUNNING
+    queue.collection.update_one({'_id': job['_id']}, {'$set': {'lockedAt': datetime.utcnow() - timedelta(hours=1)}})
+    assert queue.requeue_stale() == 1
+    assert queue.get(job_id)['status'] == JOB_QUEUED
+
+
+def test_recurring_jobs_are_unique_and_rescheduled(queue):
+    job_id = queue.schedule_recurring('echo', 3600)
+    assert queue.schedule_recurring('echo', 3600) == job_id
+    assert queue.collection.count_documents({}) == 1
+    assert queue.run_pending()
+    job = queue.collection.find_one({'_id': job_id})
+    assert job['status'] == JOB_QUEUED
+    assert job['runAt'] > datetime.utcnow() + timedelta(minutes=59)
@@ -0,0 +1,24 @@
+from model_store import data_fingerprint, load_artifact, load_or_fit
+
+
+def test_data_fingerprint_tracks_the_rows():
+    rows = [('chest pain', 'Cardiologist'), ('rash', 'Dermatologist')]
+    assert data_fingerprint(rows) == data_fingerprint([list(row) for row in rows])
+    assert data_fingerprint(rows) != data_fingerprint(rows + [('cough', 'General Physician')])
+
+
+def test_load_or_fit_reuses_an_artifact_with_the_same_fingerprint(tmp_path):
+    fits = []
+    fit = lambda: fits.append(1) or {'fit': len(fits)}
+    assert load_or_fit('model', fit, str(tmp_path), fingerprint='a') == {'fit': 1}
+    assert load_or_fit('model', fit, str(tmp_path), fingerprint='a') == {'fit': 1}
+    assert len(fits) == 1
+
+
+def test_load_or_fit_refits_when_the_training_data_changed(tmp_path):
+    fits = []
+    fit = lambda: fits.append(1) or {'fit': len(fits)}
+    load_or_fit('model', fit, str(tmp_path), fingerprint='a')
+    assert load_or_fit('model', fit, str(tmp_path), fingerprint='b') == {'fit': 2}
+    assert load_artifact('model', str(tmp_path))['fingerprint'] == 'b'
+    assert load_or_fit('model', fit, str(tmp_path), fingerprint='b') == {'fit': 2}
@@ -0,0 +1,62 @@
+import mongomock
+import pytest
+
+from pagination import decode_cursor, encode_cursor, keyset_filter
+
+
+def walk(collection, sort, page_size):
+    """Pages through the collection with keyset filters, returning the _ids in order."""
+    seen, query = [], {}
+    while True:
+        page = list(collection.find(query).sort(sort).limit(page_size))
+        seen += [doc['_id'] for doc in page]
+        if len(page) < page_size:
+            return seen
+        query = keyset_filter(sort, decode_cursor(encode_cursor(page[-1], sort), sort))
+
+
+@pytest.fixture
+def appointments():
+    collection = mongomock.MongoClient().db.appointments
+    collection.insert_many([
+        {'_id': 1, 'date': '2025-03-03', 'time': '09:00'},
+        {'_id': 2, 'date': '2025-03-03', 'time': '09:00'},  # Ties with 1 on date and time
+        {'_id': 3, 'date': '2025-03-03', 'time': '10:00'},
+        {'_id': 4, 'date': '2025-03-04', 'time': None},
+        {'_id': 5, 'date': '2025-03-04'},  # Missing time
+        {'_id': 6, 'date': None, 'time': '09:00'},
+        {'_id': 7, 'time': '11:00'},  # Missing date
+        {'_id': 8, 'date': '2025-03-05', 'time': '09:30'},
+    ])
+    return collection
+
+
+@pytest.mark.parametrize('sort', [
+    [('date', 1), ('time', 1), ('_id', 1)],
+    [('date', -1), ('_id', -1)],
+    [('date', 1), ('time', -1), ('_id', 1)],
+])
+@pytest.mark.parametrize('page_size', [1, 2, 3])
+def test_keyset_pages_visit_every_document_once_in_sort_order(appointments, sort, page_size):
+    expected = [doc['_id'] for doc in appointments.find().sort(sort)]
+    assert walk(appointments, sort, page_size) == expected
+
+
+def test_keyset_filter_after_a_null_ascending_key_matches_non_null_values():
+    sort = [('date', 1), ('_id', 1)]
+    assert keyset_filter(sort, [None, 6]) == {'$or': [{'date': {'$ne': None}}, {'date': None, '_id': {'$gt': 6}}]}
+
+
+def test_keyset_filter_after_a_null_descending_key_only_breaks_ties():
+    sort = [('date', -1), ('_id', -1)]
+    assert keyset_filter(sort, [None, 7]) == {'$or': [{'date': None, '$or': [{'_id': {'$lt': 7}}, {'_id': None}]}]}
+
+
+def test_keyset_filter_descending_includes_nulls_after_values():
+    assert keyset_filter([('date', -1)], ['2025-03-04']) == {'$or': [{'$or': [{'date': {'$lt': '2025-03-04'}},
+                                                                               {'date': None}]}]}
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor', [('_id', 1)])
@@ -0,0 +1,67 @@
+import re
+import zlib
+
+import pytest
+
+from pdf_renderer import ConfirmationRenderer, confirmation_filename
+
+APPOINTMENTS = [
+    {'_id': 'a1', 'patientName': 'Ann Rao', 'doctorName': 'Mehta', 'date': '2025-03-03', 'time': '09:00',
+     'appointmentType': 'Offline', 'hospitalName': 'City Hospital', 'hospitalLocation': 'Mangaluru'},
+    {'_id': 'a2', 'patientName': 'Ben Shah', 'doctorName': 'Iyer', 'date': '2025-03-04', 'time': '10:30',
+     'appointmentType': 'Online'},
+]
+
+
+def page_count(pdf):
+    return len(re.findall(rb'/Type /Page\b(?!s)', pdf))
+
+
+def page_text(pdf):
+    """The decompressed content streams, where the drawn text and paths live."""
+    streams = re.findall(rb'/Filter /FlateDecode[^>]*>>\s*stream\r?\n(.*?)\r?\nendstream', pdf, re.S)
+    return b''.join(zlib.decompress(stream) for stream in streams)
+
+
+def without_creation_date(pdf):
+    return re.sub(rb'/CreationDate \(D:\d+\)', b'', pdf)
+
+
+@pytest.fixture
+def renderer():
+    return ConfirmationRenderer()
+
+
+def test_render_produces_a_one_page_pdf_with_the_details(renderer):
+    pdf = renderer.render(APPOINTMENTS[0])
+    assert pdf.startswith(b'%PDF-')
+    assert pdf.rstrip().endswith(b'%%EOF')
+    assert page_count(pdf) == 1
+    text = page_text(pdf)
+    for value in (b'MediSmart AI', b'Ann Rao', b'Dr. Mehta', b'09:00', b'City Hospital, Mangaluru'):
+        assert value in text
+    assert b' c\n' in text  # The rounded box corners are Bezier curves
+
+
+def test_online_appointments_have_no_location(renderer):
+    text = page_text(renderer.render(APPOINTMENTS[1]))
+    assert b'Ben Shah' in text
+    assert b'Location:' not in text
+
+
+def test_renders_do_not_leak_into_the_cached_template(renderer):
+    renderer.render(APPOINTMENTS[0])
+    text = page_text(renderer.render(APPOINTMENTS[1]))
+    assert b'Ann Rao' not in text
+    assert page_count(renderer.render(APPOINTMENTS[1])) == 1
+
+
+def test_render_many_matches_separate_renders(renderer):
+    batch = renderer.render_many(APPOINTMENTS)
+    assert [appointment for appointment, _ in batch] == APPOINTMENTS
+    for appointment, pdf in batch:
+        assert without_creation_date(pdf) == without_creation_date(renderer.render(appointment))
+
+
+def test_confirmation_filename():
+    assert confirmation_filename(APPOINTMENTS[0]) == 'appointment_a1.pdf'
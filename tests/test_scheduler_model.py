@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import mongomock
+
+from scheduler_model import SLOT_INDEX, iter_doctor_days, load_cancellation_counts, weekday_of
+
+
+def booking(doctor, day, time):
+    return {'doctorName': doctor, 'date': day, 'time': time}
+
+
+def test_iter_doctor_days_includes_unbooked_working_days():
+    appointments = mongomock.MongoClient().db.appointments
+    # Dr A works Mondays and Wednesdays; 2025-03-05 (Wed) and 2025-03-10 (Mon) had no bookings.
+    appointments.insert_many([
+        booking('Dr A', '2025-03-03', '09:00'),
+        booking('Dr A', '2025-03-03', '10:30'),
+        booking('Dr A', '2025-03-12', '11:00'),
+        booking('Dr B', '2025-03-04', '09:00'),
+        booking('Dr A', '2025-03-17', '09:00'),  # On the cutoff: excluded
+    ])
+    days = [(doctor, day, int(mask.sum())) for doctor, day, mask in iter_doctor_days(appointments, '2025-03-17')]
+    assert days == [
+        ('Dr A', '2025-03-03', 2),
+        ('Dr A', '2025-03-05', 0),
+        ('Dr A', '2025-03-10', 0),
+        ('Dr A', '2025-03-12', 1),
+        ('Dr B', '2025-03-04', 1),
+    ]
+
+
+def test_cancellation_counts_stop_at_the_cutoff():
+    cancellations = mongomock.MongoClient().db.appointment_cancellations
+    cancellations.insert_many([
+        {**booking('Dr A', '2025-03-03', '09:00'), 'cancelledAt': datetime(2025, 3, 1)},
+        {**booking('Dr A', '2025-03-03', '09:00')},
+        {**booking('Dr A', '2025-03-03', '09:00'), 'cancelledAt': datetime(2025, 3, 20)},
+        {**booking('Dr A', '2025-03-24', '09:00'), 'cancelledAt': datetime(2025, 3, 2)},
+    ])
+    counts = load_cancellation_counts(cancellations, '2025-03-17')
+    assert counts['Dr A'][weekday_of('2025-03-03'), SLOT_INDEX['09:00']] == 2
+    assert counts['Dr A'].sum() == 2
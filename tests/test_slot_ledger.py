@@ -0,0 +1,85 @@
+import mongomock
+import pytest
+
+from slot_ledger import LEDGER_FORMAT, SlotLedger, SlotTakenError, ledger_id
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def ledger(db):
+    return SlotLedger(db.slot_ledger)
+
+
+def test_claim_reserves_a_free_slot(ledger):
+    ledger.claim('Dr A', '2025-03-03', '09:00', 'appt-1')
+    ledger.claim('Dr A', '2025-03-03', '10:30', 'appt-2')
+    assert ledger.booked_times('Dr A', '2025-03-03') == {'09:00', '10:30'}
+    doc = ledger.collection.find_one({'_id': ledger_id('Dr A', '2025-03-03')})
+    assert doc['slots'] == {'09:00': 'appt-1', '10:30': 'appt-2'}
+
+
+def test_claim_refuses_a_held_slot(ledger):
+    ledger.claim('Dr A', '2025-03-03', '09:00', 'appt-1')
+    with pytest.raises(SlotTakenError):
+        ledger.claim('Dr A', '2025-03-03', '09:00', 'appt-2')
+    assert ledger.collection.find_one()['slots'] == {'09:00': 'appt-1'}
+
+
+def test_same_time_for_other_doctors_and_days_is_free(ledger):
+    ledger.claim('Dr A', '2025-03-03', '09:00', 'appt-1')
+    ledger.claim('Dr B', '2025-03-03', '09:00', 'appt-2')
+    ledger.claim('Dr A', '2025-03-04', '09:00', 'appt-3')
+    assert ledger.collection.count_documents({}) == 3
+
+
+@pytest.mark.parametrize('doctor, day, time', [
+    ('', '2025-03-03', '09:00'), ('Dr A', '03/03/2025', '09:00'), ('Dr A', '2025-03-03', '9am'),
+    ('Dr A', '2025-03-03', '24:00'), ('Dr A', '2025-03-03', '$set'), ('Dr A', '2025-03-03', None),
+])
+def test_claim_validates_before_writing(ledger, doctor, day, time):
+    with pytest.raises(ValueError):
+        ledger.claim(doctor, day, time, 'appt-1')
+    assert ledger.collection.count_documents({}) == 0
+
+
+def test_release_only_frees_the_holders_slot(ledger):
+    ledger.claim('Dr A', '2025-03-03', '09:00', 'appt-1')
+    assert not ledger.release('Dr A', '2025-03-03', '09:00', 'appt-2')
+    assert ledger.release('Dr A', '2025-03-03', '09:00', 'appt-1')
+    ledger.claim('Dr A', '2025-03-03', '09:00', 'appt-2')
+
+
+def test_ledger_ids_cannot_collide():
+    assert ledger_id('A|2025-03-03', '2025-03-04') != ledger_id('A', '2025-03-03|2025-03-04')
+
+
+def test_rebuild_reconciles_both_ways(db, ledger):
+    db.appointments.insert_many([
+        {'_id': 'appt-1', 'doctorName': 'Dr A', 'date': '2025-03-03', 'time': '09:00'},
+        {'_id': 'appt-2', 'doctorName': 'Dr A', 'date': '2025-03-03', 'time': '10:00'},
+        {'_id': 'appt-3', 'doctorName': 'Dr B', 'date': '2025-03-04', 'time': '11:00'},
+        {'_id': 'legacy', 'doctorName': 'Dr B', 'date': 'someday', 'time': '11:00'},
+    ])
+    ledger.claim('Dr A', '2025-03-03', '09:00', 'appt-1')
+    ledger.claim('Dr A', '2025-03-03', '15:00', 'cancelled')  # Appointment no longer exists
+    ledger.claim('Dr C', '2025-03-05', '09:00', 'gone')  # Whole day is stale
+    db.slot_ledger.insert_one({'_id': 'Dr B|2025-03-04', 'doctorName': 'Dr B', 'date': '2025-03-04',
+                               'slots': {'11:00': 'appt-3'}})  # Old id format
+
+    assert ledger.rebuild(db.appointments, batch_size=1) == (3, 2)
+    assert {doc['_id']: doc['slots'] for doc in db.slot_ledger.find()} == {
+        ledger_id('Dr A', '2025-03-03'): {'09:00': 'appt-1', '10:00': 'appt-2'},
+        ledger_id('Dr B', '2025-03-04'): {'11:00': 'appt-3'},
+    }
+
+
+def test_ensure_current_rebuilds_once(db, ledger):
+    db.appointments.insert_one({'_id': 'appt-1', 'doctorName': 'Dr A', 'date': '2025-03-03', 'time': '09:00'})
+    assert ledger.ensure_current(db.appointments, db.counters)
+    assert db.counters.find_one({'_id': 'slot_ledger_format'})['format'] == LEDGER_FORMAT
+    assert not ledger.ensure_current(db.appointments, db.counters)
+    assert ledger.booked_times('Dr A', '2025-03-03') == {'09:00'}
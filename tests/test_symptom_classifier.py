@@ -0,0 +1,28 @@
+import pytest
+
+from symptom_classifier import SPECIALISTS, TRAINING_DATA, train_symptom_classifier
+
+
+@pytest.fixture(scope='module')
+def classifier():
+    return train_symptom_classifier()
+
+
+def test_training_data_covers_every_specialist():
+    assert {label for _, label in TRAINING_DATA} == set(SPECIALISTS)
+
+
+@pytest.mark.parametrize('symptoms, specialist', [
+    ('chest pain when climbing stairs', 'Cardiologist'),
+    ('itchy red rash on my arms', 'Dermatologist'),
+    ('EAR PAIN', 'ENT Specialist'),
+    ('severe hedache and dizzyness', 'Neurologist'),  # Character n-grams absorb misspellings
+])
+def test_confident_predictions(classifier, symptoms, specialist):
+    assert classifier.classify(symptoms) == specialist
+
+
+def test_low_confidence_is_left_to_the_llm(classifier):
+    specialist, confidence = classifier.predict('chest pain')
+    assert classifier.classify('chest pain', threshold=min(confidence + 0.01, 1.01)) is None
+    assert classifier.classify('chest pain', threshold=confidence) == specialist
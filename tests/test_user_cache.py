@@ -0,0 +1,61 @@
+import time
+from types import SimpleNamespace
+
+import mongomock
+
+from user_cache import UserCache
+
+
+def user(user_id='u1', role='Patient'):
+    return SimpleNamespace(id=user_id, email=f'{user_id}@example.com', name=user_id, role=role)
+
+
+def test_invalidate_drops_the_local_entry_and_older_snapshots():
+    cache = UserCache(sync_interval=0)
+    cache.put(user())
+    snapshot = cache.make_snapshot(user())
+    snapshot['iat'] -= 1
+    cache.invalidate('u1')
+    assert cache.get('u1') is None
+    assert cache.read_snapshot(snapshot, 'u1') is None
+    assert cache.read_snapshot(cache.make_snapshot(user()), 'u1') is not None
+
+
+def test_invalidations_reach_other_processes_through_the_store():
+    store = mongomock.MongoClient().db.user_invalidations
+    here, there = UserCache(sync_interval=0), UserCache(sync_interval=0)
+    here.attach_store(store)
+    there.attach_store(store)
+    there.put(user())
+    old_snapshot = {**there.make_snapshot(user()), 'iat': time.time() - 1}
+
+    here.invalidate('u1')
+    assert there.get('u1') is not None  # Not synced yet
+    there.sync()
+    assert there.get('u1') is None
+    assert there.read_snapshot(old_snapshot, 'u1') is None
+
+
+def test_a_new_process_sees_earlier_invalidations():
+    store = mongomock.MongoClient().db.user_invalidations
+    writer = UserCache()
+    writer.attach_store(store)
+    old_snapshot = {**writer.make_snapshot(user()), 'iat': time.time() - 1}
+    writer.invalidate('u1')
+
+    started_later = UserCache()
+    started_later.attach_store(store)
+    started_later.sync()
+    assert started_later.read_snapshot(old_snapshot, 'u1') is None
+
+
+def test_sync_is_rate_limited():
+    store = mongomock.MongoClient().db.user_invalidations
+    writer, reader = UserCache(), UserCache(sync_interval=60)
+    writer.attach_store(store)
+    reader.attach_store(store)
+    reader.sync()
+    reader.put(user())
+    writer.invalidate('u1')
+    reader.sync()
+    assert reader.get('u1') is not None
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+# --- User Principal Cache ---
+# load_user runs on every authenticated request. Users are resolved from, in
+# order: this bounded in-process cache, a snapshot stored in the (signed)
+# session cookie, and only then MongoDB. Snapshots expire after
+# snapshot_ttl seconds.
+#
+# invalidate() also publishes the change to a Mongo collection when one is
+# attached. Every process reads new invalidations at most every
+# sync_interval seconds, dropping the user from its cache and distrusting
+# older snapshots, so a changed role is seen everywhere within that interval.
+
+SNAPSHOT_VERSION = 1  # Bump when the snapshot fields change to discard old sessions
+SNAPSHOT_SESSION_KEY = 'user_snapshot'
+
+
+class UserCache:
+    """Bounded LRU of user principals with a TTL, explicit invalidation and hit counters."""
+
+    def __init__(self, maxsize=10000, ttl=300, snapshot_ttl=900, sync_interval=5):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.snapshot_ttl = snapshot_ttl
+        self.sync_interval = sync_interval
+        self.collection = None
+        self._entries = OrderedDict()
+        self._invalidated_at = {}
+        self._synced_at = None  # monotonic time of the last sync
+        self._seen_until = 0.0  # newest invalidation applied; 0 reads every live marker on the first sync
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'snapshotHits': 0, 'dbLoads': 0, 'invalidations': 0}
+
+    def record(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    self.stats['hits'] += 1
+                    return user
+                del self._entries[user_id]
+        return None
+
+    def put(self, user):
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def attach_store(self, collection):
+        """Shares invalidations through a Mongo collection; old markers are removed by its TTL index on expiresAt."""
+        self.collection = collection
+
+    def invalidate(self, user_id):
+        """Drops a user after a profile or role change; older session snapshots stop being trusted."""
+        invalidated_at = time.time()
+        self._apply(user_id, invalidated_at)
+        with self._lock:
+            self.stats['invalidations'] += 1
+        if self.collection is not None:
+            # Markers only matter while snapshots issued before them can still be valid
+            expires_at = datetime.utcnow() + timedelta(seconds=self.snapshot_ttl)
+            self.collection.update_one({'_id': user_id}, {'$set': {'at': invalidated_at, 'expiresAt': expires_at}},
+                                       upsert=True)
+
+    def _apply(self, user_id, invalidated_at):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            if invalidated_at > self._invalidated_at.get(user_id, 0):
+                self._invalidated_at[user_id] = invalidated_at
+            if len(self._invalidated_at) > self.maxsize:
+                cutoff = time.time() - self.snapshot_ttl
+                self._invalidated_at = {k: v for k, v in self._invalidated_at.items() if v > cutoff}
+
+    def sync(self):
+        """Applies invalidations published by other processes, at most every sync_interval seconds."""
+        if self.collection is None:
+            return
+        now = time.monotonic()
+        if self._synced_at is not None and now - self._synced_at < self.sync_interval:
+            return
+        self._synced_at = now
+        # Look back a little: a slow writer's clock or commit may land just behind the last marker seen.
+        since = self._seen_until - self.sync_interval
+        try:
+            for doc in self.collection.find({'at': {'$gt': since}}, {'at': 1}):
+                self._apply(doc['_id'], doc['at'])
+                self._seen_until = max(self._seen_until, doc['at'])
+        except Exception as e:
+            print(f"Error reading user cache invalidations: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # --- Session snapshots ---
+    def make_snapshot(self, user):
+        return {'v': SNAPSHOT_VERSION, 'id': user.id, 'email': user.email, 'name': user.name,
+                'role': user.role, 'iat': time.time()}
+
+    def read_snapshot(self, snapshot, user_id):
+        """Returns the snapshot if it belongs to user_id and is still trustworthy, else None."""
+        if not isinstance(snapshot, dict) or snapshot.get('v') != SNAPSHOT_VERSION or snapshot.get('id') != user_id:
+            return None
+        issued_at = snapshot.get('iat', 0)
+        if time.time() - issued_at > self.snapshot_ttl:
+            return None
+        with self._lock:
+            if self._invalidated_at.get(user_id, 0) >= issued_at:
+                return None
+        return snapshot
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['snapshotHits'] + stats['dbLoads']
+        stats['hitRate'] = round((stats['hits'] + stats['snapshotHits']) / lookups, 4) if lookups else 0.0
+        stats['maxSize'] = self.maxsize
+        stats['ttlSeconds'] = self.ttl
+        return stats